@@ -5,6 +5,8 @@ from datetime import datetime
 
 from app.core.database import get_db
 from app.api.routes.auth import get_current_user
+from app.services.search_index import search_service
+from app.services.content_store import content_store
 
 router = APIRouter()
 
@@ -47,19 +49,23 @@ async def add_content_block(
     pos_record = await pos_result.single()
     next_position = pos_record["next_position"] if pos_record else 0
     
-    # Créer le bloc
+    # Créer le bloc (un contenu volumineux est stocké hors du graphe)
+    content = block_data.get("content", "")
+    inline_content, content_ref = content_store.externalize(content)
     create_query = """
     MATCH (c:Course {id: $course_id})
     CREATE (b:ContentBlock {
         id: $block_id,
         type: $type,
         content: $content,
+        content_ref: $content_ref,
         position: $position,
         created_at: datetime(),
         updated_at: datetime()
     })
     CREATE (c)-[:HAS_BLOCK]->(b)
-    RETURN b.id as id, b.type as type, b.content as content, 
+    SET c.content_version = COALESCE(c.content_version, 0) + 1
+    RETURN b.id as id, b.type as type,
            b.position as position, b.created_at as created_at
     """
     
@@ -67,7 +73,8 @@ async def add_content_block(
         course_id=course_id,
         block_id=block_id,
         type=block_data.get("type", "text"),
-        content=block_data.get("content", ""),
+        content=inline_content,
+        content_ref=content_ref,
         position=next_position
     )
     
@@ -75,7 +82,9 @@ async def add_content_block(
     if not record:
         raise HTTPException(status_code=400, detail="Failed to create block")
     
-    return dict(record)
+    search_service.index_block(course_id, record["id"], content, record["type"])
+    
+    return {**dict(record), "content": content}
 
 @router.put("/{course_id}/content/blocks/{block_id}")
 async def update_content_block(
@@ -106,21 +115,29 @@ async def update_content_block(
         raise HTTPException(status_code=404, detail="Block not found or not authorized")
     
     # Mettre à jour le bloc
+    content = block_data.get("content", "")
+    inline_content, content_ref = content_store.externalize(content)
     update_query = """
-    MATCH (b:ContentBlock {id: $block_id})
+    MATCH (c:Course {id: $course_id})-[:HAS_BLOCK]->(b:ContentBlock {id: $block_id})
     SET b.content = $content,
-        b.updated_at = datetime()
-    RETURN b.id as id, b.type as type, b.content as content,
+        b.content_ref = $content_ref,
+        b.updated_at = datetime(),
+        c.content_version = COALESCE(c.content_version, 0) + 1
+    RETURN b.id as id, b.type as type,
            b.position as position, b.updated_at as updated_at
     """
     
     result = await session.run(update_query,
+        course_id=course_id,
         block_id=block_id,
-        content=block_data.get("content", "")
+        content=inline_content,
+        content_ref=content_ref
     )
     
     record = await result.single()
-    return dict(record)
+    search_service.index_block(course_id, record["id"], content, record["type"])
+    
+    return {**dict(record), "content": content}
 
 @router.delete("/{course_id}/content/blocks/{block_id}")
 async def delete_content_block(
@@ -135,6 +152,7 @@ async def delete_content_block(
     delete_query = """
     MATCH (c:Course {id: $course_id})-[:HAS_BLOCK]->(b:ContentBlock {id: $block_id})
     WHERE c.teacher_id = $user_id OR $user_role = 'admin'
+    SET c.content_version = COALESCE(c.content_version, 0) + 1
     DETACH DELETE b
     RETURN count(b) as deleted_count
     """
@@ -150,6 +168,8 @@ async def delete_content_block(
     if not record or record["deleted_count"] == 0:
         raise HTTPException(status_code=404, detail="Block not found or not authorized")
     
+    search_service.remove_block(block_id)
+    
     return {"message": "Block deleted successfully"}
 
 @router.post("/{course_id}/content/reorder")
@@ -194,6 +214,14 @@ async def reorder_content_blocks(
             position=block_order["position"]
         )
     
+    # Invalider les exports en cache de ce cours
+    version_query = """
+    MATCH (c:Course {id: $course_id})
+    SET c.content_version = COALESCE(c.content_version, 0) + 1
+    """
+    
+    await session.run(version_query, course_id=course_id)
+    
     return {"message": "Blocks reordered successfully"}
 
 @router.get("/{course_id}/content/blocks")
@@ -209,6 +237,7 @@ async def get_course_content_blocks(
     WHERE c.is_public = true OR c.teacher_id = $user_id OR 
           EXISTS((u:User {id: $user_id})-[:ENROLLED_IN]->(c))
     RETURN b.id as id, b.type as type, b.content as content,
+           b.content_ref as content_ref,
            b.position as position, b.created_at as created_at,
            b.updated_at as updated_at
     ORDER BY b.position ASC
@@ -222,5 +251,6 @@ async def get_course_content_blocks(
     blocks = []
     async for record in result:
         blocks.append(dict(record))
+    content_store.resolve_rows(blocks)
     
     return {"blocks": blocks}
@@ -5,10 +5,37 @@ from datetime import datetime
 
 from app.core.database import get_db
 from app.api.routes.auth import get_current_user
+from app.services.export_cache import export_cache
 from app.models.course import Course, CourseCreate, CourseUpdate, CourseWithProgress
+from app.core.projection import Projection
 
 router = APIRouter()
 
+COURSE_FIELDS = {
+    "id": "c.id",
+    "title": "c.title",
+    "description": "c.description",
+    "category": "c.category",
+    "difficulty": "c.difficulty",
+    "is_public": "c.is_public",
+    "access_code": "c.access_code",
+    "teacher_id": "c.teacher_id",
+    "teacher_name": "t.full_name",
+    "created_at": "c.created_at",
+    "updated_at": "c.updated_at",
+    "student_count": ("count(DISTINCT s)", "OPTIONAL MATCH (s:User)-[:ENROLLED_IN]->(c)"),
+    "document_count": ("count(DISTINCT d)", "OPTIONAL MATCH (c)<-[:BELONGS_TO]-(d:Document)"),
+}
+
+COURSE_LIST_FIELDS = {
+    **COURSE_FIELDS,
+    "is_enrolled": (
+        "CASE WHEN count(current) > 0 THEN true ELSE false END",
+        "OPTIONAL MATCH (current:User {id: $user_id})-[:ENROLLED_IN]->(c)"
+    ),
+    "progress": "null",
+}
+
 @router.get("/test")
 async def courses_test():
     return {"message": "Courses module loaded"}
@@ -37,6 +64,7 @@ async def create_course(
         is_public: $is_public,
         access_code: $access_code,
         teacher_id: $teacher_id,
+        content_version: 0,
         created_at: datetime()
     })
     WITH c
@@ -75,28 +103,22 @@ async def get_courses(
     category: Optional[str] = None,
     difficulty: Optional[str] = None,
     search: Optional[str] = None,
+    fields: Optional[str] = None,
     current_user: dict = Depends(get_current_user),
     session = Depends(get_db)
 ):
-    query = """
+    projection = Projection(COURSE_LIST_FIELDS, fields, order_by="created_at")
+    
+    query = f"""
     MATCH (c:Course)
     MATCH (t:User)-[:TEACHES]->(c)
     WHERE ($category IS NULL OR c.category = $category)
     AND ($difficulty IS NULL OR c.difficulty = $difficulty)
     AND ($search IS NULL OR c.title CONTAINS $search OR c.description CONTAINS $search)
     AND (c.is_public = true OR c.teacher_id = $user_id)
-    OPTIONAL MATCH (s:User)-[:ENROLLED_IN]->(c)
-    OPTIONAL MATCH (c)<-[:BELONGS_TO]-(d:Document)
-    OPTIONAL MATCH (current:User {id: $user_id})-[:ENROLLED_IN]->(c)
-    RETURN c.id as id, c.title as title, c.description as description,
-           c.category as category, c.difficulty as difficulty,
-           c.is_public as is_public, c.access_code as access_code,
-           c.teacher_id as teacher_id, t.full_name as teacher_name,
-           c.created_at as created_at, c.updated_at as updated_at,
-           count(DISTINCT s) as student_count,
-           count(DISTINCT d) as document_count,
-           CASE WHEN current IS NOT NULL THEN true ELSE false END as is_enrolled
-    ORDER BY c.created_at DESC
+    {projection.matches()}
+    RETURN {projection.returns()}
+    ORDER BY created_at DESC
     """
     
     result = await session.run(query,
@@ -106,6 +128,9 @@ async def get_courses(
         user_id=current_user["id"]
     )
     
+    if projection.partial:
+        return projection.response([projection.row(record) async for record in result])
+    
     courses = []
     async for record in result:
         course_data = dict(record)
@@ -117,22 +142,18 @@ async def get_courses(
 @router.get("/{course_id}", response_model=Course)
 async def get_course(
     course_id: str,
+    fields: Optional[str] = None,
     current_user: dict = Depends(get_current_user),
     session = Depends(get_db)
 ):
-    query = """
-    MATCH (c:Course {id: $course_id})
+    projection = Projection(COURSE_FIELDS, fields)
+    
+    query = f"""
+    MATCH (c:Course {{id: $course_id}})
     MATCH (t:User)-[:TEACHES]->(c)
     WHERE c.is_public = true OR c.teacher_id = $user_id
-    OPTIONAL MATCH (s:User)-[:ENROLLED_IN]->(c)
-    OPTIONAL MATCH (c)<-[:BELONGS_TO]-(d:Document)
-    RETURN c.id as id, c.title as title, c.description as description,
-           c.category as category, c.difficulty as difficulty,
-           c.is_public as is_public, c.access_code as access_code,
-           c.teacher_id as teacher_id, t.full_name as teacher_name,
-           c.created_at as created_at, c.updated_at as updated_at,
-           count(DISTINCT s) as student_count,
-           count(DISTINCT d) as document_count
+    {projection.matches()}
+    RETURN {projection.returns()}
     """
     
     result = await session.run(query, course_id=course_id, user_id=current_user["id"])
@@ -141,6 +162,9 @@ async def get_course(
     if not record:
         raise HTTPException(status_code=404, detail="Course not found")
     
+    if projection.partial:
+        return projection.response(projection.row(record))
+    
     return Course(**dict(record))
 
 @router.post("/{course_id}/enroll")
@@ -214,5 +238,6 @@ async def delete_course(
     """
     
     await session.run(query, course_id=course_id)
+    export_cache.invalidate_course(course_id)
     
     return {"message": "Course deleted successfully"}
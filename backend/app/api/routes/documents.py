@@ -1,113 +1,139 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, Query
+from fastapi.responses import JSONResponse, StreamingResponse
 import os
-import aiofiles
+import importlib.util
 from typing import List, Optional
 import uuid
 import tempfile
-from datetime import datetime
 
 from app.core.database import get_db
 from app.services.document_parser import document_parser
 from app.api.routes.auth import get_current_user
-from app.models.document import Document, DocumentCreate, DocumentUpdate, DocumentWithCourse, DocumentResponse
+from app.models.document import (
+    Document, DocumentCreate, DocumentUpdate, DocumentWithCourse, DocumentResponse, DocumentParseStatus,
+    DocumentChunkInfo, DocumentContentRange, DocumentVersionInfo, DocumentVersionContent
+)
 from app.core.config import settings
+from app.services.upload_pipeline import stream_upload_to_disk, UploadTooLarge
+from app.services.parse_pool import ParseError, ParseQueueFull
+from app.services.parse_cache import parse_cached
+from app.services.parse_stream import stream_parse
+from app.services.parser_engine import parser_engine
+from app.services.blob_store import blob_store
+from app.services.document_ingestion import document_ingestion, encode_metadata, decode_metadata
+from app.services.document_chunks import DOCUMENT_FIELDS, list_chunks, read_range, split_content
+from app.core.projection import Projection
+from app.services.search_index import search_service
+from app.services.content_store import content_store
+from app.services.document_history import document_history
+from app.services.document_previews import document_previews
 
 router = APIRouter()
 
-@router.post("/upload", response_model=DocumentResponse)
+# Plage maximale renvoyée par /content, en nombre de blocs
+MAX_RANGE_CHUNKS = 16
+
+@router.post("/upload", response_model=DocumentResponse, status_code=202)
 async def upload_document(
     file: UploadFile = File(...),
     title: Optional[str] = None,
     description: Optional[str] = None,
-    db=Depends(get_db)
+    session=Depends(get_db)
 ):
-    """Upload et parse un document"""
+    """Upload d'un document : réponse immédiate, parsing en tâche de fond"""
+    # Vérification du type de fichier
+    if not file.filename:
+        raise HTTPException(status_code=400, detail="Nom de fichier manquant")
+    
+    # Sauvegarde du fichier par blocs, taille contrôlée pendant la réception
+    temp_path = blob_store.temp_path()
     try:
-        # Vérification du type de fichier
-        if not file.filename:
-            raise HTTPException(status_code=400, detail="Nom de fichier manquant")
-        
-        # Génération d'un nom unique
-        file_id = str(uuid.uuid4())
-        file_extension = os.path.splitext(file.filename)[1]
-        unique_filename = f"{file_id}{file_extension}"
-        file_path = os.path.join(settings.UPLOAD_DIR, unique_filename)
-        
-        # Création du dossier d'upload s'il n'existe pas
-        os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
+        stored = await stream_upload_to_disk(file, temp_path)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erreur lors de l'upload: {str(e)}")
+    
+    file_record = None
+    try:
+        # Stockage adressé par contenu : un fichier déjà connu n'est pas réécrit
+        blob_store.adopt(temp_path, stored.sha256)
+        file_record = await blob_store.register_file(
+            session,
+            sha256=stored.sha256,
+            size=stored.size,
+            mime_type=stored.mime_type,
+            filename=file.filename,
+            owner_id=None
+        )
         
-        # Sauvegarde du fichier
-        async with aiofiles.open(file_path, 'wb') as f:
-            content = await file.read()
-            await f.write(content)
+        document_id = str(uuid.uuid4())
+        metadata = {
+            'size': stored.size,
+            'sha256': stored.sha256,
+            'mime_type': stored.mime_type
+        }
+        file_path = str(blob_store.blob_path(stored.sha256))
         
-        # Parsing du document
-        parse_result = await document_parser.parse_document(file_path)
+        # Le nœud est créé en attente, le contenu est écrit par le worker de parsing
+        query = """
+        CREATE (d:Document {
+            id: $id,
+            title: $title,
+            description: $description,
+            filename: $filename,
+            file_path: $file_path,
+            file_id: $file_id,
+            metadata: $metadata,
+            status: 'pending',
+            parse_attempts: 0,
+            parsed_successfully: false,
+            created_at: datetime(),
+            updated_at: datetime()
+        })
+        RETURN d.created_at as created_at
+        """
         
-        # Création de l'objet document
-        document_data = DocumentCreate(
+        result = await session.run(query,
+            id=document_id,
             title=title or file.filename,
             description=description or "",
-            file_path=file_path,
             filename=file.filename,
-            content=parse_result.get('content', ''),
-            metadata=parse_result.get('metadata', {}),
-            parsed_successfully=parse_result.get('success', False)
-        )
-        
-        # Sauvegarde en base de données
-        with db.session() as session:
-            # Création du nœud document
-            query = """
-            CREATE (d:Document {
-                id: $id,
-                title: $title,
-                description: $description,
-                filename: $filename,
-                file_path: $file_path,
-                content: $content,
-                metadata: $metadata,
-                parsed_successfully: $parsed_successfully,
-                created_at: datetime(),
-                updated_at: datetime()
-            })
-            RETURN d
-            """
-            
-            result = session.run(query, {
-                'id': file_id,
-                'title': document_data.title,
-                'description': document_data.description,
-                'filename': document_data.filename,
-                'file_path': document_data.file_path,
-                'content': document_data.content,
-                'metadata': document_data.metadata,
-                'parsed_successfully': document_data.parsed_successfully
-            })
-            
-            document_node = result.single()
-            if not document_node:
-                raise HTTPException(status_code=500, detail="Erreur lors de la création du document")
-        
-        return DocumentResponse(
-            id=file_id,
-            title=document_data.title,
-            description=document_data.description,
-            filename=document_data.filename,
-            content=document_data.content,
-            metadata=document_data.metadata,
-            parsed_successfully=document_data.parsed_successfully,
-            created_at=datetime.now(),
-            updated_at=datetime.now()
+            file_path=file_path,
+            file_id=file_record["id"],
+            metadata=encode_metadata(metadata)
         )
-        
+        record = await result.single()
+        if not record:
+            raise RuntimeError("Erreur lors de la création du document")
     except Exception as e:
-        # Nettoyage du fichier en cas d'erreur
-        if 'file_path' in locals() and os.path.exists(file_path):
-            os.remove(file_path)
-        
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        if file_record is not None:
+            # Le fichier est déjà dans le blob store : rendre la référence prise par register_file
+            await blob_store.release_file(session, file_record["id"])
         raise HTTPException(status_code=500, detail=f"Erreur lors de l'upload: {str(e)}")
+    
+    created_at = record["created_at"].to_native()
+    
+    # File pleine : le document reste en attente et sera repris par le balayage
+    document_ingestion.submit(document_id, file_path, stored.sha256, file.filename)
+    # Aperçus rendus en parallèle du parsing (une seule fois par contenu)
+    document_previews.submit(stored.sha256, stored.mime_type)
+    
+    return DocumentResponse(
+        id=document_id,
+        title=title or file.filename,
+        description=description or "",
+        filename=file.filename,
+        file_id=file_record["id"],
+        content=None,
+        metadata=metadata,
+        parsed_successfully=False,
+        status="pending",
+        created_at=created_at,
+        updated_at=created_at
+    )
 
 @router.post("/", response_model=Document)
 async def create_document(
@@ -129,12 +155,14 @@ async def create_document(
         raise HTTPException(status_code=404, detail="Course not found or not authorized")
     
     document_id = str(uuid.uuid4())
+    content, content_ref = content_store.externalize(document.content)
     
     query = """
     CREATE (d:Document {
         id: $id,
         title: $title,
         content: $content,
+        content_ref: $content_ref,
         type: $type,
         tags: $tags,
         course_id: $course_id,
@@ -148,6 +176,7 @@ async def create_document(
     CREATE (d)-[:BELONGS_TO]->(c)
     CREATE (u)-[:AUTHORED]->(d)
     RETURN d.id as id, d.title as title, d.content as content,
+           d.content_ref as content_ref,
            d.type as type, d.tags as tags, d.course_id as course_id,
            d.author_id as author_id, u.full_name as author_name,
            d.created_at as created_at, d.version as version
@@ -156,7 +185,8 @@ async def create_document(
     result = await session.run(query,
         id=document_id,
         title=document.title,
-        content=document.content,
+        content=content,
+        content_ref=content_ref,
         type=document.type,
         tags=document.tags,
         course_id=document.course_id,
@@ -167,118 +197,252 @@ async def create_document(
     if not record:
         raise HTTPException(status_code=400, detail="Failed to create document")
     
-    return Document(**dict(record))
+    data = dict(record)
+    content_store.resolve_rows([data])
+    await document_history.record(session, data["id"], 1, data["content"], data["title"], current_user["id"])
+    search_service.index_document(data["id"], split_content(data["content"] or ""), data["title"], data["course_id"])
+    
+    return Document(**data)
 
 @router.post("/parse")
 async def parse_document(file: UploadFile = File(...)):
     """Parse uploaded document"""
+    temp_file_path = os.path.join(tempfile.gettempdir(), f"{uuid.uuid4()}_{os.path.basename(file.filename or '')}")
     try:
-        # Create temporary file
-        with tempfile.NamedTemporaryFile(delete=False, suffix=f"_{file.filename}") as temp_file:
-            content = await file.read()
-            temp_file.write(content)
-            temp_file_path = temp_file.name
+        # Create temporary file, streamed in fixed-size chunks
+        stored = await stream_upload_to_disk(file, temp_file_path)
         
-        # Parse document
-        result = document_parser.parse_document(temp_file_path)
-        
-        # Clean up
-        os.unlink(temp_file_path)
-        
-        return result
+        # Parse document in the process pool, known content is served from the parse cache
+        return await parse_cached("document", temp_file_path, stored.sha256, file.filename or "")
     
+    except UploadTooLarge as e:
+        return JSONResponse(
+            status_code=413,
+            content={"success": False, "error": str(e)}
+        )
+    except ParseQueueFull as e:
+        return JSONResponse(
+            status_code=503,
+            content={"success": False, "error": str(e)}
+        )
+    except ParseError as e:
+        return JSONResponse(
+            status_code=422,
+            content={"success": False, "error": str(e)}
+        )
     except Exception as e:
         return JSONResponse(
             status_code=500,
             content={"success": False, "error": str(e)}
         )
+    finally:
+        # Clean up
+        if os.path.exists(temp_file_path):
+            os.unlink(temp_file_path)
+
+@router.post("/parse/stream")
+async def parse_document_stream(file: UploadFile = File(...)):
+    """Parse uploaded document, emitting NDJSON records (pages, sections, row chunks) as they are extracted"""
+    temp_file_path = os.path.join(tempfile.gettempdir(), f"{uuid.uuid4()}_{os.path.basename(file.filename or '')}")
+    try:
+        stored = await stream_upload_to_disk(file, temp_file_path)
+    except UploadTooLarge as e:
+        return JSONResponse(
+            status_code=413,
+            content={"success": False, "error": str(e)}
+        )
+    
+    return StreamingResponse(
+        stream_parse(temp_file_path, file.filename, stored.mime_type, delete_after=True),
+        media_type="application/x-ndjson"
+    )
 
 @router.get("/parse-test")
 async def test_parsing_capabilities():
     """Test parsing capabilities"""
     capabilities = {
         "supported_formats": list(document_parser.supported_formats.keys()),
+        "backends": parser_engine.supported_formats(),
         "libraries_available": {}
     }
     
-    # Test PDF libraries
-    try:
-        import pdfplumber
-        capabilities["libraries_available"]["pdfplumber"] = True
-    except ImportError:
-        capabilities["libraries_available"]["pdfplumber"] = False
+    # find_spec localise les bibliothèques sans les charger dans le processus de l'API
+    for name, module in (("pdfplumber", "pdfplumber"), ("PyPDF2", "PyPDF2"), ("python-magic", "magic"),
+                         ("PyMuPDF", "fitz"), ("mammoth", "mammoth")):
+        capabilities["libraries_available"][name] = importlib.util.find_spec(module) is not None
     
-    try:
-        import PyPDF2
-        capabilities["libraries_available"]["PyPDF2"] = True
-    except ImportError:
-        capabilities["libraries_available"]["PyPDF2"] = False
+    return capabilities
+
+@router.get("/parse-metrics")
+async def get_parse_metrics(current_user: dict = Depends(get_current_user)):
+    """Queue depth, failures and durations of the parsing pipeline"""
+    return document_ingestion.stats()
+
+@router.post("/parse-jobs/recover")
+async def recover_stuck_documents(
+    current_user: dict = Depends(get_current_user),
+    session=Depends(get_db)
+):
+    """Relancer immédiatement le balayage des documents bloqués"""
+    if current_user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
     
-    try:
-        import magic
-        capabilities["libraries_available"]["python-magic"] = True
-    except ImportError:
-        capabilities["libraries_available"]["python-magic"] = False
+    return await document_ingestion.recover_stuck(session, force=True)
+
+@router.post("/history/compact")
+async def compact_document_history(
+    current_user: dict = Depends(get_current_user),
+    session=Depends(get_db)
+):
+    """Borner la longueur des chaînes de deltas et appliquer la rétention de l'historique"""
+    if current_user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
     
-    return capabilities
+    return await document_history.compact_all(session)
+
+def document_response(doc) -> DocumentResponse:
+    metadata = decode_metadata(doc.get('metadata'))
+    return DocumentResponse(
+        id=doc['id'],
+        title=doc['title'],
+        description=doc.get('description'),
+        filename=doc['filename'],
+        file_id=doc.get('file_id'),
+        thumbnail_url=document_previews.thumbnail_url(doc.get('file_id'), metadata.get('sha256')),
+        metadata=metadata,
+        parsed_successfully=doc.get('parsed_successfully') or False,
+        status=doc.get('status') or 'parsed',
+        parse_error=doc.get('parse_error'),
+        content_length=doc.get('content_length'),
+        chunk_count=doc.get('chunk_count'),
+        created_at=doc['created_at'],
+        updated_at=doc.get('updated_at')
+    )
+
+@router.get("/{document_id}/status", response_model=DocumentParseStatus)
+async def get_document_status(document_id: str, session=Depends(get_db)):
+    """État du parsing d'un document uploadé (à interroger jusqu'à parsed/failed)"""
+    await document_ingestion.recover_stuck(session)
+    
+    query = """
+    MATCH (d:Document {id: $document_id})
+    RETURN d.id as id, COALESCE(d.status, 'parsed') as status,
+           COALESCE(d.parsed_successfully, false) as parsed_successfully,
+           COALESCE(d.parse_attempts, 0) as parse_attempts,
+           d.parse_error as parse_error, d.parsed_at as parsed_at,
+           d.updated_at as updated_at
+    """
+    
+    result = await session.run(query, document_id=document_id)
+    record = await result.single()
+    
+    if not record:
+        raise HTTPException(status_code=404, detail="Document non trouvé")
+    
+    return DocumentParseStatus(**dict(record))
+
+@router.get("/{document_id}/preview")
+async def get_document_preview(document_id: str, session=Depends(get_db)):
+    """Miniature et images des premières pages d'un document uploadé (PDF/DOCX)"""
+    query = """
+    MATCH (d:Document {id: $document_id})
+    RETURN d.file_id as file_id, d.metadata as metadata
+    """
+    result = await session.run(query, document_id=document_id)
+    record = await result.single()
+    
+    if not record:
+        raise HTTPException(status_code=404, detail="Document non trouvé")
+    
+    metadata = decode_metadata(record["metadata"])
+    sha256, mime_type = metadata.get("sha256"), metadata.get("mime_type")
+    if not record["file_id"] or not sha256 or not document_previews.supports(mime_type):
+        raise HTTPException(status_code=404, detail="Aperçu non disponible pour ce document")
+    
+    document_previews.submit(sha256, mime_type)
+    return document_previews.describe(record["file_id"], sha256)
+
+@router.get("/{document_id}/chunks", response_model=List[DocumentChunkInfo])
+async def get_document_chunks(document_id: str, session=Depends(get_db)):
+    """Offsets et tailles des blocs de contenu d'un document"""
+    return [DocumentChunkInfo(**chunk) for chunk in await list_chunks(session, document_id)]
+
+@router.get("/{document_id}/content", response_model=DocumentContentRange)
+async def get_document_content(
+    document_id: str,
+    start: int = Query(0, ge=0),
+    end: Optional[int] = Query(None, ge=0),
+    session=Depends(get_db)
+):
+    """Texte d'un document sur la plage [start, end), lu uniquement dans les blocs concernés"""
+    query = """
+    MATCH (d:Document {id: $document_id})
+    RETURN COALESCE(d.content_length, size(d.content), 0) as content_length
+    """
+    result = await session.run(query, document_id=document_id)
+    record = await result.single()
+    
+    if not record:
+        raise HTTPException(status_code=404, detail="Document non trouvé")
+    
+    content_length = record["content_length"]
+    max_end = start + settings.document_chunk_chars * MAX_RANGE_CHUNKS
+    end = min(content_length, max_end if end is None else min(end, max_end))
+    content = await read_range(session, document_id, start, end) if start < end else ""
+    
+    return DocumentContentRange(
+        document_id=document_id,
+        start=start,
+        end=max(start, end),
+        content_length=content_length,
+        content=content or ""
+    )
+
+def projected_document(projection: Projection, record) -> dict:
+    doc = projection.row(record)
+    if 'metadata' in doc:
+        doc['metadata'] = decode_metadata(doc['metadata'])
+    return doc
 
 @router.get("/{document_id}", response_model=DocumentResponse)
-async def get_document(document_id: str, db=Depends(get_db)):
-    """Récupère un document par son ID"""
-    with db.session() as session:
-        query = """
-        MATCH (d:Document {id: $document_id})
-        RETURN d
-        """
-        
-        result = session.run(query, {'document_id': document_id})
-        document_node = result.single()
-        
-        if not document_node:
-            raise HTTPException(status_code=404, detail="Document non trouvé")
-        
-        doc = document_node['d']
-        return DocumentResponse(
-            id=doc['id'],
-            title=doc['title'],
-            description=doc['description'],
-            filename=doc['filename'],
-            content=doc['content'],
-            metadata=doc['metadata'],
-            parsed_successfully=doc['parsed_successfully'],
-            created_at=doc['created_at'],
-            updated_at=doc['updated_at']
-        )
+async def get_document(document_id: str, fields: Optional[str] = None, session=Depends(get_db)):
+    """Récupère un document par son ID (métadonnées; le contenu se lit via /content)"""
+    projection = Projection(DOCUMENT_FIELDS, fields)
+    
+    query = f"""
+    MATCH (d:Document {{id: $document_id}})
+    RETURN {projection.returns()}
+    """
+    
+    result = await session.run(query, document_id=document_id)
+    record = await result.single()
+    
+    if not record:
+        raise HTTPException(status_code=404, detail="Document non trouvé")
+    
+    if projection.partial:
+        return projection.response(projected_document(projection, record))
+    
+    return document_response(dict(record))
 
 @router.get("/", response_model=List[DocumentResponse])
-async def list_documents(skip: int = 0, limit: int = 100, db=Depends(get_db)):
-    """Liste tous les documents"""
-    with db.session() as session:
-        query = """
-        MATCH (d:Document)
-        RETURN d
-        ORDER BY d.created_at DESC
-        SKIP $skip LIMIT $limit
-        """
-        
-        result = session.run(query, {'skip': skip, 'limit': limit})
-        documents = []
-        
-        for record in result:
-            doc = record['d']
-            documents.append(DocumentResponse(
-                id=doc['id'],
-                title=doc['title'],
-                description=doc['description'],
-                filename=doc['filename'],
-                content=doc['content'],
-                metadata=doc['metadata'],
-                parsed_successfully=doc['parsed_successfully'],
-                created_at=doc['created_at'],
-                updated_at=doc['updated_at']
-            ))
-        
-        return documents
+async def list_documents(skip: int = 0, limit: int = 100, fields: Optional[str] = None, session=Depends(get_db)):
+    """Liste tous les documents (métadonnées seulement)"""
+    projection = Projection(DOCUMENT_FIELDS, fields, order_by="created_at")
+    
+    query = f"""
+    MATCH (d:Document)
+    RETURN {projection.returns()}
+    ORDER BY created_at DESC
+    SKIP $skip LIMIT $limit
+    """
+    
+    result = await session.run(query, skip=skip, limit=limit)
+    
+    if projection.partial:
+        return projection.response([projected_document(projection, record) async for record in result])
+    
+    return [document_response(dict(record)) async for record in result]
 
 @router.get("/old/{document_id}", response_model=Document)
 async def get_document(
@@ -291,6 +455,7 @@ async def get_document(
     MATCH (u:User)-[:AUTHORED]->(d)
     WHERE c.is_public = true OR c.teacher_id = $user_id OR EXISTS((current:User {id: $user_id})-[:ENROLLED_IN]->(c))
     RETURN d.id as id, d.title as title, d.content as content,
+           d.content_ref as content_ref,
            d.type as type, d.tags as tags, d.course_id as course_id,
            d.author_id as author_id, u.full_name as author_name,
            d.created_at as created_at, d.updated_at as updated_at,
@@ -303,7 +468,46 @@ async def get_document(
     if not record:
         raise HTTPException(status_code=404, detail="Document not found")
     
-    return Document(**dict(record))
+    data = dict(record)
+    content_store.resolve_rows([data])
+    return Document(**data)
+
+async def get_readable_document(session, document_id: str, current_user: dict):
+    query = """
+    MATCH (d:Document {id: $document_id})-[:BELONGS_TO]->(c:Course)
+    WHERE c.is_public = true OR c.teacher_id = $user_id OR EXISTS((current:User {id: $user_id})-[:ENROLLED_IN]->(c))
+    RETURN d.id as id
+    """
+    result = await session.run(query, document_id=document_id, user_id=current_user["id"])
+    if not await result.single():
+        raise HTTPException(status_code=404, detail="Document not found")
+
+@router.get("/{document_id}/versions", response_model=List[DocumentVersionInfo])
+async def get_document_versions(
+    document_id: str,
+    current_user: dict = Depends(get_current_user),
+    session = Depends(get_db)
+):
+    """Historique des versions d'un document rédigé (la plus récente en premier)"""
+    await get_readable_document(session, document_id, current_user)
+    return [DocumentVersionInfo(**version) for version in await document_history.list_versions(session, document_id)]
+
+@router.get("/{document_id}/versions/{version}", response_model=DocumentVersionContent)
+async def get_document_version(
+    document_id: str,
+    version: int,
+    current_user: dict = Depends(get_current_user),
+    session = Depends(get_db)
+):
+    """Contenu d'une version, reconstitué depuis l'instantané le plus proche"""
+    await get_readable_document(session, document_id, current_user)
+    try:
+        data = await document_history.get_version(session, document_id, version)
+    except ValueError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if not data:
+        raise HTTPException(status_code=404, detail="Version not found")
+    return DocumentVersionContent(**data)
 
 @router.put("/{document_id}", response_model=Document)
 async def update_document(
@@ -316,7 +520,8 @@ async def update_document(
     query = """
     MATCH (d:Document {id: $document_id})-[:BELONGS_TO]->(c:Course)
     WHERE d.author_id = $user_id OR c.teacher_id = $user_id
-    RETURN d, c
+    RETURN d.content as content, d.content_ref as content_ref,
+           COALESCE(d.version, 1) as version
     """
     
     result = await session.run(query, document_id=document_id, user_id=current_user["id"])
@@ -325,9 +530,11 @@ async def update_document(
     if not record:
         raise HTTPException(status_code=404, detail="Document not found or not authorized")
     
+    previous = content_store.resolve(record["content"], record["content_ref"])
+    
     # Build update query
     update_fields = []
-    params = {"document_id": document_id, "user_id": current_user["id"]}
+    params = {"document_id": document_id, "user_id": current_user["id"], "expected_version": record["version"]}
     
     if document_update.title is not None:
         update_fields.append("d.title = $title")
@@ -335,7 +542,8 @@ async def update_document(
     
     if document_update.content is not None:
         update_fields.append("d.content = $content")
-        params["content"] = document_update.content
+        update_fields.append("d.content_ref = $content_ref")
+        params["content"], params["content_ref"] = content_store.externalize(document_update.content)
     
     if document_update.type is not None:
         update_fields.append("d.type = $type")
@@ -349,23 +557,46 @@ async def update_document(
         raise HTTPException(status_code=400, detail="No fields to update")
     
     update_fields.append("d.updated_at = datetime()")
-    update_fields.append("d.version = d.version + 1")
+    update_fields.append("d.version = COALESCE(d.version, 1) + 1")
     
+    # La version lue sert de garde : une modification concurrente aurait une autre base pour son delta.
+    # Verrou d'écriture pris avant la comparaison (SET d._lock), sinon deux requêtes simultanées
+    # liraient la même version et passeraient toutes deux la garde
     query = f"""
     MATCH (d:Document {{id: $document_id}})
+    SET d._lock = true
+    WITH d, COALESCE(d.version, 1) = $expected_version as unchanged
+    REMOVE d._lock
+    WITH d WHERE unchanged
     MATCH (u:User)-[:AUTHORED]->(d)
     SET {', '.join(update_fields)}
     RETURN d.id as id, d.title as title, d.content as content,
+           d.content_ref as content_ref,
            d.type as type, d.tags as tags, d.course_id as course_id,
            d.author_id as author_id, u.full_name as author_name,
            d.created_at as created_at, d.updated_at as updated_at,
            d.version as version
     """
     
-    result = await session.run(query, **params)
-    record = await result.single()
-    
-    return Document(**dict(record))
+    async def write_version(tx):
+        # Nouvelle version et son entrée d'historique validées ensemble : pas de trou dans la chaîne de deltas
+        result = await tx.run(query, **params)
+        record = await result.single()
+        if not record:
+            return None
+        data = dict(record)
+        content_store.resolve_rows([data])
+        await document_history.record(tx, data["id"], data["version"], data["content"], data["title"],
+                                      current_user["id"], previous=previous)
+        return data
+    
+    data = await session.execute_write(write_version)
+    if data is None:
+        raise HTTPException(status_code=409, detail="Document modified concurrently, reload and retry")
+    
+    search_service.index_document(data["id"], split_content(data["content"] or ""), data["title"], data["course_id"])
+    
+    return Document(**data)
 
 @router.delete("/{document_id}")
 async def delete_document(
@@ -377,7 +608,7 @@ async def delete_document(
     query = """
     MATCH (d:Document {id: $document_id})-[:BELONGS_TO]->(c:Course)
     WHERE d.author_id = $user_id OR c.teacher_id = $user_id
-    RETURN d
+    RETURN d.file_id as file_id
     """
     
     result = await session.run(query, document_id=document_id, user_id=current_user["id"])
@@ -389,9 +620,15 @@ async def delete_document(
     # Delete document
     query = """
     MATCH (d:Document {id: $document_id})
-    DETACH DELETE d
+    OPTIONAL MATCH (d)-[:HAS_CHUNK]->(chunk:DocumentChunk)
+    DETACH DELETE chunk, d
     """
     
     await session.run(query, document_id=document_id)
+    await document_history.delete(session, document_id)
+    if document["file_id"]:
+        # Référence du blob prise à l'upload : libérée pour le ramasse-miettes
+        await blob_store.release_file(session, document["file_id"])
+    search_service.remove_document(document_id)
     
     return {"message": "Document deleted successfully"}
@@ -1,240 +1,217 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.responses import Response
-from typing import Dict, Any, Optional
-import json
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
+from typing import Dict, Any
 from datetime import datetime
+import asyncio
+import json
+import os
 
 from app.core.database import get_db
 from app.api.routes.auth import get_current_user
+from app.services.course_export import EXPORT_FORMATS, get_exportable_course
+from app.services.course_archive import stream_course_archive, list_owned_course_ids
+from app.services.course_import import import_courses, iter_ndjson
+from app.services.export_jobs import export_jobs
 
 router = APIRouter()
 
-@router.post("/{course_id}/export")
+def get_owned_export_job(course_id: str, job_id: str, current_user: dict):
+    """Récupérer une tâche d'export appartenant à l'utilisateur"""
+    job = export_jobs.get(job_id)
+    if (
+        not job
+        or job.params["course_id"] != course_id
+        or (job.owner_id != current_user["id"] and current_user.get("role") != "admin")
+    ):
+        raise HTTPException(status_code=404, detail="Export job not found")
+    return job
+
+def serialize_export_job(course_id: str, job) -> Dict[str, Any]:
+    job_data = job.to_dict()
+    job_data["format"] = job.params["format"]
+    job_data["status_url"] = f"/api/courses/{course_id}/export/jobs/{job.id}"
+    if job.status == "completed":
+        job_data["download_url"] = f"/api/courses/{course_id}/export/jobs/{job.id}/download"
+        job_data["size"] = job.result.get("size")
+    return job_data
+
+@router.post("/export/archive")
+async def export_courses_archive(
+    archive_data: Dict[str, Any],
+    current_user: dict = Depends(get_current_user),
+    session = Depends(get_db)
+):
+    """Exporter plusieurs cours dans une archive ZIP diffusée au fil de l'eau"""
+
+    export_format = archive_data.get("format", "json")  # json, html, print
+    course_ids = archive_data.get("course_ids")  # None = tous les cours de l'utilisateur
+    include_qcms = archive_data.get("include_qcms", True)
+    include_files = archive_data.get("include_files", True)
+
+    if export_format not in EXPORT_FORMATS or export_format == "pdf":
+        raise HTTPException(status_code=400, detail="Unsupported archive format")
+
+    if course_ids is None:
+        course_ids = await list_owned_course_ids(session, current_user)
+    elif not isinstance(course_ids, list) or not all(isinstance(c, str) for c in course_ids):
+        raise HTTPException(status_code=400, detail="course_ids must be a list of course ids")
+
+    if not course_ids:
+        raise HTTPException(status_code=404, detail="No course to export")
+
+    # Les cours non autorisés sont ignorés et listés dans manifest.json
+    filename = f"courses_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"
+    return StreamingResponse(
+        stream_course_archive(
+            list(dict.fromkeys(course_ids)),
+            current_user,
+            export_format=export_format,
+            include_qcms=include_qcms,
+            include_files=include_files
+        ),
+        media_type="application/zip",
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
+
+@router.post("/import", status_code=status.HTTP_201_CREATED)
+async def import_courses_from_export(
+    request: Request,
+    current_user: dict = Depends(get_current_user),
+    session = Depends(get_db)
+):
+    """Importer un ou plusieurs cours au format d'export JSON (objet, liste ou flux NDJSON)"""
+
+    if current_user["role"] not in ["teacher", "admin"]:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only teachers can import courses"
+        )
+
+    content_type = request.headers.get("content-type", "")
+    try:
+        if "ndjson" in content_type or "jsonlines" in content_type:
+            # Flux : les cours sont lus et écrits par lots sans charger tout le corps
+            exports = iter_ndjson(request.stream())
+        else:
+            payload = await request.json()
+            exports = payload if isinstance(payload, list) else [payload]
+
+        report = await import_courses(session, exports, current_user["id"])
+    except (json.JSONDecodeError, UnicodeDecodeError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid JSON: {str(e)}")
+
+    return report
+
+def export_file_response(request: Request, artifact: Dict[str, Any]):
+    """Servir un artefact d'export avec un ETag fort, ou 304 s'il est inchangé"""
+    etag = f'"{artifact["etag"]}"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*":
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    return FileResponse(
+        artifact["path"],
+        media_type=artifact["media_type"],
+        filename=artifact["filename"],
+        headers=headers
+    )
+
+async def enqueue_export(course: Dict[str, Any], current_user: dict, export_format: str,
+                         include_qcms: bool, include_analytics: bool, published: bool = False):
+    try:
+        return export_jobs.submit(
+            course,
+            current_user,
+            export_format,
+            include_qcms=include_qcms,
+            include_analytics=include_analytics,
+            published=published
+        )
+    except asyncio.QueueFull:
+        raise HTTPException(status_code=503, detail="Export queue is full, please retry later")
+
+@router.post("/{course_id}/export", status_code=status.HTTP_202_ACCEPTED)
 async def export_course(
     course_id: str,
     export_data: Dict[str, Any],
     current_user: dict = Depends(get_current_user),
     session = Depends(get_db)
 ):
-    """Exporter un cours dans différents formats"""
-    
-    export_format = export_data.get("format", "json")  # json, pdf, html
+    """Mettre en file l'export d'un cours dans différents formats"""
+
+    export_format = export_data.get("format", "json")  # json, html, print, pdf
     include_qcms = export_data.get("include_qcms", True)
     include_analytics = export_data.get("include_analytics", False)
-    
-    # Vérifier les permissions
-    check_query = """
-    MATCH (c:Course {id: $course_id})
-    WHERE c.teacher_id = $user_id OR $user_role = 'admin'
-    RETURN c.id as id, c.title as title, c.description as description,
-           c.category as category, c.difficulty as difficulty,
-           c.is_public as is_public, c.created_at as created_at
-    """
-    
-    result = await session.run(check_query,
-        course_id=course_id,
-        user_id=current_user["id"],
-        user_role=current_user.get("role", "student")
-    )
-    course = await result.single()
-    
+
+    if export_format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail="Unsupported export format")
+
+    # Vérifier les permissions avant la mise en file
+    course = await get_exportable_course(session, course_id, current_user)
     if not course:
         raise HTTPException(status_code=404, detail="Course not found or not authorized")
-    
-    course_data = dict(course)
-    
-    # Récupérer les blocs de contenu
-    blocks_query = """
-    MATCH (c:Course {id: $course_id})-[:HAS_BLOCK]->(b:ContentBlock)
-    RETURN b.id as id, b.type as type, b.content as content,
-           b.position as position, b.created_at as created_at
-    ORDER BY b.position ASC
-    """
-    
-    blocks_result = await session.run(blocks_query, course_id=course_id)
-    blocks = []
-    async for record in blocks_result:
-        blocks.append(dict(record))
-    
-    course_data["blocks"] = blocks
-    
-    # Récupérer les QCM si demandé
-    if include_qcms:
-        qcms_query = """
-        MATCH (c:Course {id: $course_id})-[:HAS_QCM]->(q:QCM)
-        OPTIONAL MATCH (q)-[:HAS_QUESTION]->(quest:Question)
-        RETURN q.id as id, q.title as title, q.description as description,
-               q.time_limit as time_limit, q.attempts_allowed as attempts_allowed,
-               collect({
-                   id: quest.id,
-                   question: quest.question,
-                   type: quest.type,
-                   options: quest.options,
-                   correct_answers: quest.correct_answers,
-                   explanation: quest.explanation,
-                   position: quest.position,
-                   points: quest.points
-               }) as questions
-        ORDER BY q.created_at ASC
-        """
-        
-        qcms_result = await session.run(qcms_query, course_id=course_id)
-        qcms = []
-        async for record in qcms_result:
-            qcm_data = dict(record)
-            # Filtrer les questions nulles
-            qcm_data["questions"] = [q for q in qcm_data["questions"] if q["id"] is not None]
-            qcms.append(qcm_data)
-        
-        course_data["qcms"] = qcms
-    
-    # Récupérer les analytics si demandé
-    if include_analytics and current_user["role"] in ["teacher", "admin"]:
-        analytics_query = """
-        MATCH (c:Course {id: $course_id})
-        OPTIONAL MATCH (c)<-[:ENROLLED_IN]-(s:User)
-        OPTIONAL MATCH (c)-[:HAS_QCM]->(q:QCM)<-[:FOR_QCM]-(a:QCMAttempt)
-        RETURN count(DISTINCT s) as total_students,
-               count(DISTINCT a) as total_attempts,
-               avg(a.score) as avg_score
-        """
-        
-        analytics_result = await session.run(analytics_query, course_id=course_id)
-        analytics = await analytics_result.single()
-        
-        if analytics:
-            analytics_data = dict(analytics)
-            analytics_data["avg_score"] = round(analytics_data["avg_score"] or 0, 2)
-            course_data["analytics"] = analytics_data
-    
-    # Ajouter les métadonnées d'export
-    export_metadata = {
-        "exported_at": datetime.now().isoformat(),
-        "exported_by": current_user["id"],
-        "export_format": export_format,
-        "version": "1.0"
-    }
-    course_data["export_metadata"] = export_metadata
-    
-    # Générer le contenu selon le format
-    if export_format == "json":
-        content = json.dumps(course_data, indent=2, ensure_ascii=False, default=str)
-        media_type = "application/json"
-        filename = f"course_{course_data['title']}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-    
-    elif export_format == "html":
-        content = generate_html_export(course_data)
-        media_type = "text/html"
-        filename = f"course_{course_data['title']}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.html"
-    
-    elif export_format == "pdf":
-        # Pour le PDF, on retourne d'abord du HTML qui peut être converti côté client
-        content = generate_pdf_ready_html(course_data)
-        media_type = "text/html"
-        filename = f"course_{course_data['title']}_{datetime.now().strftime('%Y%m%d_%H%M%S')}_pdf.html"
-    
-    else:
+
+    job = await enqueue_export(course, current_user, export_format, include_qcms, include_analytics)
+    return serialize_export_job(course_id, job)
+
+@router.get("/{course_id}/export")
+async def download_course_export(
+    course_id: str,
+    request: Request,
+    format: str = "json",
+    include_qcms: bool = True,
+    current_user: dict = Depends(get_current_user),
+    session = Depends(get_db)
+):
+    """Télécharger directement l'export en cache de la version courante du cours"""
+
+    if format not in EXPORT_FORMATS:
         raise HTTPException(status_code=400, detail="Unsupported export format")
-    
-    return Response(
-        content=content,
-        media_type=media_type,
-        headers={
-            "Content-Disposition": f"attachment; filename={filename}",
-            "Content-Type": media_type
-        }
-    )
 
-def generate_html_export(course_data: Dict[str, Any]) -> str:
-    """Générer un export HTML du cours"""
-    
-    html_content = f"""
-    <!DOCTYPE html>
-    <html lang="fr">
-    <head>
-        <meta charset="UTF-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <title>{course_data['title']}</title>
-        <style>
-            body {{ font-family: Arial, sans-serif; max-width: 800px; margin: 0 auto; padding: 20px; }}
-            .header {{ border-bottom: 2px solid #333; padding-bottom: 20px; margin-bottom: 30px; }}
-            .block {{ margin-bottom: 30px; padding: 20px; border-left: 4px solid #007bff; background-color: #f8f9fa; }}
-            .qcm {{ margin-bottom: 30px; padding: 20px; border: 1px solid #ddd; border-radius: 5px; }}
-            .question {{ margin-bottom: 15px; }}
-            .options {{ margin-left: 20px; }}
-            .metadata {{ margin-top: 50px; padding-top: 20px; border-top: 1px solid #ddd; color: #666; font-size: 0.9em; }}
-        </style>
-    </head>
-    <body>
-        <div class="header">
-            <h1>{course_data['title']}</h1>
-            <p><strong>Description:</strong> {course_data.get('description', 'Aucune description')}</p>
-            <p><strong>Catégorie:</strong> {course_data.get('category', 'Non spécifiée')}</p>
-            <p><strong>Difficulté:</strong> {course_data.get('difficulty', 'Non spécifiée')}</p>
-        </div>
-        
-        <div class="content">
-            <h2>Contenu du cours</h2>
-    """
-    
-    # Ajouter les blocs de contenu
-    for block in course_data.get("blocks", []):
-        html_content += f"""
-            <div class="block">
-                <h3>Bloc {block.get('position', 0) + 1} - {block.get('type', 'text').title()}</h3>
-                <div>{block.get('content', '')}</div>
-            </div>
-        """
-    
-    # Ajouter les QCM
-    if course_data.get("qcms"):
-        html_content += "<h2>QCM</h2>"
-        for qcm in course_data["qcms"]:
-            html_content += f"""
-                <div class="qcm">
-                    <h3>{qcm.get('title', 'QCM sans titre')}</h3>
-                    <p>{qcm.get('description', '')}</p>
-            """
-            
-            for i, question in enumerate(qcm.get("questions", [])):
-                html_content += f"""
-                    <div class="question">
-                        <h4>Question {i + 1}: {question.get('question', '')}</h4>
-                        <div class="options">
-                """
-                
-                for j, option in enumerate(question.get("options", [])):
-                    is_correct = j in question.get("correct_answers", [])
-                    marker = "✓" if is_correct else "○"
-                    html_content += f"<p>{marker} {option}</p>"
-                
-                html_content += "</div>"
-                
-                if question.get("explanation"):
-                    html_content += f"<p><strong>Explication:</strong> {question['explanation']}</p>"
-                
-                html_content += "</div>"
-            
-            html_content += "</div>"
-    
-    # Ajouter les métadonnées
-    html_content += f"""
-        </div>
-        <div class="metadata">
-            <p><strong>Exporté le:</strong> {course_data['export_metadata']['exported_at']}</p>
-            <p><strong>Version:</strong> {course_data['export_metadata']['version']}</p>
-        </div>
-    </body>
-    </html>
-    """
-    
-    return html_content
-
-def generate_pdf_ready_html(course_data: Dict[str, Any]) -> str:
-    """Générer un HTML optimisé pour la conversion PDF"""
-    
-    # Version simplifiée avec styles inline pour une meilleure compatibilité PDF
-    return generate_html_export(course_data).replace(
-        "<style>",
-        "<style>@media print { body { margin: 0; } } "
-    )
+    # Export publié : aussi téléchargeable par les inscrits et, pour un cours public, par tous
+    course = await get_exportable_course(session, course_id, current_user, published=True)
+    if not course:
+        raise HTTPException(status_code=404, detail="Course not found or not authorized")
+    if not course["can_edit"]:
+        # Les QCM exportés contiennent les bonnes réponses : réservés à l'enseignant
+        include_qcms = False
+
+    cached = export_jobs.lookup_cached(course, format, include_qcms=include_qcms)
+    if cached is not None:
+        return export_file_response(request, cached)
+
+    # Pas encore en cache : on lance l'export en tâche de fond
+    job = await enqueue_export(course, current_user, format, include_qcms, False, published=True)
+    return JSONResponse(status_code=status.HTTP_202_ACCEPTED, content=serialize_export_job(course_id, job))
+
+@router.get("/{course_id}/export/jobs/{job_id}")
+async def get_export_job(
+    course_id: str,
+    job_id: str,
+    current_user: dict = Depends(get_current_user)
+):
+    """Suivre l'avancement d'une tâche d'export"""
+    job = get_owned_export_job(course_id, job_id, current_user)
+    return serialize_export_job(course_id, job)
+
+@router.get("/{course_id}/export/jobs/{job_id}/download")
+async def download_export(
+    course_id: str,
+    job_id: str,
+    request: Request,
+    current_user: dict = Depends(get_current_user)
+):
+    """Télécharger l'artefact d'un export terminé"""
+    job = get_owned_export_job(course_id, job_id, current_user)
+
+    if job.status == "failed":
+        raise HTTPException(status_code=409, detail=f"Export failed: {job.error}")
+    if job.status != "completed":
+        raise HTTPException(status_code=409, detail="Export not ready yet")
+
+    if not os.path.exists(job.result["path"]):
+        raise HTTPException(status_code=410, detail="Export artifact expired")
+
+    return export_file_response(request, job.result)
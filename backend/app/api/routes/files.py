@@ -1,140 +1,123 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, status
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, Depends, HTTPException, Request, UploadFile, File, status
+from fastapi.responses import StreamingResponse
+import mimetypes
 import os
 import uuid
-import aiofiles
 from pathlib import Path
-import fitz  # PyMuPDF
-import mammoth
-from typing import Optional
+from typing import Optional, Dict, Any
+from datetime import datetime
 
 from app.core.config import settings
 from app.core.database import get_db
 from app.api.routes.auth import get_current_user
 from app.models.document import FileUpload, ParsedDocument
+from app.services.upload_pipeline import stream_upload_to_disk, UploadTooLarge
+from app.services.blob_store import blob_store
+from app.services.content_store import content_store
+from app.services.file_sniffer import sniff_file, SniffResult
+from app.services.file_serving import file_response
+from app.services.document_previews import document_previews, PREVIEW_VERSION
+from app.services.parse_pool import ParseError
+from app.services.parse_cache import parse_cached
+from app.services.parse_stream import stream_parse
 
 router = APIRouter()
 
+# Formats historiques de /parse : les variantes texte partagent le même parseur
+TEXT_FORMATS = {"text", "markdown", "csv", "json"}
+
+def parse_format(mime_type: str) -> str:
+    file_format = SniffResult(mime_type).format
+    if file_format in TEXT_FORMATS:
+        return "text"
+    return "binary" if file_format == "image" else file_format
+
 async def detect_file_format(file_path: str) -> str:
-    """Detect file format based on file signature"""
+    """Detect file format from a single read of the file signature"""
     try:
-        with open(file_path, 'rb') as f:
-            header = f.read(8)
-        
-        # PDF signature
-        if header.startswith(b'%PDF'):
-            return 'pdf'
-        
-        # DOCX signature (ZIP-based)
-        if header.startswith(b'PK\x03\x04'):
-            # Check if it's a DOCX by looking for specific content
-            try:
-                with open(file_path, 'rb') as f:
-                    content = f.read(1024)
-                if b'word/' in content or b'document.xml' in content:
-                    return 'docx'
-            except:
-                pass
-            return 'zip'
-        
-        # DOC signature
-        if header.startswith(b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1'):
-            return 'doc'
-        
-        # Try to decode as text
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                f.read(100)
-            return 'text'
-        except UnicodeDecodeError:
-            try:
-                with open(file_path, 'r', encoding='latin-1') as f:
-                    f.read(100)
-                return 'text'
-            except:
-                pass
-        
-        return 'binary'
-    
+        return parse_format(sniff_file(file_path).mime_type)
     except Exception:
         return 'unknown'
 
-async def parse_pdf(file_path: str) -> str:
-    """Parse PDF file and extract text"""
+async def parse_pdf(file_path: str, sha256: Optional[str] = None) -> Dict[str, Any]:
+    """Parse PDF file, returns the full text with per-page offsets"""
     try:
-        doc = fitz.open(file_path)
-        text = ""
-        for page in doc:
-            text += page.get_text()
-        doc.close()
-        return text.strip()
-    except Exception as e:
+        return await parse_cached("pdf", file_path, sha256)
+    except ParseError as e:
         raise Exception(f"Erreur lors du parsing PDF: {str(e)}")
 
-async def parse_docx(file_path: str) -> str:
+async def parse_docx(file_path: str, sha256: Optional[str] = None) -> str:
     """Parse DOCX file and extract text"""
     try:
-        with open(file_path, 'rb') as docx_file:
-            result = mammoth.extract_raw_text(docx_file)
-            return result.value.strip()
-    except Exception as e:
+        return await parse_cached("docx", file_path, sha256)
+    except ParseError as e:
         raise Exception(f"Erreur lors du parsing DOCX: {str(e)}")
 
-async def parse_text(file_path: str) -> str:
-    """Parse text file"""
+async def parse_text(file_path: str, sha256: Optional[str] = None) -> str:
+    """Parse text file (UTF-8, Latin-1 fallback)"""
     try:
-        async with aiofiles.open(file_path, 'r', encoding='utf-8') as f:
-            content = await f.read()
-            return content.strip()
-    except UnicodeDecodeError:
-        try:
-            async with aiofiles.open(file_path, 'r', encoding='latin-1') as f:
-                content = await f.read()
-                return content.strip()
-        except Exception as e:
-            raise Exception(f"Erreur lors de la lecture du fichier texte: {str(e)}")
+        return await parse_cached("text", file_path, sha256)
+    except ParseError as e:
+        raise Exception(f"Erreur lors de la lecture du fichier texte: {str(e)}")
 
 @router.post("/upload", response_model=FileUpload)
 async def upload_file(
     file: UploadFile = File(...),
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    session = Depends(get_db)
 ):
     # Validate file extension
     file_extension = Path(file.filename).suffix.lower()
-    if file_extension not in settings.ALLOWED_EXTENSIONS:
+    if file_extension not in settings.allowed_extensions:
         raise HTTPException(
             status_code=400,
-            detail=f"File type not allowed. Allowed types: {settings.ALLOWED_EXTENSIONS}"
+            detail=f"File type not allowed. Allowed types: {settings.allowed_extensions}"
         )
     
-    # Validate file size
-    if file.size > settings.MAX_FILE_SIZE:
-        raise HTTPException(
-            status_code=400,
-            detail=f"File too large. Maximum size: {settings.MAX_FILE_SIZE} bytes"
-        )
-    
-    # Generate unique filename
-    file_id = str(uuid.uuid4())
-    filename = f"{file_id}_{file.filename}"
-    file_path = Path(settings.UPLOAD_DIR) / filename
+    # Stream file to a temporary path, size is enforced on the bytes actually received
+    temp_path = blob_store.temp_path()
+    try:
+        stored = await stream_upload_to_disk(file, temp_path)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to save file: {str(e)}")
     
-    # Save file
+    # Content-addressed storage: a known blob is reused without rewriting its bytes
+    file_record = None
     try:
-        async with aiofiles.open(file_path, 'wb') as f:
-            content = await file.read()
-            await f.write(content)
+        created = blob_store.adopt(temp_path, stored.sha256)
+        file_record = await blob_store.register_file(
+            session,
+            sha256=stored.sha256,
+            size=stored.size,
+            mime_type=stored.mime_type,
+            filename=file.filename,
+            owner_id=current_user["id"]
+        )
+        
+        # Create file record
+        file_upload = FileUpload(
+            filename=file_record["filename"],
+            content_type=file_record["content_type"],
+            size=file_record["size"],
+            sha256=file_record["sha256"],
+            url=f"/api/files/{file_record['id']}",
+            document_id=None,
+            file_id=file_record["id"],
+            deduplicated=not created,
+            uploaded_at=file_record["uploaded_at"]
+        )
     except Exception as e:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        if file_record:
+            # The reference taken on the blob must not outlive a failed upload
+            await blob_store.release_file(session, file_record["id"])
         raise HTTPException(status_code=500, detail=f"Failed to save file: {str(e)}")
     
-    # Create file record
-    file_upload = FileUpload(
-        filename=filename,
-        content_type=file.content_type,
-        size=file.size,
-        url=f"/api/files/{filename}",
-        uploaded_at=datetime.now()
-    )
+    # Previews are rendered in the background, once per content hash
+    document_previews.submit(stored.sha256, stored.mime_type)
     
     return file_upload
 
@@ -146,32 +129,38 @@ async def parse_document(
     # Save temporary file
     temp_id = str(uuid.uuid4())
     temp_filename = f"temp_{temp_id}_{file.filename}"
-    temp_path = Path(settings.UPLOAD_DIR) / temp_filename
+    temp_path = Path(settings.upload_dir) / temp_filename
     
     try:
-        async with aiofiles.open(temp_path, 'wb') as f:
-            content = await file.read()
-            await f.write(content)
+        try:
+            stored = await stream_upload_to_disk(file, str(temp_path))
+        except UploadTooLarge as e:
+            raise HTTPException(status_code=413, detail=str(e))
         
-        # Detect file format
-        file_format = await detect_file_format(str(temp_path))
+        # Format detected while streaming the upload (no extra read)
+        file_format = parse_format(stored.mime_type)
         
         # Parse based on format
         parsed_content = ""
         error = None
         metadata = {
             "original_filename": file.filename,
-            "size": len(content),
+            "size": stored.size,
+            "sha256": stored.sha256,
+            "mime_type": stored.mime_type,
             "detected_format": file_format
         }
         
         try:
             if file_format == 'pdf':
-                parsed_content = await parse_pdf(str(temp_path))
+                extracted = await parse_pdf(str(temp_path), stored.sha256)
+                parsed_content = extracted["text"]
+                metadata["page_count"] = extracted["page_count"]
+                metadata["pages"] = extracted["pages"]
             elif file_format == 'docx':
-                parsed_content = await parse_docx(str(temp_path))
+                parsed_content = await parse_docx(str(temp_path), stored.sha256)
             elif file_format == 'text':
-                parsed_content = await parse_text(str(temp_path))
+                parsed_content = await parse_text(str(temp_path), stored.sha256)
             elif file_format == 'doc':
                 error = "Format DOC non supporté. Veuillez convertir en DOCX."
             elif file_format == 'binary':
@@ -195,23 +184,109 @@ async def parse_document(
         if temp_path.exists():
             temp_path.unlink()
 
-@router.get("/{filename}")
-async def get_file(filename: str):
-    file_path = Path(settings.UPLOAD_DIR) / filename
+@router.post("/parse/stream")
+async def parse_document_stream(
+    file: UploadFile = File(...),
+    current_user: dict = Depends(get_current_user)
+):
+    """Stream parse results as NDJSON: one record per page, section or CSV row chunk"""
+    temp_path = Path(settings.upload_dir) / f"temp_{uuid.uuid4()}_{os.path.basename(file.filename or '')}"
+    try:
+        stored = await stream_upload_to_disk(file, str(temp_path))
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    
+    return StreamingResponse(
+        stream_parse(str(temp_path), file.filename, stored.mime_type, delete_after=True),
+        media_type="application/x-ndjson"
+    )
+
+@router.post("/maintenance/gc")
+async def collect_unreferenced_blobs(
+    current_user: dict = Depends(get_current_user),
+    session = Depends(get_db)
+):
+    if current_user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    blobs = await blob_store.collect_garbage(session)
+    contents = await content_store.collect_garbage(session)
+    return {**blobs, **contents, "content_cache": content_store.stats()}
+
+async def resolve_file(session, file_id: str):
+    """Return (path, file record) for a logical file, falling back to legacy on-disk uploads"""
+    file_record = await blob_store.get_file(session, file_id)
+    if file_record:
+        return blob_store.blob_path(file_record["sha256"]), file_record
+    
+    legacy_path = Path(settings.upload_dir) / os.path.basename(file_id)
+    if legacy_path.is_file():
+        return legacy_path, None
+    return None, None
+
+@router.api_route("/{file_id}", methods=["GET", "HEAD"])
+async def get_file(file_id: str, request: Request, session = Depends(get_db)):
+    """Download a file: strong ETag (content hash), 304 revalidation and byte ranges for resumed downloads"""
+    file_path, file_record = await resolve_file(session, file_id)
     
-    if not file_path.exists():
+    if not file_path or not file_path.exists():
         raise HTTPException(status_code=404, detail="File not found")
     
-    return FileResponse(file_path)
+    if not file_record:
+        return file_response(request, str(file_path), media_type=mimetypes.guess_type(file_path.name)[0])
+    
+    return file_response(
+        request,
+        str(file_path),
+        filename=file_record["filename"],
+        media_type=file_record["content_type"],
+        content_key=file_record["sha256"]
+    )
+
+@router.get("/{file_id}/preview")
+async def get_file_preview(file_id: str, session = Depends(get_db)):
+    """Preview status and image URLs; a missing preview is queued for rendering"""
+    file_record = await blob_store.get_file(session, file_id)
+    if not file_record or not document_previews.supports(file_record["content_type"]):
+        raise HTTPException(status_code=404, detail="No preview available for this file")
+    
+    document_previews.submit(file_record["sha256"], file_record["content_type"])
+    return document_previews.describe(file_id, file_record["sha256"])
 
-@router.delete("/{filename}")
+@router.get("/{file_id}/preview/{image}")
+async def get_file_preview_image(file_id: str, image: str, request: Request, session = Depends(get_db)):
+    """Thumbnail or page image, cached as immutable (the URL carries the renderer version)"""
+    file_record = await blob_store.get_file(session, file_id)
+    if not file_record:
+        raise HTTPException(status_code=404, detail="File not found")
+    
+    image_path = document_previews.image_path(file_record["sha256"], image)
+    if image_path.suffix != ".jpg" or not image_path.is_file():
+        document_previews.submit(file_record["sha256"], file_record["content_type"])
+        raise HTTPException(status_code=404, detail="Preview not available yet")
+    
+    return file_response(
+        request,
+        str(image_path),
+        media_type="image/jpeg",
+        content_key=f"{file_record['sha256']}-v{PREVIEW_VERSION}-{image_path.stem}"
+    )
+
+@router.delete("/{file_id}")
 async def delete_file(
-    filename: str,
-    current_user: dict = Depends(get_current_user)
+    file_id: str,
+    current_user: dict = Depends(get_current_user),
+    session = Depends(get_db)
 ):
-    file_path = Path(settings.UPLOAD_DIR) / filename
+    owner_id = None if current_user["role"] == "admin" else current_user["id"]
+    
+    # The blob itself is only removed by garbage collection once unreferenced
+    if await blob_store.release_file(session, file_id, owner_id=owner_id):
+        return {"message": "File deleted successfully"}
+    
+    file_path = Path(settings.upload_dir) / os.path.basename(file_id)
     
-    if not file_path.exists():
+    if not file_path.is_file():
         raise HTTPException(status_code=404, detail="File not found")
     
     try:
@@ -5,9 +5,30 @@ from datetime import datetime
 
 from app.core.database import get_db
 from app.api.routes.auth import get_current_user
+from app.core.projection import Projection
 
 router = APIRouter()
 
+QCM_FIELDS = {
+    "id": "q.id",
+    "title": "q.title",
+    "description": "q.description",
+    "time_limit": "q.time_limit",
+    "attempts_allowed": "q.attempts_allowed",
+    "is_active": "q.is_active",
+    "created_at": "q.created_at",
+}
+
+QCM_LIST_FIELDS = {
+    **QCM_FIELDS,
+    "question_count": ("count(quest)", "OPTIONAL MATCH (q)-[:HAS_QUESTION]->(quest:Question)"),
+}
+
+QCM_DETAIL_FIELDS = {
+    **QCM_FIELDS,
+    "questions": "null",  # lues par une requête séparée, seulement si elles sont demandées
+}
+
 @router.post("/{course_id}/qcm")
 async def create_qcm(
     course_id: str,
@@ -107,6 +128,14 @@ async def create_qcm(
         question_record = await question_result.single()
         created_questions.append(dict(question_record))
     
+    # Invalider les exports en cache une fois le QCM complet
+    version_query = """
+    MATCH (c:Course {id: $course_id})
+    SET c.content_version = COALESCE(c.content_version, 0) + 1
+    """
+    
+    await session.run(version_query, course_id=course_id)
+    
     qcm_result = dict(qcm_record)
     qcm_result["questions"] = created_questions
     
@@ -115,21 +144,21 @@ async def create_qcm(
 @router.get("/{course_id}/qcm")
 async def get_course_qcms(
     course_id: str,
+    fields: Optional[str] = None,
     current_user: dict = Depends(get_current_user),
     session = Depends(get_db)
 ):
     """Récupérer tous les QCM d'un cours"""
     
-    query = """
-    MATCH (c:Course {id: $course_id})-[:HAS_QCM]->(q:QCM)
+    projection = Projection(QCM_LIST_FIELDS, fields, order_by="created_at")
+    
+    query = f"""
+    MATCH (c:Course {{id: $course_id}})-[:HAS_QCM]->(q:QCM)
     WHERE c.is_public = true OR c.teacher_id = $user_id OR 
-          EXISTS((u:User {id: $user_id})-[:ENROLLED_IN]->(c))
-    OPTIONAL MATCH (q)-[:HAS_QUESTION]->(quest:Question)
-    RETURN q.id as id, q.title as title, q.description as description,
-           q.time_limit as time_limit, q.attempts_allowed as attempts_allowed,
-           q.is_active as is_active, q.created_at as created_at,
-           count(quest) as question_count
-    ORDER BY q.created_at DESC
+          EXISTS((u:User {{id: $user_id}})-[:ENROLLED_IN]->(c))
+    {projection.matches()}
+    RETURN {projection.returns()}
+    ORDER BY created_at DESC
     """
     
     result = await session.run(query,
@@ -139,7 +168,7 @@ async def get_course_qcms(
     
     qcms = []
     async for record in result:
-        qcms.append(dict(record))
+        qcms.append(projection.row(record))
     
     return {"qcms": qcms}
 
@@ -147,19 +176,20 @@ async def get_course_qcms(
 async def get_qcm_details(
     course_id: str,
     qcm_id: str,
+    fields: Optional[str] = None,
     current_user: dict = Depends(get_current_user),
     session = Depends(get_db)
 ):
     """Récupérer les détails d'un QCM avec ses questions"""
     
+    projection = Projection(QCM_DETAIL_FIELDS, fields)
+    
     # Récupérer le QCM
-    qcm_query = """
-    MATCH (c:Course {id: $course_id})-[:HAS_QCM]->(q:QCM {id: $qcm_id})
+    qcm_query = f"""
+    MATCH (c:Course {{id: $course_id}})-[:HAS_QCM]->(q:QCM {{id: $qcm_id}})
     WHERE c.is_public = true OR c.teacher_id = $user_id OR 
-          EXISTS((u:User {id: $user_id})-[:ENROLLED_IN]->(c))
-    RETURN q.id as id, q.title as title, q.description as description,
-           q.time_limit as time_limit, q.attempts_allowed as attempts_allowed,
-           q.is_active as is_active, q.created_at as created_at
+          EXISTS((u:User {{id: $user_id}})-[:ENROLLED_IN]->(c))
+    RETURN {projection.returns()}
     """
     
     result = await session.run(qcm_query,
@@ -172,6 +202,10 @@ async def get_qcm_details(
     if not qcm:
         raise HTTPException(status_code=404, detail="QCM not found")
     
+    qcm_data = dict(qcm)
+    if "questions" not in projection:
+        return qcm_data
+    
     # Récupérer les questions
     questions_query = """
     MATCH (q:QCM {id: $qcm_id})-[:HAS_QUESTION]->(quest:Question)
@@ -187,7 +221,6 @@ async def get_qcm_details(
     async for record in questions_result:
         questions.append(dict(record))
     
-    qcm_data = dict(qcm)
     qcm_data["questions"] = questions
     
     return qcm_data
@@ -0,0 +1,34 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from typing import Optional
+
+from app.core.database import get_db
+from app.api.routes.auth import get_current_user
+from app.services.search_index import search_service
+
+router = APIRouter()
+
+@router.get("/")
+async def search(
+    q: str = Query(..., min_length=1, max_length=500),
+    course_id: Optional[str] = None,
+    type: Optional[str] = Query(None, pattern="^(block|document)$"),
+    limit: int = Query(20, ge=1, le=100),
+    current_user: dict = Depends(get_current_user),
+    session = Depends(get_db)
+):
+    """Recherche plein texte (BM25) dans les blocs de contenu et les documents des cours accessibles"""
+    results = await search_service.search(
+        session, current_user, q,
+        course_id=course_id,
+        unit_type=type,
+        limit=limit
+    )
+    return {"query": q, "count": len(results), "results": results}
+
+@router.get("/stats")
+async def search_stats(current_user: dict = Depends(get_current_user)):
+    """Taille de l'index de recherche du processus"""
+    if current_user.get("role") != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+
+    return search_service.stats()
@@ -5,27 +5,52 @@ from datetime import datetime
 
 from app.core.database import get_db
 from app.api.routes.auth import get_current_user
+from app.core.projection import Projection
+from app.services.content_store import content_store
+from app.services.search_index import search_service
 
 router = APIRouter()
 
+TEMPLATE_LIST_FIELDS = {
+    "id": "t.id",
+    "title": "t.title",
+    "description": "t.description",
+    "category": "t.category",
+    "difficulty": "t.difficulty",
+    "is_public": "t.is_public",
+    "created_at": "t.created_at",
+    "usage_count": "COALESCE(t.usage_count, 0)",
+}
+
+TEMPLATE_FIELDS = {
+    "id": "t.id",
+    "title": "t.title",
+    "description": "t.description",
+    "category": "t.category",
+    "difficulty": "t.difficulty",
+    "content": "t.content",
+    "created_at": "t.created_at",
+    "blocks": "null",  # lus par une requête séparée, seulement s'ils sont demandés
+}
+
 @router.get("/")
 async def get_templates(
     category: Optional[str] = None,
     search: Optional[str] = None,
+    fields: Optional[str] = None,
     current_user: dict = Depends(get_current_user),
     session = Depends(get_db)
 ):
     """Récupérer la liste des templates"""
     
-    query = """
+    projection = Projection(TEMPLATE_LIST_FIELDS, fields)
+    
+    query = f"""
     MATCH (t:Template)
     WHERE ($category IS NULL OR t.category = $category)
     AND ($search IS NULL OR t.title CONTAINS $search OR t.description CONTAINS $search)
     AND (t.is_public = true OR t.created_by = $user_id)
-    RETURN t.id as id, t.title as title, t.description as description,
-           t.category as category, t.difficulty as difficulty,
-           t.is_public as is_public, t.created_at as created_at,
-           t.usage_count as usage_count
+    RETURN {projection.returns()}
     ORDER BY t.usage_count DESC, t.created_at DESC
     """
     
@@ -37,27 +62,26 @@ async def get_templates(
     
     templates = []
     async for record in result:
-        template_data = dict(record)
-        template_data["usage_count"] = template_data.get("usage_count", 0)
-        templates.append(template_data)
+        templates.append(projection.row(record))
     
     return {"templates": templates}
 
 @router.get("/{template_id}")
 async def get_template(
     template_id: str,
+    fields: Optional[str] = None,
     current_user: dict = Depends(get_current_user),
     session = Depends(get_db)
 ):
     """Récupérer un template spécifique avec son contenu"""
     
+    projection = Projection(TEMPLATE_FIELDS, fields)
+    
     # Récupérer le template
-    template_query = """
-    MATCH (t:Template {id: $template_id})
+    template_query = f"""
+    MATCH (t:Template {{id: $template_id}})
     WHERE t.is_public = true OR t.created_by = $user_id
-    RETURN t.id as id, t.title as title, t.description as description,
-           t.category as category, t.difficulty as difficulty,
-           t.content as content, t.created_at as created_at
+    RETURN {projection.returns()}
     """
     
     result = await session.run(template_query,
@@ -69,11 +93,15 @@ async def get_template(
     if not template:
         raise HTTPException(status_code=404, detail="Template not found")
     
+    template_data = dict(template)
+    if "blocks" not in projection:
+        return template_data
+    
     # Récupérer les blocs du template
     blocks_query = """
     MATCH (t:Template {id: $template_id})-[:HAS_TEMPLATE_BLOCK]->(b:TemplateBlock)
     RETURN b.id as id, b.type as type, b.content as content,
-           b.position as position
+           b.content_ref as content_ref, b.position as position
     ORDER BY b.position ASC
     """
     
@@ -81,8 +109,8 @@ async def get_template(
     blocks = []
     async for record in blocks_result:
         blocks.append(dict(record))
+    content_store.resolve_rows(blocks)
     
-    template_data = dict(template)
     template_data["blocks"] = blocks
     
     return template_data
@@ -139,17 +167,22 @@ async def create_course_from_template(
     MATCH (u:User {id: $teacher_id})
     CREATE (u)-[:TEACHES]->(c)
     
-    // Copier les blocs du template
+    // Copier les blocs du template (une seule ligne en sortie, même sans bloc)
     WITH c, t
-    MATCH (t)-[:HAS_TEMPLATE_BLOCK]->(tb:TemplateBlock)
-    CREATE (c)-[:HAS_BLOCK]->(b:ContentBlock {
-        id: randomUUID(),
-        type: tb.type,
-        content: tb.content,
-        position: tb.position,
-        created_at: datetime(),
-        updated_at: datetime()
-    })
+    CALL {
+        WITH c, t
+        MATCH (t)-[:HAS_TEMPLATE_BLOCK]->(tb:TemplateBlock)
+        CREATE (c)-[:HAS_BLOCK]->(b:ContentBlock {
+            id: randomUUID(),
+            type: tb.type,
+            content: tb.content,
+            content_ref: tb.content_ref,
+            position: tb.position,
+            created_at: datetime(),
+            updated_at: datetime()
+        })
+        RETURN collect({id: b.id, type: b.type, content: b.content, content_ref: b.content_ref}) as blocks
+    }
     
     // Incrémenter le compteur d'usage du template
     SET t.usage_count = COALESCE(t.usage_count, 0) + 1
@@ -157,7 +190,7 @@ async def create_course_from_template(
     RETURN c.id as id, c.title as title, c.description as description,
            c.category as category, c.difficulty as difficulty,
            c.is_public as is_public, c.teacher_id as teacher_id,
-           c.created_at as created_at
+           c.created_at as created_at, blocks
     """
     
     result = await session.run(create_course_query,
@@ -177,6 +210,11 @@ async def create_course_from_template(
         raise HTTPException(status_code=400, detail="Failed to create course from template")
     
     course_data = dict(record)
+    blocks = course_data.pop("blocks")
+    content_store.resolve_rows(blocks)
+    for block in blocks:
+        search_service.index_block(course_id, block["id"], block["content"], block["type"])
+
     course_data["student_count"] = 0
     course_data["document_count"] = 0
     
@@ -1,33 +1,49 @@
 from fastapi import APIRouter, Depends, HTTPException
-from typing import List
+from typing import List, Optional
 
 from app.core.database import get_db
 from app.api.routes.auth import get_current_user
 from app.models.user import User, UserUpdate
+from app.core.projection import Projection
 
 router = APIRouter()
 
+USER_FIELDS = {
+    "id": "u.id",
+    "email": "u.email",
+    "full_name": "u.full_name",
+    "role": "u.role",
+    "is_active": "u.is_active",
+    "created_at": "u.created_at",
+    "updated_at": "u.updated_at",
+}
+
 @router.get("/test")
 async def users_test():
     return {"message": "Users module loaded"}
 
 @router.get("/", response_model=List[User])
 async def get_users(
+    fields: Optional[str] = None,
     current_user: dict = Depends(get_current_user),
     session = Depends(get_db)
 ):
     if current_user["role"] != "admin":
         raise HTTPException(status_code=403, detail="Admin access required")
     
-    query = """
+    projection = Projection(USER_FIELDS, fields)
+    
+    query = f"""
     MATCH (u:User)
-    RETURN u.id as id, u.email as email, u.full_name as full_name,
-           u.role as role, u.is_active as is_active,
-           u.created_at as created_at, u.updated_at as updated_at
+    RETURN {projection.returns()}
     ORDER BY u.created_at DESC
     """
     
     result = await session.run(query)
+    
+    if projection.partial:
+        return projection.response([projection.row(record) async for record in result])
+    
     users = []
     async for record in result:
         users.append(User(**dict(record)))
@@ -37,17 +53,18 @@ async def get_users(
 @router.get("/{user_id}", response_model=User)
 async def get_user(
     user_id: str,
+    fields: Optional[str] = None,
     current_user: dict = Depends(get_current_user),
     session = Depends(get_db)
 ):
     if current_user["role"] != "admin" and current_user["id"] != user_id:
         raise HTTPException(status_code=403, detail="Access denied")
     
-    query = """
-    MATCH (u:User {id: $user_id})
-    RETURN u.id as id, u.email as email, u.full_name as full_name,
-           u.role as role, u.is_active as is_active,
-           u.created_at as created_at, u.updated_at as updated_at
+    projection = Projection(USER_FIELDS, fields)
+    
+    query = f"""
+    MATCH (u:User {{id: $user_id}})
+    RETURN {projection.returns()}
     """
     
     result = await session.run(query, user_id=user_id)
@@ -56,6 +73,9 @@ async def get_user(
     if not record:
         raise HTTPException(status_code=404, detail="User not found")
     
+    if projection.partial:
+        return projection.response(projection.row(record))
+    
     return User(**dict(record))
 
 @router.put("/{user_id}", response_model=User)
@@ -13,16 +13,54 @@ class Settings(BaseSettings):
     algorithm: str = os.getenv("ALGORITHM", "HS256")
     access_token_expire_minutes: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
     
-    # CORSapp.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # Au lieu de votre liste spécifique
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-
     # File Upload
     upload_dir: str = os.getenv("UPLOAD_DIR", "uploads")
     max_file_size: int = int(os.getenv("MAX_FILE_SIZE", "10485760"))  # 10MB
+    allowed_extensions: List[str] = [".pdf", ".docx", ".txt", ".md", ".csv", ".json"]
+    blob_gc_grace_seconds: int = int(os.getenv("BLOB_GC_GRACE_SECONDS", "3600"))
+    
+    # Export jobs
+    export_dir: str = os.getenv("EXPORT_DIR", "exports")
+    export_workers: int = int(os.getenv("EXPORT_WORKERS", "2"))
+    export_queue_size: int = int(os.getenv("EXPORT_QUEUE_SIZE", "100"))
+    export_retention_seconds: int = int(os.getenv("EXPORT_RETENTION_SECONDS", "3600"))  # 1h
+    export_max_storage_bytes: int = int(os.getenv("EXPORT_MAX_STORAGE_BYTES", "524288000"))  # 500MB
+    pdf_workers: int = int(os.getenv("PDF_WORKERS", "2"))
+    # PDF_CACHE_MAX_BYTES : ancien nom, quand seuls les PDF étaient en cache
+    export_cache_max_bytes: int = int(os.getenv("EXPORT_CACHE_MAX_BYTES", os.getenv("PDF_CACHE_MAX_BYTES", "524288000")))  # 500MB
+    
+    # Document parsing
+    parse_workers: int = int(os.getenv("PARSE_WORKERS", "2"))
+    parse_timeout_seconds: int = int(os.getenv("PARSE_TIMEOUT_SECONDS", "60"))
+    parse_max_rss_mb: int = int(os.getenv("PARSE_MAX_RSS_MB", "512"))
+    parse_max_queue: int = int(os.getenv("PARSE_MAX_QUEUE", "100"))
+    parse_max_attempts: int = int(os.getenv("PARSE_MAX_ATTEMPTS", "3"))
+    parse_stuck_seconds: int = int(os.getenv("PARSE_STUCK_SECONDS", "300"))
+    parse_sweep_interval_seconds: int = int(os.getenv("PARSE_SWEEP_INTERVAL_SECONDS", "60"))
+    parse_max_pages: int = int(os.getenv("PARSE_MAX_PAGES", "2000"))
+    parse_max_chars: int = int(os.getenv("PARSE_MAX_CHARS", "20000000"))
+    pdf_pages_per_task: int = int(os.getenv("PDF_PAGES_PER_TASK", "20"))
+    document_chunk_chars: int = int(os.getenv("DOCUMENT_CHUNK_CHARS", "16000"))
+    csv_batch_rows: int = int(os.getenv("CSV_BATCH_ROWS", "10000"))
+    document_snapshot_interval: int = int(os.getenv("DOCUMENT_SNAPSHOT_INTERVAL", "10"))
+    document_history_keep_versions: int = int(os.getenv("DOCUMENT_HISTORY_KEEP_VERSIONS", "0"))  # 0 = tout garder
+    preview_workers: int = int(os.getenv("PREVIEW_WORKERS", "1"))
+    preview_max_queue: int = int(os.getenv("PREVIEW_MAX_QUEUE", "200"))
+    preview_timeout_seconds: int = int(os.getenv("PREVIEW_TIMEOUT_SECONDS", "60"))
+    preview_thumbnail_width: int = int(os.getenv("PREVIEW_THUMBNAIL_WIDTH", "240"))  # pixels
+    preview_page_width: int = int(os.getenv("PREVIEW_PAGE_WIDTH", "800"))  # pixels
+    preview_max_pages: int = int(os.getenv("PREVIEW_MAX_PAGES", "10"))
+    parse_cache_max_bytes: int = int(os.getenv("PARSE_CACHE_MAX_BYTES", "209715200"))  # 200MB
+    content_store_threshold_bytes: int = int(os.getenv("CONTENT_STORE_THRESHOLD_BYTES", "8192"))  # 8KB
+    content_cache_max_bytes: int = int(os.getenv("CONTENT_CACHE_MAX_BYTES", "33554432"))  # 32MB
+    
+    # Course import
+    import_batch_courses: int = int(os.getenv("IMPORT_BATCH_COURSES", "50"))
+    import_batch_rows: int = int(os.getenv("IMPORT_BATCH_ROWS", "5000"))
+    import_max_line_bytes: int = int(os.getenv("IMPORT_MAX_LINE_BYTES", "16777216"))  # 16MB par cours NDJSON
+    
+    # Startup
+    startup_budget_ms: int = int(os.getenv("STARTUP_BUDGET_MS", "2000"))
     
     # Environment
     environment: str = os.getenv("ENVIRONMENT", "development")
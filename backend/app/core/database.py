@@ -47,6 +47,8 @@ async def init_db():
             "CREATE CONSTRAINT user_email IF NOT EXISTS FOR (u:User) REQUIRE u.email IS UNIQUE",
             "CREATE CONSTRAINT course_id IF NOT EXISTS FOR (c:Course) REQUIRE c.id IS UNIQUE",
             "CREATE CONSTRAINT document_id IF NOT EXISTS FOR (d:Document) REQUIRE d.id IS UNIQUE",
+            "CREATE CONSTRAINT file_id IF NOT EXISTS FOR (f:File) REQUIRE f.id IS UNIQUE",
+            "CREATE CONSTRAINT blob_sha256 IF NOT EXISTS FOR (b:Blob) REQUIRE b.sha256 IS UNIQUE",
         ]
         
         for constraint in constraints:
@@ -61,6 +63,8 @@ async def init_db():
             "CREATE INDEX user_id IF NOT EXISTS FOR (u:User) ON (u.id)",
             "CREATE INDEX course_title IF NOT EXISTS FOR (c:Course) ON (c.title)",
             "CREATE INDEX document_title IF NOT EXISTS FOR (d:Document) ON (d.title)",
+            "CREATE INDEX document_chunk IF NOT EXISTS FOR (c:DocumentChunk) ON (c.document_id, c.index)",
+            "CREATE INDEX document_version IF NOT EXISTS FOR (v:DocumentVersion) ON (v.document_id, v.version)",
         ]
         
         for index in indexes:
@@ -0,0 +1,68 @@
+from typing import Dict, Any, Iterable, Optional, Tuple, Union
+
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+# Champ exposé -> expression Cypher, ou (expression, clause MATCH nécessaire à ce seul champ)
+FieldSpec = Union[str, Tuple[str, str]]
+
+
+class Projection:
+    """Champs demandés par `?fields=a,b`, traduits en RETURN Cypher.
+
+    Sans `fields`, tous les champs sont renvoyés. Les clauses liées à un champ
+    (OPTIONAL MATCH d'un compteur...) ne sont ajoutées que si le champ est demandé.
+    """
+
+    def __init__(self, fields: Dict[str, FieldSpec], requested: Optional[str] = None,
+                 always: Iterable[str] = ("id",), order_by: Optional[str] = None):
+        self.fields = {
+            name: spec if isinstance(spec, tuple) else (spec, None)
+            for name, spec in fields.items()
+        }
+        self.partial = requested is not None
+        if requested is None:
+            self.selected = list(self.fields)
+        else:
+            names = [name.strip() for name in requested.split(",") if name.strip()]
+            unknown = [name for name in names if name not in self.fields]
+            if unknown:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Unknown fields: {', '.join(unknown)}. Available: {', '.join(self.fields)}"
+                )
+            self.selected = list(dict.fromkeys([*always, *names]))
+        # Clé de tri lue même si elle n'est pas demandée, retirée des résultats
+        self.hidden = [order_by] if order_by and order_by not in self.selected else []
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.selected
+
+    def matches(self) -> str:
+        clauses = [self.fields[name][1] for name in self.selected if self.fields[name][1]]
+        return "\n".join(dict.fromkeys(clauses))
+
+    def returns(self) -> str:
+        return ", ".join(f"{self.fields[name][0]} as {name}" for name in [*self.selected, *self.hidden])
+
+    def row(self, record) -> Dict[str, Any]:
+        data = dict(record)
+        for name in self.hidden:
+            data.pop(name, None)
+        return data
+
+    def response(self, content: Any) -> JSONResponse:
+        """Réponse partielle : le response_model de la route exige tous les champs"""
+        return JSONResponse(content=jsonable_encoder(_native(content)))
+
+
+def _native(value: Any) -> Any:
+    # Types temporels Neo4j -> datetime Python, sérialisables par jsonable_encoder
+    if hasattr(value, "to_native"):
+        return value.to_native()
+    if isinstance(value, dict):
+        return {key: _native(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_native(item) for item in value]
+    return value
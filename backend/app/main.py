@@ -80,13 +80,14 @@ db = Neo4jConnection()
 
 # Import des routes
 try:
-    from app.api.routes import course_content, templates, qcm, analytics, export
+    from app.api.routes import course_content, templates, qcm, analytics, export, search
     
     app.include_router(course_content.router, prefix="/api/courses", tags=["course-content"])
     app.include_router(templates.router, prefix="/api/templates", tags=["templates"])
     app.include_router(qcm.router, prefix="/api/courses", tags=["qcm"])
     app.include_router(analytics.router, prefix="/api/courses", tags=["analytics"])
     app.include_router(export.router, prefix="/api/courses", tags=["export"])
+    app.include_router(search.router, prefix="/api/search", tags=["search"])
     
     print("✅ All API routes loaded successfully")
     
@@ -106,7 +107,8 @@ async def root():
             "/api/templates",
             "/api/courses/{id}/qcm",
             "/api/courses/{id}/analytics",
-            "/api/courses/{id}/export"
+            "/api/courses/{id}/export",
+            "/api/search"
         ]
     }
 
@@ -26,6 +26,61 @@ class Document(DocumentBase):
     updated_at: Optional[datetime] = None
     version: int = 1
 
+class DocumentResponse(BaseModel):
+    id: str
+    title: str
+    description: Optional[str] = None
+    filename: str
+    file_id: Optional[str] = None
+    thumbnail_url: Optional[str] = None
+    content: Optional[Any] = None
+    metadata: Dict[str, Any] = {}
+    parsed_successfully: bool = False
+    status: str = "parsed"  # pending, processing, parsed, failed
+    parse_error: Optional[str] = None
+    content_length: Optional[int] = None
+    chunk_count: Optional[int] = None
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+
+class DocumentChunkInfo(BaseModel):
+    index: int
+    start: int
+    end: int
+    size: int
+
+class DocumentContentRange(BaseModel):
+    document_id: str
+    start: int
+    end: int
+    content_length: int
+    content: str
+
+class DocumentVersionInfo(BaseModel):
+    version: int
+    kind: str  # snapshot, delta
+    size: int
+    title: Optional[str] = None
+    author_id: Optional[str] = None
+    created_at: datetime
+
+class DocumentVersionContent(BaseModel):
+    document_id: str
+    version: int
+    title: Optional[str] = None
+    author_id: Optional[str] = None
+    created_at: datetime
+    content: str
+
+class DocumentParseStatus(BaseModel):
+    id: str
+    status: str
+    parsed_successfully: bool = False
+    parse_attempts: int = 0
+    parse_error: Optional[str] = None
+    parsed_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
 class DocumentWithCourse(Document):
     course_title: str
     course_category: str
@@ -34,8 +89,11 @@ class FileUpload(BaseModel):
     filename: str
     content_type: str
     size: int
+    sha256: Optional[str] = None
     url: str
     document_id: Optional[str] = None
+    file_id: Optional[str] = None
+    deduplicated: bool = False
     uploaded_at: datetime
 
 class ParsedDocument(BaseModel):
@@ -44,3 +102,21 @@ class ParsedDocument(BaseModel):
     format: str
     metadata: Dict[str, Any] = {}
     error: Optional[str] = None
+
+class PageOffset(BaseModel):
+    page: int
+    start: int
+    end: int
+
+class ParseResult(BaseModel):
+    """Résultat commun à tous les backends du moteur de parsing"""
+    success: bool
+    format: str
+    content: Optional[Any] = None
+    page_count: Optional[int] = None
+    pages: List[PageOffset] = []
+    metadata: Dict[str, Any] = {}
+    truncated: bool = False
+    parser: Optional[str] = None
+    duration_ms: Optional[float] = None
+    error: Optional[str] = None
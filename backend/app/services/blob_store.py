@@ -0,0 +1,154 @@
+import os
+import shutil
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, Any, Optional, List
+
+from app.core.config import settings
+
+
+class BlobStore:
+    """Stockage des uploads adressé par contenu (SHA-256), avec comptage de références dans Neo4j"""
+
+    def __init__(self, root: str = os.path.join(settings.upload_dir, "blobs"),
+                 gc_grace_seconds: int = settings.blob_gc_grace_seconds):
+        self.root = Path(root)
+        self.tmp_dir = self.root / "tmp"
+        self.gc_grace_seconds = gc_grace_seconds
+
+    def temp_path(self) -> str:
+        """Chemin d'écriture temporaire, sur le même disque que les blobs (rename atomique)"""
+        self.tmp_dir.mkdir(parents=True, exist_ok=True)
+        return str(self.tmp_dir / f"{uuid.uuid4()}.upload")
+
+    def blob_path(self, sha256: str) -> Path:
+        sha256 = os.path.basename(sha256)
+        return self.root / sha256[:2] / sha256[2:4] / sha256
+
+    def exists(self, sha256: str) -> bool:
+        return self.blob_path(sha256).is_file()
+
+    def adopt(self, temp_path: str, sha256: str) -> bool:
+        """Déplacer un upload temporaire vers son blob; retourne False si le blob existait déjà"""
+        path = self.blob_path(sha256)
+        if path.is_file():
+            # Contenu déjà connu : on jette la copie temporaire sans réécrire le blob
+            os.remove(temp_path)
+            os.utime(path)  # protège le blob d'un ramasse-miettes concurrent
+            return False
+        path.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(temp_path, path)
+        return True
+
+    async def register_file(self, session, sha256: str, size: int, mime_type: str,
+                            filename: str, owner_id: Optional[str]) -> Dict[str, Any]:
+        """Créer l'enregistrement logique d'un fichier et incrémenter la référence du blob"""
+        query = """
+        MERGE (b:Blob {sha256: $sha256})
+        ON CREATE SET b.size = $size, b.mime_type = $mime_type,
+                      b.ref_count = 0, b.created_at = datetime()
+        SET b.ref_count = b.ref_count + 1, b.released_at = null
+        CREATE (f:File {
+            id: $file_id,
+            filename: $filename,
+            content_type: $mime_type,
+            size: $size,
+            sha256: $sha256,
+            owner_id: $owner_id,
+            uploaded_at: datetime()
+        })
+        CREATE (f)-[:STORES]->(b)
+        RETURN f.id as id, f.filename as filename, f.content_type as content_type,
+               f.size as size, f.sha256 as sha256, f.uploaded_at as uploaded_at,
+               b.ref_count as ref_count
+        """
+        result = await session.run(query,
+            sha256=sha256,
+            size=size,
+            mime_type=mime_type,
+            file_id=str(uuid.uuid4()),
+            filename=filename,
+            owner_id=owner_id
+        )
+        record = await result.single()
+        file_record = dict(record)
+        # DateTime Neo4j -> datetime Python (validé par les modèles de réponse)
+        file_record["uploaded_at"] = file_record["uploaded_at"].to_native()
+        return file_record
+
+    async def get_file(self, session, file_id: str) -> Optional[Dict[str, Any]]:
+        query = """
+        MATCH (f:File {id: $file_id})-[:STORES]->(b:Blob)
+        RETURN f.id as id, f.filename as filename, f.content_type as content_type,
+               f.size as size, f.sha256 as sha256, f.owner_id as owner_id,
+               f.uploaded_at as uploaded_at
+        """
+        result = await session.run(query, file_id=file_id)
+        record = await result.single()
+        return dict(record) if record else None
+
+    async def get_files(self, session, file_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        query = """
+        MATCH (f:File)-[:STORES]->(b:Blob)
+        WHERE f.id IN $file_ids
+        RETURN f.id as id, f.filename as filename, f.sha256 as sha256, f.size as size
+        """
+        result = await session.run(query, file_ids=file_ids)
+        return {record["id"]: dict(record) async for record in result}
+
+    async def release_file(self, session, file_id: str, owner_id: Optional[str] = None) -> bool:
+        """Supprimer l'enregistrement logique et décrémenter la référence du blob"""
+        query = """
+        MATCH (f:File {id: $file_id})-[:STORES]->(b:Blob)
+        WHERE $owner_id IS NULL OR f.owner_id = $owner_id
+        DETACH DELETE f
+        SET b.ref_count = b.ref_count - 1,
+            b.released_at = CASE WHEN b.ref_count - 1 <= 0 THEN datetime() ELSE null END
+        RETURN count(b) as released
+        """
+        result = await session.run(query, file_id=file_id, owner_id=owner_id)
+        record = await result.single()
+        return bool(record and record["released"])
+
+    async def collect_garbage(self, session) -> Dict[str, Any]:
+        """Supprimer les blobs sans référence depuis plus que le délai de grâce"""
+        query = """
+        MATCH (b:Blob)
+        WHERE b.ref_count <= 0
+          AND b.released_at < datetime() - duration({seconds: $grace_seconds})
+          AND NOT EXISTS { MATCH (:File)-[:STORES]->(b) }
+        WITH b, b.sha256 as sha256, b.size as size
+        DETACH DELETE b
+        RETURN sha256, size
+        """
+        result = await session.run(query, grace_seconds=self.gc_grace_seconds)
+        removed = []
+        freed = 0
+        now = time.time()
+        async for record in result:
+            path = self.blob_path(record["sha256"])
+            try:
+                # Un upload du même contenu vient de réutiliser le fichier : on le garde
+                if now - path.stat().st_mtime < self.gc_grace_seconds:
+                    continue
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            # Aperçus rendus à côté du blob
+            for preview_dir in path.parent.glob(f"{path.name}.preview-v*"):
+                shutil.rmtree(preview_dir, ignore_errors=True)
+            removed.append(record["sha256"])
+            freed += record["size"] or 0
+
+        # Fichiers temporaires abandonnés (upload interrompu)
+        if self.tmp_dir.exists():
+            for path in self.tmp_dir.iterdir():
+                if now - path.stat().st_mtime > self.gc_grace_seconds:
+                    path.unlink(missing_ok=True)
+
+        return {"removed_blobs": len(removed), "freed_bytes": freed}
+
+
+# Instance globale
+blob_store = BlobStore()
@@ -0,0 +1,142 @@
+import hashlib
+import os
+import threading
+import time
+import uuid
+import zlib
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Any, Iterable, Optional, Tuple
+
+from app.core.config import settings
+
+# Nœuds dont le texte peut être sorti du graphe (propriétés content / content_ref)
+CONTENT_LABELS = ("Document", "DocumentChunk", "DocumentVersion", "ContentBlock", "TemplateBlock")
+
+
+class ContentStore:
+    """Textes volumineux hors du graphe : fichiers zlib adressés par SHA-256, corps chauds dans un LRU borné"""
+
+    def __init__(self, root: str = os.path.join(settings.upload_dir, "content"),
+                 threshold_bytes: int = settings.content_store_threshold_bytes,
+                 cache_max_bytes: int = settings.content_cache_max_bytes,
+                 gc_grace_seconds: int = settings.blob_gc_grace_seconds):
+        self.root = Path(root)
+        self.threshold_bytes = threshold_bytes
+        self.cache_max_bytes = cache_max_bytes
+        self.gc_grace_seconds = gc_grace_seconds
+        self._cache: "OrderedDict[str, str]" = OrderedDict()
+        self._cache_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def path_for(self, ref: str) -> Path:
+        ref = os.path.basename(ref)
+        return self.root / ref[:2] / f"{ref}.z"
+
+    # Écriture
+
+    def put(self, text: str) -> str:
+        """Stocker un texte et retourner sa référence (SHA-256 du texte UTF-8)"""
+        data = text.encode("utf-8")
+        ref = hashlib.sha256(data).hexdigest()
+        path = self.path_for(ref)
+        if path.is_file():
+            os.utime(path)  # protège le fichier d'un ramasse-miettes concurrent
+        else:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            temp_path = path.with_name(f"{uuid.uuid4()}.tmp")
+            temp_path.write_bytes(zlib.compress(data, 6))
+            os.replace(temp_path, path)
+        self._remember(ref, text)
+        return ref
+
+    def externalize(self, content: Any) -> Tuple[Any, Optional[str]]:
+        """(valeur à écrire dans content, content_ref) : au-delà du seuil, le texte part dans le store"""
+        if isinstance(content, str) and len(content) * 4 >= self.threshold_bytes:
+            if len(content.encode("utf-8")) >= self.threshold_bytes:
+                return None, self.put(content)
+        return content, None
+
+    # Lecture
+
+    def get(self, ref: str) -> str:
+        with self._lock:
+            text = self._cache.get(ref)
+            if text is not None:
+                self._cache.move_to_end(ref)
+                self.hits += 1
+                return text
+            self.misses += 1
+        text = zlib.decompress(self.path_for(ref).read_bytes()).decode("utf-8")
+        self._remember(ref, text)
+        return text
+
+    def resolve(self, content: Any, ref: Optional[str]) -> Any:
+        """Contenu d'un nœud : la propriété inline, ou le corps décompressé à la demande"""
+        return self.get(ref) if ref else content
+
+    def resolve_rows(self, rows: Iterable[Dict[str, Any]], field: str = "content") -> None:
+        """Remplacer, dans des lignes de résultat, `content_ref` par le contenu correspondant"""
+        for row in rows:
+            ref = row.pop(f"{field}_ref", None)
+            if ref:
+                row[field] = self.get(ref)
+
+    def _remember(self, ref: str, text: str) -> None:
+        size = len(text)
+        if size > self.cache_max_bytes // 4:
+            return  # un seul corps ne doit pas vider le cache
+        with self._lock:
+            if ref in self._cache:
+                self._cache.move_to_end(ref)
+                return
+            self._cache[ref] = text
+            self._cache_bytes += size
+            while self._cache_bytes > self.cache_max_bytes:
+                _, evicted = self._cache.popitem(last=False)
+                self._cache_bytes -= len(evicted)
+
+    # Maintenance
+
+    async def collect_garbage(self, session) -> Dict[str, Any]:
+        """Supprimer les corps qu'aucun nœud ne référence plus (marquage puis balayage)"""
+        referenced = set()
+        for label in CONTENT_LABELS:
+            result = await session.run(f"""
+            MATCH (n:{label}) WHERE n.content_ref IS NOT NULL
+            RETURN DISTINCT n.content_ref as ref
+            """)
+            referenced.update([record["ref"] async for record in result])
+
+        removed = 0
+        freed = 0
+        now = time.time()
+        if self.root.exists():
+            for path in self.root.glob("*/*"):
+                stat = path.stat()
+                # Écrit récemment : le nœud qui le référence est peut-être en cours de création
+                if now - stat.st_mtime < self.gc_grace_seconds:
+                    continue
+                if path.suffix == ".z" and path.stem in referenced:
+                    continue
+                path.unlink(missing_ok=True)
+                removed += 1
+                freed += stat.st_size
+        return {"removed_contents": removed, "freed_content_bytes": freed}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "cached_entries": len(self._cache),
+                "cached_bytes": self._cache_bytes,
+                "max_bytes": self.cache_max_bytes,
+                "threshold_bytes": self.threshold_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+# Instance globale
+content_store = ContentStore()
@@ -0,0 +1,176 @@
+import asyncio
+import io
+import json
+import os
+import re
+import zipfile
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, List, AsyncIterator, Optional, Tuple
+
+from app.core.config import settings
+from app.core.database import neo4j_connection
+from app.services.blob_store import blob_store
+from app.services.course_export import fetch_course_export_data, render_export, EXPORT_FORMATS
+
+FILE_CHUNK_SIZE = 64 * 1024
+FILE_REFERENCE_PATTERN = re.compile(r"/api/files/([^\"'\s<>()?#]+)")
+
+
+class _ChunkSink(io.RawIOBase):
+    """Flux non positionnable : zipfile y écrit, le générateur vide les octets produits"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _slugify(value: str, max_length: int = 60) -> str:
+    slug = re.sub(r"[^\w\-]+", "_", value or "", flags=re.UNICODE).strip("_")
+    return slug[:max_length] or "cours"
+
+
+def referenced_files(course_data: Dict[str, Any]) -> List[str]:
+    """Fichiers uploadés référencés par les blocs du cours (/api/files/<nom>)"""
+    names = []
+    for block in course_data.get("blocks", []):
+        for match in FILE_REFERENCE_PATTERN.finditer(block.get("content") or ""):
+            name = os.path.basename(match.group(1))
+            if name and name not in names:
+                names.append(name)
+    return names
+
+
+async def list_owned_course_ids(session, current_user: dict) -> List[str]:
+    """Tous les cours que l'utilisateur peut exporter"""
+    query = """
+    MATCH (c:Course)
+    WHERE c.teacher_id = $user_id OR $user_role = 'admin'
+    RETURN c.id as id
+    ORDER BY c.created_at ASC
+    """
+    result = await session.run(query,
+        user_id=current_user["id"],
+        user_role=current_user.get("role", "student")
+    )
+    return [record["id"] async for record in result]
+
+
+async def _load_course(course_id: str, current_user: dict, include_qcms: bool,
+                       include_files: bool) -> Optional[Dict[str, Any]]:
+    # Une session par cours : les lectures sont lancées en parallèle de la compression
+    async with neo4j_connection.get_session() as session:
+        course_data = await fetch_course_export_data(session, course_id, current_user, include_qcms=include_qcms)
+        if course_data and include_files:
+            names = referenced_files(course_data)
+            course_data["_files"] = await _resolve_files(session, names) if names else []
+        return course_data
+
+
+async def _resolve_files(session, names: List[str]) -> List[Tuple[str, str, Path]]:
+    """(référence, nom d'entrée, chemin) des fichiers : blobs adressés par contenu ou anciens uploads"""
+    records = await blob_store.get_files(session, names)
+    files = []
+    for name in names:
+        record = records.get(name)
+        if record:
+            files.append((name, f"{name}_{os.path.basename(record['filename'])}", blob_store.blob_path(record["sha256"])))
+        else:
+            files.append((name, name, Path(settings.upload_dir) / name))
+    return files
+
+
+async def stream_course_archive(
+    course_ids: List[str],
+    current_user: dict,
+    export_format: str = "json",
+    include_qcms: bool = True,
+    include_files: bool = True
+) -> AsyncIterator[bytes]:
+    """Produire une archive ZIP des cours au fil de l'eau, sans la matérialiser"""
+    sink = _ChunkSink()
+    archive = zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_DEFLATED)
+    suffix = EXPORT_FORMATS[export_format][1]
+    manifest = {"exported_at": datetime.now().isoformat(), "format": export_format, "courses": [], "skipped": []}
+    added_files = set()
+
+    async def write_entry(name: str, chunks) -> AsyncIterator[bytes]:
+        entry = archive.open(name, mode="w", force_zip64=True)
+        for chunk in chunks:
+            # La compression zlib libère le GIL : elle tourne hors de la boucle d'événements
+            await asyncio.to_thread(entry.write, chunk)
+            data = sink.drain()
+            if data:
+                yield data
+        await asyncio.to_thread(entry.close)
+        yield sink.drain()
+
+    def read_file_chunks(path: Path):
+        with open(path, "rb") as f:
+            while True:
+                chunk = f.read(FILE_CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield chunk
+
+    def load(course_id: str) -> asyncio.Task:
+        return asyncio.create_task(_load_course(course_id, current_user, include_qcms, include_files))
+
+    next_load = load(course_ids[0]) if course_ids else None
+    try:
+        for index, course_id in enumerate(course_ids):
+            course_data = await next_load
+            # Lire le cours suivant pendant que celui-ci est rendu et compressé
+            next_load = load(course_ids[index + 1]) if index + 1 < len(course_ids) else None
+
+            if not course_data:
+                manifest["skipped"].append({"course_id": course_id, "reason": "not found or not authorized"})
+                continue
+
+            files = course_data.pop("_files", [])
+            content, _ = await asyncio.to_thread(render_export, course_data, export_format, current_user["id"])
+            entry_name = f"courses/{index + 1:03d}_{_slugify(course_data['title'])}_{course_id}{suffix}"
+            chunks = (content[i:i + FILE_CHUNK_SIZE] for i in range(0, len(content), FILE_CHUNK_SIZE))
+            async for data in write_entry(entry_name, chunks):
+                yield data
+
+            # Le manifeste ne liste que les entrées réellement présentes dans l'archive
+            course_files = []
+            for name, entry, file_path in files:
+                if name not in added_files:
+                    if not file_path.is_file():
+                        manifest["skipped"].append({"course_id": course_id, "file": f"files/{entry}",
+                                                    "reason": "missing on disk"})
+                        continue
+                    added_files.add(name)
+                    async for data in write_entry(f"files/{entry}", read_file_chunks(file_path)):
+                        yield data
+                course_files.append(f"files/{entry}")
+
+            manifest["courses"].append({
+                "id": course_id,
+                "title": course_data["title"],
+                "entry": entry_name,
+                "files": course_files,
+            })
+
+        manifest_bytes = json.dumps(manifest, indent=2, ensure_ascii=False).encode("utf-8")
+        async for data in write_entry("manifest.json", [manifest_bytes]):
+            yield data
+
+        archive.close()
+        yield sink.drain()
+    finally:
+        if next_load is not None and not next_load.done():
+            next_load.cancel()
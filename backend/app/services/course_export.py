@@ -0,0 +1,174 @@
+import json
+from datetime import datetime
+from typing import Dict, Any, Optional, Tuple
+
+from app.services.export_renderer import export_renderer
+from app.services.content_store import content_store
+
+# format -> (media_type, suffixe du fichier)
+EXPORT_FORMATS = {
+    "json": ("application/json", ".json"),
+    "html": ("text/html", ".html"),
+    "print": ("text/html", "_print.html"),
+    "pdf": ("application/pdf", ".pdf"),
+}
+
+
+async def get_exportable_course(session, course_id: str, current_user: dict,
+                                published: bool = False) -> Optional[Dict[str, Any]]:
+    """Récupérer le cours si l'utilisateur a le droit de l'exporter.
+
+    published : export publié d'un cours, lisible aussi par ses inscrits et, s'il est public, par tous.
+    """
+    check_query = """
+    MATCH (c:Course {id: $course_id})
+    WITH c, c.teacher_id = $user_id OR $user_role = 'admin' as can_edit
+    WHERE can_edit OR ($published AND (c.is_public = true OR EXISTS((:User {id: $user_id})-[:ENROLLED_IN]->(c))))
+    RETURN c.id as id, c.title as title, c.description as description,
+           c.category as category, c.difficulty as difficulty,
+           c.is_public as is_public, c.created_at as created_at,
+           COALESCE(c.content_version, 0) as content_version,
+           can_edit
+    """
+
+    result = await session.run(check_query,
+        course_id=course_id,
+        user_id=current_user["id"],
+        user_role=current_user.get("role", "student"),
+        published=published
+    )
+    course = await result.single()
+    return dict(course) if course else None
+
+
+async def fetch_course_export_data(
+    session,
+    course_id: str,
+    current_user: dict,
+    include_qcms: bool = True,
+    include_analytics: bool = False,
+    published: bool = False
+) -> Optional[Dict[str, Any]]:
+    """Charger le cours, ses blocs, QCM et analytics pour l'export"""
+    course_data = await get_exportable_course(session, course_id, current_user, published=published)
+    if not course_data:
+        return None
+    # Droit de l'utilisateur, pas une donnée du cours : l'artefact partagé ne dépend pas de qui l'a rendu
+    del course_data["can_edit"]
+
+    # Récupérer les blocs de contenu
+    blocks_query = """
+    MATCH (c:Course {id: $course_id})-[:HAS_BLOCK]->(b:ContentBlock)
+    RETURN b.id as id, b.type as type, b.content as content,
+           b.content_ref as content_ref,
+           b.position as position, b.created_at as created_at,
+           b.updated_at as updated_at
+    ORDER BY b.position ASC
+    """
+
+    blocks_result = await session.run(blocks_query, course_id=course_id)
+    blocks = []
+    async for record in blocks_result:
+        blocks.append(dict(record))
+    content_store.resolve_rows(blocks)
+
+    course_data["blocks"] = blocks
+
+    # Récupérer les QCM si demandé
+    if include_qcms:
+        qcms_query = """
+        MATCH (c:Course {id: $course_id})-[:HAS_QCM]->(q:QCM)
+        OPTIONAL MATCH (q)-[:HAS_QUESTION]->(quest:Question)
+        RETURN q.id as id, q.title as title, q.description as description,
+               q.time_limit as time_limit, q.attempts_allowed as attempts_allowed,
+               COALESCE(q.updated_at, q.created_at) as updated_at,
+               collect({
+                   id: quest.id,
+                   question: quest.question,
+                   type: quest.type,
+                   options: quest.options,
+                   correct_answers: quest.correct_answers,
+                   explanation: quest.explanation,
+                   position: quest.position,
+                   points: quest.points
+               }) as questions
+        ORDER BY q.created_at ASC
+        """
+
+        qcms_result = await session.run(qcms_query, course_id=course_id)
+        qcms = []
+        async for record in qcms_result:
+            qcm_data = dict(record)
+            # Filtrer les questions nulles
+            qcm_data["questions"] = [q for q in qcm_data["questions"] if q["id"] is not None]
+            qcms.append(qcm_data)
+
+        course_data["qcms"] = qcms
+
+    # Récupérer les analytics si demandé
+    if include_analytics and current_user["role"] in ["teacher", "admin"]:
+        analytics_query = """
+        MATCH (c:Course {id: $course_id})
+        OPTIONAL MATCH (c)<-[:ENROLLED_IN]-(s:User)
+        OPTIONAL MATCH (c)-[:HAS_QCM]->(q:QCM)<-[:FOR_QCM]-(a:QCMAttempt)
+        RETURN count(DISTINCT s) as total_students,
+               count(DISTINCT a) as total_attempts,
+               avg(a.score) as avg_score
+        """
+
+        analytics_result = await session.run(analytics_query, course_id=course_id)
+        analytics = await analytics_result.single()
+
+        if analytics:
+            analytics_data = dict(analytics)
+            analytics_data["avg_score"] = round(analytics_data["avg_score"] or 0, 2)
+            course_data["analytics"] = analytics_data
+
+    return course_data
+
+
+def generate_html_export(course_data: Dict[str, Any]) -> str:
+    """Générer un export HTML du cours"""
+    return export_renderer.render_course(course_data)
+
+
+def generate_pdf_ready_html(course_data: Dict[str, Any]) -> str:
+    """Générer un HTML optimisé pour la conversion PDF"""
+    # Mêmes fragments en cache que l'export HTML, seul le gabarit de page change
+    return export_renderer.render_course(course_data, print_mode=True)
+
+
+def export_filename(course_data: Dict[str, Any], export_format: str) -> str:
+    suffix = EXPORT_FORMATS[export_format][1]
+    return f"course_{course_data['title']}_{datetime.now().strftime('%Y%m%d_%H%M%S')}{suffix}"
+
+
+def render_export(course_data: Dict[str, Any], export_format: str,
+                  exported_by: Optional[str] = None) -> Tuple[bytes, str]:
+    """Rendre le contenu textuel de l'export; retourne (contenu, media_type).
+
+    exported_by None : artefact partagé (cache), sans auteur ni date d'export, daté par la version du contenu.
+    """
+    if export_format not in EXPORT_FORMATS or export_format == "pdf":
+        raise ValueError(f"Unsupported export format: {export_format}")
+
+    # Ajouter les métadonnées d'export
+    metadata = {
+        "export_format": export_format,
+        "version": "1.0",
+        "content_version": course_data.get("content_version"),
+    }
+    if exported_by is not None:
+        metadata["exported_at"] = datetime.now().isoformat()
+        metadata["exported_by"] = exported_by
+    course_data["export_metadata"] = metadata
+
+    if export_format == "json":
+        content = json.dumps(course_data, indent=2, ensure_ascii=False, default=str)
+    elif export_format == "html":
+        content = generate_html_export(course_data)
+    else:
+        # HTML stylé pour l'impression, aussi utilisé comme source du rendu PDF serveur
+        content = generate_pdf_ready_html(course_data)
+
+    return content.encode("utf-8"), EXPORT_FORMATS[export_format][0]
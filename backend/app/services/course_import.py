@@ -0,0 +1,289 @@
+import json
+import time
+import uuid
+from typing import Dict, Any, List, AsyncIterator, Union
+
+from app.core.config import settings
+from app.services.content_store import content_store
+from app.services.search_index import search_service
+
+CREATE_COURSES_QUERY = """
+UNWIND $courses AS row
+MATCH (u:User {id: $teacher_id})
+CREATE (c:Course {
+    id: row.id,
+    title: row.title,
+    description: row.description,
+    category: row.category,
+    difficulty: row.difficulty,
+    is_public: row.is_public,
+    access_code: null,
+    teacher_id: $teacher_id,
+    imported_from: row.imported_from,
+    content_version: 0,
+    created_at: datetime()
+})
+CREATE (u)-[:TEACHES]->(c)
+RETURN count(c) as created
+"""
+
+CREATE_BLOCKS_QUERY = """
+UNWIND $blocks AS row
+MATCH (c:Course {id: row.course_id})
+CREATE (c)-[:HAS_BLOCK]->(:ContentBlock {
+    id: row.id,
+    type: row.type,
+    content: row.content,
+    content_ref: row.content_ref,
+    position: row.position,
+    created_at: datetime(),
+    updated_at: datetime()
+})
+"""
+
+CREATE_QCMS_QUERY = """
+UNWIND $qcms AS row
+MATCH (c:Course {id: row.course_id})
+CREATE (c)-[:HAS_QCM]->(:QCM {
+    id: row.id,
+    title: row.title,
+    description: row.description,
+    time_limit: row.time_limit,
+    attempts_allowed: row.attempts_allowed,
+    is_active: row.is_active,
+    created_at: datetime()
+})
+"""
+
+CREATE_QUESTIONS_QUERY = """
+UNWIND $questions AS row
+MATCH (q:QCM {id: row.qcm_id})
+CREATE (q)-[:HAS_QUESTION]->(:Question {
+    id: row.id,
+    question: row.question,
+    type: row.type,
+    options: row.options,
+    correct_answers: row.correct_answers,
+    explanation: row.explanation,
+    position: row.position,
+    points: row.points
+})
+"""
+
+
+class TeacherNotFound(Exception):
+    """L'enseignant importateur n'existe pas : aucun cours du lot n'a été créé"""
+
+
+class ImportBatch:
+    """Lignes à créer dans une seule transaction"""
+
+    def __init__(self):
+        self.courses: List[Dict[str, Any]] = []
+        self.blocks: List[Dict[str, Any]] = []
+        self.qcms: List[Dict[str, Any]] = []
+        self.questions: List[Dict[str, Any]] = []
+
+    @property
+    def row_count(self) -> int:
+        return len(self.courses) + len(self.blocks) + len(self.qcms) + len(self.questions)
+
+    def add_course(self, export: Dict[str, Any]) -> Dict[str, Any]:
+        """Convertir un export JSON de cours en lignes; retourne la ligne du cours"""
+        if not isinstance(export, dict) or not export.get("title"):
+            raise ValueError("Export de cours invalide : 'title' manquant")
+
+        course_id = str(uuid.uuid4())
+        course_row = {
+            "id": course_id,
+            "title": export["title"],
+            "description": export.get("description") or "",
+            "category": export.get("category") or "Général",
+            "difficulty": export.get("difficulty") or "beginner",
+            "is_public": bool(export.get("is_public", False)),
+            "imported_from": export.get("id"),
+        }
+        block_rows, qcm_rows, question_rows = [], [], []
+
+        blocks = sorted(export.get("blocks") or [], key=lambda b: b.get("position") or 0)
+        for position, block in enumerate(blocks):
+            content, content_ref = content_store.externalize(block.get("content", ""))
+            block_rows.append({
+                "course_id": course_id,
+                "id": str(uuid.uuid4()),
+                "type": block.get("type", "text"),
+                "content": content,
+                "content_ref": content_ref,
+                "position": position,
+            })
+
+        for qcm in export.get("qcms") or []:
+            qcm_id = str(uuid.uuid4())
+            qcm_rows.append({
+                "course_id": course_id,
+                "id": qcm_id,
+                "title": qcm.get("title", "Nouveau QCM"),
+                "description": qcm.get("description", ""),
+                "time_limit": qcm.get("time_limit", 30),
+                "attempts_allowed": qcm.get("attempts_allowed", 3),
+                "is_active": qcm.get("is_active", True),
+            })
+            questions = sorted(qcm.get("questions") or [], key=lambda q: q.get("position") or 0)
+            for position, question in enumerate(questions):
+                question_rows.append({
+                    "qcm_id": qcm_id,
+                    "id": str(uuid.uuid4()),
+                    "question": question.get("question", ""),
+                    "type": question.get("type", "single"),
+                    "options": question.get("options") or [],
+                    "correct_answers": question.get("correct_answers") or [],
+                    "explanation": question.get("explanation", ""),
+                    "position": position,
+                    "points": question.get("points", 1),
+                })
+
+        # N'ajouter au lot qu'une fois tout le cours converti
+        self.courses.append(course_row)
+        self.blocks.extend(block_rows)
+        self.qcms.extend(qcm_rows)
+        self.questions.extend(question_rows)
+        return course_row
+
+
+async def _write_batch(tx, batch: ImportBatch, teacher_id: str) -> None:
+    result = await tx.run(CREATE_COURSES_QUERY, courses=batch.courses, teacher_id=teacher_id)
+    record = await result.single()
+    if record["created"] != len(batch.courses):
+        # MATCH sans résultat : rien n'est créé, la transaction est annulée
+        raise TeacherNotFound(f"Enseignant introuvable : {teacher_id}")
+    if batch.blocks:
+        await tx.run(CREATE_BLOCKS_QUERY, blocks=batch.blocks)
+    if batch.qcms:
+        await tx.run(CREATE_QCMS_QUERY, qcms=batch.qcms)
+    if batch.questions:
+        await tx.run(CREATE_QUESTIONS_QUERY, questions=batch.questions)
+
+
+def _decode_line(line: bytes) -> Union[Dict[str, Any], ValueError]:
+    try:
+        return json.loads(line)
+    except ValueError as e:  # JSONDecodeError, UnicodeDecodeError
+        return ValueError(f"Ligne NDJSON invalide : {e}")
+
+
+async def iter_ndjson(
+    chunks: AsyncIterator[bytes],
+    max_line_bytes: int = settings.import_max_line_bytes
+) -> AsyncIterator[Union[Dict[str, Any], ValueError]]:
+    """Décoder un flux NDJSON (un export de cours par ligne).
+
+    Une ligne illisible ou plus longue que max_line_bytes produit une ValueError au lieu de
+    l'export : elle est signalée dans le rapport et les lignes suivantes sont importées.
+    """
+    too_long = f"Ligne NDJSON trop longue (plus de {max_line_bytes} octets)"
+    buffer = bytearray()
+    scan_from = 0  # octets déjà parcourus sans saut de ligne : jamais relus
+    skipping = False  # reste d'une ligne trop longue, ignoré jusqu'au prochain saut de ligne
+    async for chunk in chunks:
+        buffer += chunk
+        start = 0
+        while True:
+            newline = buffer.find(b"\n", scan_from)
+            if newline < 0:
+                break
+            if skipping:
+                skipping = False
+            elif newline - start > max_line_bytes:
+                yield ValueError(too_long)
+            elif buffer[start:newline].strip():
+                yield _decode_line(buffer[start:newline])
+            start = scan_from = newline + 1
+        # Une seule copie par morceau pour retirer les lignes traitées
+        del buffer[:start]
+        scan_from = len(buffer)
+        if len(buffer) > max_line_bytes:
+            if not skipping:
+                yield ValueError(too_long)
+            skipping = True
+            buffer.clear()
+            scan_from = 0
+    if buffer.strip() and not skipping:
+        yield _decode_line(buffer)
+
+
+async def _iter_exports(exports) -> AsyncIterator[Dict[str, Any]]:
+    if hasattr(exports, "__aiter__"):
+        async for export in exports:
+            yield export
+    else:
+        for export in exports:
+            yield export
+
+
+async def import_courses(
+    session,
+    exports,
+    teacher_id: str,
+    batch_courses: int = settings.import_batch_courses,
+    batch_rows: int = settings.import_batch_rows
+) -> Dict[str, Any]:
+    """Importer des exports JSON de cours par lots UNWIND, une transaction par lot"""
+    started = time.perf_counter()
+    report = {
+        "courses": [],
+        "errors": [],
+        "counts": {"courses": 0, "blocks": 0, "qcms": 0, "questions": 0},
+        "transactions": 0,
+    }
+    batch = ImportBatch()
+
+    async def flush(batch: ImportBatch) -> None:
+        if not batch.courses:
+            return
+        try:
+            await session.execute_write(_write_batch, batch, teacher_id)
+        except TeacherNotFound as e:
+            failed = {row["id"] for row in batch.courses}
+            report["errors"].extend(
+                {"index": course["index"], "error": str(e)} for course in report["courses"] if course["id"] in failed
+            )
+            report["courses"] = [course for course in report["courses"] if course["id"] not in failed]
+            return
+        # Indexation après validation : une transaction rejouée n'indexe pas deux fois
+        for block in batch.blocks:
+            content = content_store.resolve(block["content"], block["content_ref"])
+            search_service.index_block(block["course_id"], block["id"], content, block["type"])
+        report["transactions"] += 1
+        report["counts"]["courses"] += len(batch.courses)
+        report["counts"]["blocks"] += len(batch.blocks)
+        report["counts"]["qcms"] += len(batch.qcms)
+        report["counts"]["questions"] += len(batch.questions)
+
+    index = 0
+    async for export in _iter_exports(exports):
+        try:
+            if isinstance(export, ValueError):
+                raise export
+            course_row = batch.add_course(export)
+            report["courses"].append({
+                "index": index,
+                "id": course_row["id"],
+                "title": course_row["title"],
+                "imported_from": course_row["imported_from"],
+            })
+        except (ValueError, TypeError, AttributeError) as e:
+            report["errors"].append({"index": index, "error": str(e)})
+        index += 1
+
+        if len(batch.courses) >= batch_courses or batch.row_count >= batch_rows:
+            await flush(batch)
+            batch = ImportBatch()
+
+    await flush(batch)
+
+    elapsed = time.perf_counter() - started
+    node_count = sum(report["counts"].values())
+    report["elapsed_seconds"] = round(elapsed, 3)
+    report["courses_per_second"] = round(report["counts"]["courses"] / elapsed, 2) if elapsed else None
+    report["nodes_per_second"] = round(node_count / elapsed, 2) if elapsed else None
+    return report
@@ -0,0 +1,133 @@
+import csv
+from typing import Dict, Any, Iterable, List, Optional
+
+from app.core.config import settings
+
+PREVIEW_ROWS = 10
+
+# Ordre d'élargissement des types : une colonne ne redescend jamais
+TYPE_ORDER = ["empty", "boolean", "integer", "float", "string"]
+BOOLEAN_VALUES = ["true", "false", "vrai", "faux", "yes", "no", "oui", "non"]
+# Au-delà, une cellule ne peut être qu'un texte : elle n'entre jamais dans un tableau NumPy
+# (largeur fixe <U{n} : une seule cellule longue dimensionnerait tout le lot)
+MAX_TYPED_CHARS = 64
+
+
+class ColumnStats:
+    """Type et statistiques d'une colonne, cumulés lot par lot"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.type = "empty"
+        self.count = 0
+        self.nulls = 0
+        self.minimum: Optional[float] = None
+        self.maximum: Optional[float] = None
+        self.total = 0.0
+        self.numeric_count = 0
+
+    def _widen(self, batch_type: str) -> None:
+        if batch_type == "empty" or batch_type == self.type:
+            return
+        if self.type == "empty":
+            self.type = batch_type
+        elif {self.type, batch_type} <= {"integer", "float"}:
+            self.type = "float"
+        else:
+            # booléen mélangé à des nombres, ou texte : la colonne devient texte
+            self.type = "string"
+
+    def update(self, values: List[str]) -> None:
+        import numpy as np
+
+        stripped = [value.strip() for value in values]
+        self.count += len(values)
+        filled_values = [value for value in stripped if value]
+        self.nulls += len(values) - len(filled_values)
+        if not filled_values or self.type == "string":
+            return
+        if max(map(len, filled_values)) > MAX_TYPED_CHARS:
+            self._widen("string")
+            return
+
+        filled = np.asarray(filled_values, dtype=str)
+
+        if np.isin(np.char.lower(filled), BOOLEAN_VALUES).all():
+            self._widen("boolean")
+            return
+        try:
+            numbers = filled.astype(np.float64)
+        except ValueError:
+            self._widen("string")
+            return
+        integral = np.all(np.mod(numbers, 1) == 0) and not np.char.count(filled, ".").any()
+        self._widen("integer" if integral else "float")
+        if self.type == "string":
+            return
+
+        finite = numbers[np.isfinite(numbers)]
+        if finite.size:
+            low, high = float(finite.min()), float(finite.max())
+            self.minimum = low if self.minimum is None else min(self.minimum, low)
+            self.maximum = high if self.maximum is None else max(self.maximum, high)
+            self.total += float(finite.sum())
+            self.numeric_count += int(finite.size)
+
+    def to_dict(self) -> Dict[str, Any]:
+        stats = {"name": self.name, "type": self.type, "count": self.count, "nulls": self.nulls}
+        if self.type in ("integer", "float") and self.numeric_count:
+            stats.update({
+                "min": self.minimum,
+                "max": self.maximum,
+                "mean": round(self.total / self.numeric_count, 6),
+            })
+        return stats
+
+
+def _markdown_preview(headers: List[str], preview: List[List[str]], row_count: int) -> str:
+    if not preview:
+        return "Fichier CSV vide"
+    lines = ["| " + " | ".join(headers) + " |", "| " + " | ".join(["---"] * len(headers)) + " |"]
+    lines += ["| " + " | ".join(row) + " |" for row in preview]
+    markdown = "\n".join(lines) + "\n"
+    if row_count > len(preview):
+        markdown += f"\n*... et {row_count - len(preview)} lignes supplémentaires*"
+    return markdown
+
+
+def ingest_csv(lines: Iterable[str], preview_rows: int = PREVIEW_ROWS,
+               batch_rows: int = settings.csv_batch_rows) -> Dict[str, Any]:
+    """Lire un CSV en une passe : comptage, aperçu et types par lots de colonnes, mémoire bornée par batch_rows"""
+    reader = csv.reader(lines)
+    headers = next(reader, [])
+    columns = [ColumnStats(name) for name in headers]
+    preview: List[List[str]] = []
+    batch: List[List[str]] = []
+    row_count = 0
+
+    def flush():
+        # Lignes courtes complétées, colonnes en trop ignorées
+        width = len(headers)
+        for index, values in enumerate(zip(*(row[:width] + [""] * (width - len(row)) for row in batch))):
+            columns[index].update(list(values))
+        batch.clear()
+
+    for row in reader:
+        if not row:
+            continue
+        if row_count < preview_rows:
+            preview.append([row[index] if index < len(row) else "" for index in range(len(headers))])
+        row_count += 1
+        batch.append(row)
+        if len(batch) >= batch_rows:
+            flush()
+    if batch and headers:
+        flush()
+
+    return {
+        "headers": headers,
+        "preview": preview,
+        "row_count": row_count,
+        "columns": [column.to_dict() for column in columns],
+        "markdown": _markdown_preview(headers, preview, row_count),
+    }
@@ -0,0 +1,118 @@
+from typing import Dict, Any, List, Optional
+
+from app.core.config import settings
+from app.services.content_store import content_store
+
+# Propriétés légères d'un nœud Document (jamais le contenu), projetables via ?fields=
+DOCUMENT_FIELDS = {
+    "id": "d.id",
+    "title": "d.title",
+    "description": "d.description",
+    "filename": "d.filename",
+    "file_id": "d.file_id",
+    "metadata": "d.metadata",
+    "parsed_successfully": "d.parsed_successfully",
+    "status": "d.status",
+    "parse_error": "d.parse_error",
+    "content_length": "d.content_length",
+    "chunk_count": "d.chunk_count",
+    "created_at": "d.created_at",
+    "updated_at": "d.updated_at",
+}
+
+
+def split_content(text: str, chunk_chars: int = settings.document_chunk_chars) -> List[Dict[str, Any]]:
+    """Découper un texte en blocs ordonnés, coupés de préférence en fin de paragraphe ou de ligne"""
+    chunks = []
+    start = 0
+    while start < len(text):
+        end = min(start + chunk_chars, len(text))
+        if end < len(text):
+            # Pas de coupure dans la première moitié du bloc : le texte sans saut de ligne est coupé net
+            for separator in ("\n\n", "\n"):
+                cut = text.rfind(separator, start + chunk_chars // 2, end)
+                if cut >= 0:
+                    end = cut + len(separator)
+                    break
+        chunks.append({
+            "index": len(chunks),
+            "start": start,
+            "end": end,
+            "size": end - start,
+            "content": text[start:end],
+        })
+        start = end
+    return chunks
+
+
+async def write_chunks(session, document_id: str, content: Optional[str]) -> List[Dict[str, Any]]:
+    """Remplacer le contenu d'un document par ses blocs; le nœud ne garde que la longueur et le nombre de blocs"""
+    chunks = split_content(content or "")
+    rows = []
+    for chunk in chunks:
+        inline_content, content_ref = content_store.externalize(chunk["content"])
+        rows.append({**chunk, "content": inline_content, "content_ref": content_ref})
+    await session.run("""
+    MATCH (d:Document {id: $document_id})
+    OPTIONAL MATCH (d)-[:HAS_CHUNK]->(old:DocumentChunk)
+    DETACH DELETE old
+    """, document_id=document_id)
+    await session.run("""
+    MATCH (d:Document {id: $document_id})
+    SET d.content_length = $content_length, d.chunk_count = $chunk_count
+    REMOVE d.content, d.content_ref
+    WITH d
+    UNWIND $chunks as chunk
+    CREATE (d)-[:HAS_CHUNK]->(:DocumentChunk {
+        document_id: $document_id,
+        index: chunk.index,
+        start: chunk.start,
+        end: chunk.end,
+        size: chunk.size,
+        content: chunk.content,
+        content_ref: chunk.content_ref
+    })
+    """,
+        document_id=document_id,
+        content_length=len(content or ""),
+        chunk_count=len(chunks),
+        chunks=rows
+    )
+    return chunks
+
+
+async def list_chunks(session, document_id: str) -> List[Dict[str, Any]]:
+    """Index des blocs d'un document (offsets et tailles, sans le texte)"""
+    result = await session.run("""
+    MATCH (c:DocumentChunk {document_id: $document_id})
+    RETURN c.index as index, c.start as start, c.end as end, c.size as size
+    ORDER BY c.index
+    """, document_id=document_id)
+    return [dict(record) async for record in result]
+
+
+async def read_range(session, document_id: str, start: int, end: int) -> Optional[str]:
+    """Texte [start, end) reconstitué à partir des seuls blocs qui le recouvrent"""
+    result = await session.run("""
+    MATCH (c:DocumentChunk {document_id: $document_id})
+    WHERE c.end > $start AND c.start < $end
+    RETURN c.start as start, c.content as content, c.content_ref as content_ref
+    ORDER BY c.index
+    """, document_id=document_id, start=start, end=end)
+    chunks = [dict(record) async for record in result]
+    content_store.resolve_rows(chunks)
+    if not chunks:
+        # Documents antérieurs au découpage : contenu encore porté par le nœud
+        result = await session.run("""
+        MATCH (d:Document {id: $document_id})
+        RETURN d.content as content, d.content_ref as content_ref
+        """, document_id=document_id)
+        record = await result.single()
+        if not record:
+            return None
+        content = content_store.resolve(record["content"], record["content_ref"])
+        return content[start:end] if content is not None else None
+
+    offset = chunks[0]["start"]
+    text = "".join(chunk["content"] for chunk in chunks)
+    return text[start - offset:end - offset]
@@ -0,0 +1,265 @@
+import asyncio
+import difflib
+import json
+import logging
+from typing import Dict, Any, List, Optional, Union
+
+from app.core.config import settings
+from app.services.content_store import content_store
+
+logger = logging.getLogger(__name__)
+
+# Delta : liste d'opérations sur les lignes de la version précédente
+#   n > 0 : recopier n lignes, n < 0 : sauter -n lignes, "texte" : insérer
+Delta = List[Union[int, str]]
+
+
+def make_delta(old: str, new: str) -> Delta:
+    """Différence ligne à ligne entre deux versions"""
+    old_lines = old.splitlines(keepends=True)
+    new_lines = new.splitlines(keepends=True)
+    delta: Delta = []
+    matcher = difflib.SequenceMatcher(None, old_lines, new_lines)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            delta.append(i2 - i1)
+            continue
+        if i2 > i1:
+            delta.append(i1 - i2)
+        if j2 > j1:
+            delta.append("".join(new_lines[j1:j2]))
+    return delta
+
+
+def apply_delta(base: str, delta: Delta) -> str:
+    lines = base.splitlines(keepends=True)
+    position = 0
+    parts = []
+    for op in delta:
+        if isinstance(op, str):
+            parts.append(op)
+        elif op > 0:
+            parts.extend(lines[position:position + op])
+            position += op
+        else:
+            position -= op
+    return "".join(parts)
+
+
+class DocumentHistory:
+    """Historique des versions d'un document rédigé : deltas successifs et instantanés périodiques.
+
+    Chaque version référence l'instantané dont elle dépend (base_version) et le nombre
+    de deltas à rejouer depuis celui-ci (depth), borné par snapshot_interval.
+    """
+
+    def __init__(self, snapshot_interval: int = settings.document_snapshot_interval,
+                 keep_versions: int = settings.document_history_keep_versions):
+        self.snapshot_interval = max(1, snapshot_interval)
+        self.keep_versions = keep_versions  # 0 : historique complet
+
+    async def record(self, session, document_id: str, version: int, content: Optional[str],
+                     title: Optional[str] = None, author_id: Optional[str] = None,
+                     previous: Optional[str] = None) -> Dict[str, Any]:
+        """Enregistrer la version `version`; `previous` amorce l'historique d'un document qui n'en a pas"""
+        content = content or ""
+        result = await session.run("""
+        MATCH (v:DocumentVersion {document_id: $document_id})
+        RETURN v.version as version, v.base_version as base_version, v.depth as depth
+        ORDER BY v.version DESC LIMIT 1
+        """, document_id=document_id)
+        last = await result.single()
+
+        if last is None and version > 1:
+            # Document antérieur à l'historique : la version courante devient le premier instantané
+            await self._write(session, document_id, version - 1, previous or "", None, None, None)
+            last = {"version": version - 1, "base_version": version - 1, "depth": 0}
+
+        if last is None or last["version"] != version - 1:
+            return await self._write(session, document_id, version, content, None, title, author_id)
+
+        delta = await asyncio.to_thread(make_delta, previous or "", content)
+        encoded = json.dumps(delta, ensure_ascii=False)
+        depth = last["depth"] + 1
+        # Un delta plus gros que le texte, ou une chaîne trop longue, ne vaut pas un instantané
+        if depth >= self.snapshot_interval or len(encoded) >= len(content):
+            return await self._write(session, document_id, version, content, None, title, author_id)
+        return await self._write(session, document_id, version, encoded, last["base_version"], title, author_id,
+                                 depth=depth, size=len(content))
+
+    async def _write(self, session, document_id: str, version: int, data: str, base_version: Optional[int],
+                     title: Optional[str], author_id: Optional[str], depth: int = 0,
+                     size: Optional[int] = None) -> Dict[str, Any]:
+        kind = "snapshot" if base_version is None else "delta"
+        inline_data, data_ref = content_store.externalize(data)
+        await session.run("""
+        MATCH (d:Document {id: $document_id})
+        MERGE (d)-[:HAS_VERSION]->(v:DocumentVersion {document_id: $document_id, version: $version})
+        SET v.kind = $kind,
+            v.base_version = $base_version,
+            v.depth = $depth,
+            v.content = $content,
+            v.content_ref = $content_ref,
+            v.size = $size,
+            v.title = $title,
+            v.author_id = $author_id,
+            v.created_at = COALESCE(v.created_at, datetime())
+        """,
+            document_id=document_id,
+            version=version,
+            kind=kind,
+            base_version=version if base_version is None else base_version,
+            depth=depth,
+            content=inline_data,
+            content_ref=data_ref,
+            size=len(data) if size is None else size,
+            title=title,
+            author_id=author_id
+        )
+        return {"version": version, "kind": kind, "depth": depth}
+
+    async def list_versions(self, session, document_id: str) -> List[Dict[str, Any]]:
+        result = await session.run("""
+        MATCH (v:DocumentVersion {document_id: $document_id})
+        RETURN v.version as version, v.kind as kind, v.size as size, v.title as title,
+               v.author_id as author_id, v.created_at as created_at
+        ORDER BY v.version DESC
+        """, document_id=document_id)
+        return [dict(record) async for record in result]
+
+    async def get_version(self, session, document_id: str, version: int) -> Optional[Dict[str, Any]]:
+        """Reconstituer une version : son instantané puis au plus snapshot_interval - 1 deltas"""
+        result = await session.run("""
+        MATCH (target:DocumentVersion {document_id: $document_id, version: $version})
+        MATCH (v:DocumentVersion {document_id: $document_id})
+        WHERE v.version >= target.base_version AND v.version <= target.version
+        RETURN v.version as version, v.kind as kind, v.content as content, v.content_ref as content_ref,
+               v.title as title, v.author_id as author_id, v.created_at as created_at
+        ORDER BY v.version
+        """, document_id=document_id, version=version)
+        chain = [dict(record) async for record in result]
+        if not chain:
+            return None
+        if chain[0]["kind"] != "snapshot":
+            raise ValueError(f"Historique incomplet pour la version {version}")
+        content_store.resolve_rows(chain)
+        content = await asyncio.to_thread(self._replay, chain)
+        target = chain[-1]
+        return {
+            "document_id": document_id,
+            "version": target["version"],
+            "title": target["title"],
+            "author_id": target["author_id"],
+            "created_at": target["created_at"],
+            "content": content,
+        }
+
+    @staticmethod
+    def _replay(chain: List[Dict[str, Any]]) -> str:
+        content = chain[0]["content"] or ""
+        for step in chain[1:]:
+            content = apply_delta(content, json.loads(step["content"]))
+        return content
+
+    async def delete(self, session, document_id: str) -> None:
+        await session.run("""
+        MATCH (v:DocumentVersion {document_id: $document_id})
+        DETACH DELETE v
+        """, document_id=document_id)
+
+    # Compaction
+
+    async def compact(self, session, document_id: str) -> Dict[str, Any]:
+        """Réécrire les chaînes trop longues en instantanés et purger les versions hors rétention"""
+        result = await session.run("""
+        MATCH (v:DocumentVersion {document_id: $document_id})
+        RETURN v.version as version, v.kind as kind, v.depth as depth,
+               v.content as content, v.content_ref as content_ref
+        ORDER BY v.version
+        """, document_id=document_id)
+        versions = [dict(record) async for record in result]
+        if not versions:
+            return {"document_id": document_id, "snapshots": 0, "rebased": 0, "deleted": 0}
+
+        keep_from = versions[0]["version"]
+        if self.keep_versions > 0:
+            keep_from = max(keep_from, versions[-1]["version"] - self.keep_versions + 1)
+
+        updates = []
+        deleted = []
+        text = ""
+        base_version = None
+        depth = 0
+        for entry in versions:
+            # Une version à la fois en mémoire : le texte courant sert de base au delta suivant
+            data = content_store.resolve(entry["content"], entry["content_ref"])
+            if entry["kind"] == "snapshot":
+                text = data or ""
+            else:
+                text = await asyncio.to_thread(apply_delta, text, json.loads(data))
+
+            if entry["version"] < keep_from:
+                deleted.append(entry["version"])
+                continue
+            if base_version is None or entry["kind"] == "snapshot" or depth + 1 >= self.snapshot_interval:
+                base_version, depth = entry["version"], 0
+                if entry["kind"] != "snapshot":
+                    inline_data, data_ref = content_store.externalize(text)
+                    updates.append({"version": entry["version"], "kind": "snapshot", "base_version": base_version,
+                                    "depth": 0, "content": inline_data, "content_ref": data_ref})
+                elif entry["depth"] != 0:
+                    updates.append({"version": entry["version"], "kind": "snapshot", "base_version": base_version,
+                                    "depth": 0, "content": entry["content"], "content_ref": entry["content_ref"]})
+                continue
+            depth += 1
+            if entry["depth"] != depth:
+                updates.append({"version": entry["version"], "kind": "delta", "base_version": base_version,
+                                "depth": depth, "content": entry["content"], "content_ref": entry["content_ref"]})
+
+        if updates:
+            await session.run("""
+            UNWIND $updates as update
+            MATCH (v:DocumentVersion {document_id: $document_id, version: update.version})
+            SET v.kind = update.kind,
+                v.base_version = update.base_version,
+                v.depth = update.depth,
+                v.content = update.content,
+                v.content_ref = update.content_ref
+            """, document_id=document_id, updates=updates)
+        if deleted:
+            await session.run("""
+            MATCH (v:DocumentVersion {document_id: $document_id})
+            WHERE v.version IN $versions
+            DETACH DELETE v
+            """, document_id=document_id, versions=deleted)
+
+        return {
+            "document_id": document_id,
+            "snapshots": sum(1 for update in updates if update["kind"] == "snapshot"),
+            "rebased": sum(1 for update in updates if update["kind"] == "delta"),
+            "deleted": len(deleted),
+        }
+
+    async def compact_all(self, session) -> Dict[str, Any]:
+        """Compacter les documents dont la chaîne de deltas ou l'historique dépasse les limites"""
+        result = await session.run("""
+        MATCH (v:DocumentVersion)
+        WITH v.document_id as document_id, max(v.depth) as depth, count(v) as versions
+        WHERE depth >= $interval OR ($keep > 0 AND versions > $keep)
+        RETURN document_id
+        """, interval=self.snapshot_interval, keep=self.keep_versions)
+        document_ids = [record["document_id"] async for record in result]
+
+        totals = {"documents": 0, "snapshots": 0, "rebased": 0, "deleted": 0}
+        for document_id in document_ids:
+            stats = await self.compact(session, document_id)
+            totals["documents"] += 1
+            for key in ("snapshots", "rebased", "deleted"):
+                totals[key] += stats[key]
+        if document_ids:
+            logger.info(f"History compaction: {totals}")
+        return totals
+
+
+# Instance globale
+document_history = DocumentHistory()
@@ -0,0 +1,224 @@
+import asyncio
+import json
+import logging
+import time
+from typing import Dict, Any, Optional
+
+from app.core.config import settings
+from app.core.database import neo4j_connection
+from app.services.document_chunks import write_chunks
+from app.services.job_queue import Job, JobQueue
+from app.services.parse_cache import parse_cached, parse_cache
+from app.services.parser_engine import parser_engine
+from app.services.search_index import search_service
+from app.services.parse_pool import parse_pool, ParseError, ParseQueueFull, ParseTimeout, ParseWorkerCrashed
+
+logger = logging.getLogger(__name__)
+
+# pending -> processing -> parsed | failed
+DOCUMENT_STATUSES = ("pending", "processing", "parsed", "failed")
+
+# Échecs liés à l'environnement d'exécution plutôt qu'au fichier : une nouvelle tentative a un sens
+RETRYABLE_ERRORS = (ParseQueueFull, ParseTimeout, ParseWorkerCrashed)
+
+
+def encode_metadata(metadata: Dict[str, Any]) -> str:
+    """Neo4j n'accepte pas de map comme propriété : les métadonnées sont stockées en JSON"""
+    return json.dumps(metadata or {}, ensure_ascii=False, default=str)
+
+
+def decode_metadata(value: Any) -> Dict[str, Any]:
+    if isinstance(value, dict):
+        return value
+    if not value:
+        return {}
+    try:
+        return json.loads(value)
+    except (TypeError, ValueError):
+        return {}
+
+
+def encode_content(content: Any) -> Optional[str]:
+    """Contenu structuré (JSON parsé) sérialisé pour tenir dans une propriété texte"""
+    if content is None or isinstance(content, str):
+        return content
+    return json.dumps(content, ensure_ascii=False, default=str)
+
+
+async def _store_parse_result(tx, document_id: str, content: Optional[str], fields: Dict[str, Any]):
+    # Contenu hors du nœud : blocs ordonnés lus à la demande par plage
+    chunks = await write_chunks(tx, document_id, content)
+    await tx.run("""
+    MATCH (d:Document {id: $document_id})
+    SET d.status = $status,
+        d.metadata = $metadata,
+        d.parsed_successfully = $success,
+        d.parse_error = $error,
+        d.parsed_at = datetime(),
+        d.updated_at = datetime()
+    """, document_id=document_id, **fields)
+    return chunks
+
+
+class DocumentIngestion:
+    """Parsing des documents uploadés en tâche de fond, état persisté sur le nœud Document"""
+
+    def __init__(
+        self,
+        workers: int = settings.parse_workers,
+        max_queue_size: int = settings.parse_max_queue,
+        max_attempts: int = settings.parse_max_attempts,
+        stuck_seconds: int = settings.parse_stuck_seconds,
+        sweep_interval_seconds: int = settings.parse_sweep_interval_seconds
+    ):
+        self.max_attempts = max(1, max_attempts)
+        self.stuck_seconds = stuck_seconds
+        self.sweep_interval_seconds = sweep_interval_seconds
+        self.queue = JobQueue("parse", self._run_job, workers=workers, max_queue_size=max_queue_size)
+        self._queued_documents: Dict[str, str] = {}  # document_id -> job_id
+        self._last_sweep = 0.0
+
+    def submit(self, document_id: str, file_path: str, sha256: Optional[str] = None,
+               filename: str = "") -> Optional[Job]:
+        """Mettre un document en file; None si la file est pleine (il sera repris par le balayage)"""
+        if document_id in self._queued_documents:
+            return None
+        job = Job("parse", {"document_id": document_id, "file_path": file_path, "sha256": sha256,
+                            "filename": filename})
+        try:
+            self.queue.submit(job)
+        except asyncio.QueueFull:
+            logger.warning(f"Parse queue full, document {document_id} left pending")
+            return None
+        self._queued_documents[document_id] = job.id
+        return job
+
+    async def _run_job(self, job: Job) -> None:
+        document_id = job.params["document_id"]
+        try:
+            await self._parse_document(job, document_id, job.params["file_path"], job.params["sha256"],
+                                       job.params["filename"])
+        finally:
+            # Une nouvelle tentative a pu être mise en file sous un autre job
+            if self._queued_documents.get(document_id) == job.id:
+                del self._queued_documents[document_id]
+            self.queue.forget(job.id)
+
+    async def _parse_document(self, job: Job, document_id: str, file_path: str,
+                              sha256: Optional[str] = None, filename: str = "") -> None:
+        async with neo4j_connection.get_session() as session:
+            result = await session.run("""
+            MATCH (d:Document {id: $document_id})
+            WHERE d.status IN ['pending', 'processing']
+            SET d.status = 'processing',
+                d.parse_attempts = COALESCE(d.parse_attempts, 0) + 1,
+                d.parse_started_at = datetime()
+            RETURN d.parse_attempts as attempts, d.metadata as metadata, d.title as title
+            """, document_id=document_id)
+            record = await result.single()
+        if not record:
+            # Supprimé entre-temps ou déjà traité par une autre tentative
+            return
+
+        job.set_progress(0.2, "Parsing")
+        try:
+            parse_result = await parse_cached("document", file_path, sha256, filename)
+        except ParseQueueFull as e:
+            # Pool saturé : ni tentative consommée, ni relance immédiate; le balayage le reprendra
+            # après parse_stuck_seconds (parse_started_at vient d'être posé)
+            await self._mark_pending(document_id, str(e), refund_attempt=True)
+            return
+        except RETRYABLE_ERRORS as e:
+            if record["attempts"] < self.max_attempts:
+                await self._mark_pending(document_id, str(e))
+                del self._queued_documents[document_id]
+                self.submit(document_id, file_path, sha256, filename)
+                return
+            parse_result = {"success": False, "error": str(e)}
+        except ParseError as e:
+            parse_result = {"success": False, "error": str(e)}
+
+        job.set_progress(0.8, "Enregistrement du contenu")
+        success = bool(parse_result.get("success"))
+        details = {k: v for k, v in parse_result.items() if k not in ("success", "content", "error", "metadata")}
+        metadata = {
+            **decode_metadata(record["metadata"]),
+            **parse_result.get("metadata", {}),
+            **details
+        }
+        async with neo4j_connection.get_session() as session:
+            # Une seule transaction, statut posé en dernier : 'parsed' implique des blocs écrits.
+            # En cas d'échec le document reste 'processing' et le balayage le reprendra
+            chunks = await session.execute_write(
+                _store_parse_result,
+                document_id,
+                encode_content(parse_result.get("content")),
+                {
+                    "status": "parsed" if success else "failed",
+                    "metadata": encode_metadata(metadata),
+                    "success": success,
+                    "error": parse_result.get("error"),
+                }
+            )
+        search_service.index_document(document_id, chunks, record["title"])
+
+    async def _mark_pending(self, document_id: str, error: str, refund_attempt: bool = False) -> None:
+        async with neo4j_connection.get_session() as session:
+            await session.run("""
+            MATCH (d:Document {id: $document_id})
+            SET d.status = 'pending', d.parse_error = $error, d.updated_at = datetime(),
+                d.parse_attempts = CASE WHEN $refund THEN d.parse_attempts - 1 ELSE d.parse_attempts END
+            """, document_id=document_id, error=error, refund=refund_attempt)
+
+    async def recover_stuck(self, session, force: bool = False) -> Dict[str, int]:
+        """Reprendre les documents bloqués (worker perdu, redémarrage) ou les passer en échec"""
+        now = time.monotonic()
+        if not force and now - self._last_sweep < self.sweep_interval_seconds:
+            return {"requeued": 0, "failed": 0}
+        self._last_sweep = now
+
+        query = """
+        MATCH (d:Document)
+        WHERE d.status IN ['pending', 'processing']
+          AND COALESCE(d.parse_started_at, d.created_at) < datetime() - duration({seconds: $stuck_seconds})
+          AND NOT d.id IN $queued
+        RETURN d.id as id, d.file_path as file_path, d.filename as filename,
+               COALESCE(d.parse_attempts, 0) as attempts
+        """
+        result = await session.run(query,
+            stuck_seconds=self.stuck_seconds,
+            queued=list(self._queued_documents)
+        )
+        stuck = [dict(record) async for record in result]
+
+        exhausted = [doc["id"] for doc in stuck if doc["attempts"] >= self.max_attempts]
+        if exhausted:
+            await session.run("""
+            UNWIND $ids as id
+            MATCH (d:Document {id: id})
+            SET d.status = 'failed',
+                d.parsed_successfully = false,
+                d.parse_error = 'Parsing abandonné après ' + toString(d.parse_attempts) + ' tentatives',
+                d.updated_at = datetime()
+            """, ids=exhausted)
+
+        requeued = 0
+        for doc in stuck:
+            if doc["attempts"] < self.max_attempts and self.submit(doc["id"], doc["file_path"], filename=doc["filename"] or ""):
+                requeued += 1
+        if stuck:
+            logger.info(f"Parse sweep: {requeued} requeued, {len(exhausted)} failed")
+        return {"requeued": requeued, "failed": len(exhausted)}
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queue_depth": self.queue.queue_depth,
+            "queued_documents": len(self._queued_documents),
+            "pool": parse_pool.metrics(),
+            "cache": parse_cache.stats(),
+            "backends": parser_engine.metrics.snapshot(),
+        }
+
+
+# Instance globale
+document_ingestion = DocumentIngestion()
@@ -0,0 +1,223 @@
+import asyncio
+import json
+import logging
+import os
+import shutil
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+from app.core.config import settings
+from app.services.blob_store import blob_store
+from app.services.job_queue import Job, JobQueue
+from app.services.parse_pool import ParsePool, ParseError, ParseQueueFull
+
+logger = logging.getLogger(__name__)
+
+# À incrémenter quand le rendu change : les aperçus existants sont régénérés
+PREVIEW_VERSION = 1
+
+# mime_type -> format source du rendu
+PREVIEW_FORMATS = {
+    "application/pdf": "pdf",
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.document": "docx",
+}
+
+THUMBNAIL_NAME = "thumbnail.jpg"
+MANIFEST_NAME = "manifest.json"
+JPEG_QUALITY = 75
+
+
+def _docx_as_pdf(file_path: str, max_pages: int):
+    """Mise en page d'un DOCX (HTML mammoth) en PDF mémoire, comme l'export PDF des cours"""
+    import io
+    import fitz  # PyMuPDF
+    import mammoth
+    from app.services.pdf_renderer import PAGE_MARGIN
+
+    with open(file_path, "rb") as docx_file:
+        html = mammoth.convert_to_html(docx_file).value
+
+    buffer = io.BytesIO()
+    mediabox = fitz.paper_rect("a4")
+    where = mediabox + (PAGE_MARGIN, PAGE_MARGIN, -PAGE_MARGIN, -PAGE_MARGIN)
+    story = fitz.Story(html=html)
+    writer = fitz.DocumentWriter(buffer)
+    more = 1
+    pages = 0
+    while more and pages < max_pages:
+        device = writer.begin_page(mediabox)
+        more, _ = story.place(where)
+        story.draw(device)
+        writer.end_page()
+        pages += 1
+    writer.close()
+    return fitz.open("pdf", buffer.getvalue())
+
+
+def _save_jpeg(page, path: Path, width: int) -> Dict[str, int]:
+    import fitz  # PyMuPDF
+
+    zoom = width / page.rect.width
+    pixmap = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+    path.write_bytes(pixmap.tobytes("jpg", jpg_quality=JPEG_QUALITY))
+    return {"width": pixmap.width, "height": pixmap.height}
+
+
+def render_previews(file_path: str, output_dir: str, source_format: str, thumbnail_width: int,
+                    page_width: int, max_pages: int) -> Dict[str, Any]:
+    """Miniature de la première page et images basse résolution des premières pages (processus du pool)"""
+    import fitz  # PyMuPDF
+
+    if source_format == "docx":
+        doc = _docx_as_pdf(file_path, max_pages)
+    else:
+        doc = fitz.open(file_path)
+
+    # Écriture dans un répertoire temporaire renommé à la fin : jamais d'aperçu partiel visible
+    tmp_dir = Path(f"{output_dir}.{os.getpid()}.part")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    tmp_dir.mkdir(parents=True)
+    try:
+        manifest = {"version": PREVIEW_VERSION, "page_count": doc.page_count, "thumbnail": None, "pages": []}
+        for index in range(min(doc.page_count, max_pages)):
+            page = doc[index]
+            if index == 0:
+                manifest["thumbnail"] = {"name": THUMBNAIL_NAME, **_save_jpeg(page, tmp_dir / THUMBNAIL_NAME, thumbnail_width)}
+            name = f"page-{index + 1}.jpg"
+            manifest["pages"].append({"page": index + 1, "name": name, **_save_jpeg(page, tmp_dir / name, page_width)})
+        doc.close()
+        (tmp_dir / MANIFEST_NAME).write_text(json.dumps(manifest))
+        shutil.rmtree(output_dir, ignore_errors=True)
+        os.replace(tmp_dir, output_dir)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    return manifest
+
+
+class DocumentPreviews:
+    """Aperçus des PDF/DOCX uploadés, rendus en tâche de fond et rangés à côté du blob.
+
+    Les aperçus sont indexés par le SHA-256 du fichier : un même contenu n'est rendu qu'une fois,
+    un nouveau contenu (donc un nouveau hash) a ses propres aperçus.
+    """
+
+    def __init__(
+        self,
+        workers: int = settings.preview_workers,
+        max_queue_size: int = settings.preview_max_queue,
+        timeout_seconds: int = settings.preview_timeout_seconds
+    ):
+        # Pool de processus distinct : le rendu ne retarde pas le parsing des documents
+        self.pool = ParsePool(workers=workers, timeout_seconds=timeout_seconds, max_queue=max_queue_size)
+        self.queue = JobQueue("preview", self._run_job, workers=workers, max_queue_size=max_queue_size)
+        self._queued: Dict[str, str] = {}  # sha256 -> job_id
+        self._failed: Dict[str, str] = {}  # sha256 -> erreur (pas de nouvel essai avant redémarrage)
+
+    @staticmethod
+    def supports(mime_type: Optional[str]) -> bool:
+        return mime_type in PREVIEW_FORMATS
+
+    def preview_dir(self, sha256: str) -> Path:
+        blob_path = blob_store.blob_path(sha256)
+        return blob_path.with_name(f"{blob_path.name}.preview-v{PREVIEW_VERSION}")
+
+    def image_path(self, sha256: str, name: str) -> Path:
+        return self.preview_dir(sha256) / os.path.basename(name)
+
+    def is_ready(self, sha256: str) -> bool:
+        return (self.preview_dir(sha256) / MANIFEST_NAME).is_file()
+
+    def manifest(self, sha256: str) -> Optional[Dict[str, Any]]:
+        try:
+            return json.loads((self.preview_dir(sha256) / MANIFEST_NAME).read_text())
+        except (OSError, ValueError):
+            return None
+
+    def status(self, sha256: str) -> str:
+        if self.is_ready(sha256):
+            return "ready"
+        if sha256 in self._failed:
+            return "failed"
+        return "pending"
+
+    def submit(self, sha256: str, mime_type: Optional[str]) -> Optional[Job]:
+        """Mettre un rendu en file s'il manque; None si inutile, déjà en file ou file pleine"""
+        if not self.supports(mime_type) or sha256 in self._queued or sha256 in self._failed:
+            return None
+        if self.is_ready(sha256):
+            return None
+        job = Job("preview", {"sha256": sha256, "format": PREVIEW_FORMATS[mime_type]})
+        try:
+            self.queue.submit(job)
+        except asyncio.QueueFull:
+            logger.warning(f"Preview queue full, {sha256} will be rendered on first request")
+            return None
+        self._queued[sha256] = job.id
+        return job
+
+    async def _run_job(self, job: Job) -> None:
+        sha256 = job.params["sha256"]
+        try:
+            file_path = blob_store.blob_path(sha256)
+            if not file_path.is_file() or self.is_ready(sha256):
+                return
+            await self.pool.run(
+                "preview",
+                str(file_path),
+                str(self.preview_dir(sha256)),
+                job.params["format"],
+                settings.preview_thumbnail_width,
+                settings.preview_page_width,
+                settings.preview_max_pages
+            )
+            self._remove_stale(sha256)
+        except ParseQueueFull:
+            raise
+        except ParseError as e:
+            self._failed[sha256] = str(e)
+            raise
+        finally:
+            self._queued.pop(sha256, None)
+            self.queue.forget(job.id)
+
+    def _remove_stale(self, sha256: str) -> None:
+        """Aperçus d'une version précédente du rendu"""
+        current = self.preview_dir(sha256)
+        for path in current.parent.glob(f"{sha256}.preview-v*"):
+            # Les répertoires .part d'un rendu en cours ne sont pas concernés
+            if path != current and path.suffix != ".part" and path.is_dir():
+                shutil.rmtree(path, ignore_errors=True)
+
+    def describe(self, file_id: str, sha256: str) -> Dict[str, Any]:
+        """État des aperçus et URLs des images (versionnées : servies avec un cache immuable)"""
+        manifest = self.manifest(sha256)
+        if not manifest:
+            return {"status": self.status(sha256), "error": self._failed.get(sha256)}
+        base_url = f"/api/files/{file_id}/preview"
+        thumbnail = manifest.get("thumbnail")
+        return {
+            "status": "ready",
+            "page_count": manifest["page_count"],
+            "thumbnail": {**thumbnail, "url": f"{base_url}/{thumbnail['name']}?v={PREVIEW_VERSION}"} if thumbnail else None,
+            "pages": [
+                {**page, "url": f"{base_url}/{page['name']}?v={PREVIEW_VERSION}"}
+                for page in manifest["pages"]
+            ],
+        }
+
+    def thumbnail_url(self, file_id: Optional[str], sha256: Optional[str]) -> Optional[str]:
+        if not file_id or not sha256 or not self.is_ready(sha256):
+            return None
+        return f"/api/files/{file_id}/preview/{THUMBNAIL_NAME}?v={PREVIEW_VERSION}"
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queue_depth": self.queue.queue_depth,
+            "queued": len(self._queued),
+            "failed": len(self._failed),
+            "pool": self.pool.metrics(),
+        }
+
+
+# Instance globale
+document_previews = DocumentPreviews()
@@ -0,0 +1,101 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+from app.core.config import settings
+
+
+class ExportCache:
+    """Cache disque des exports, indexé par cours, format, options et version du contenu"""
+
+    def __init__(self, cache_dir: str = os.path.join(settings.export_dir, "cache"),
+                 max_bytes: int = settings.export_cache_max_bytes):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def cache_key(course_id: str, export_format: str, options: Dict[str, Any], content_version: int) -> str:
+        payload = json.dumps({
+            "course_id": course_id,
+            "format": export_format,
+            "options": options,
+            "content_version": content_version,
+        }, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _version_prefix(content_version: int) -> str:
+        return f"v{content_version}-"
+
+    def path_for(self, course_id: str, key: str, content_version: int, suffix: str) -> Path:
+        safe_course_id = os.path.basename(course_id)
+        return self.cache_dir / safe_course_id / f"{self._version_prefix(content_version)}{key}{suffix}"
+
+    def get(self, course_id: str, key: str, content_version: int, suffix: str) -> Optional[Path]:
+        path = self.path_for(course_id, key, content_version, suffix)
+        if not path.exists():
+            return None
+        try:
+            os.utime(path)  # marque l'entrée comme récemment utilisée
+        except FileNotFoundError:
+            return None
+        return path
+
+    def put(self, course_id: str, key: str, content_version: int, suffix: str, content: bytes) -> Path:
+        path = self.path_for(course_id, key, content_version, suffix)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.{threading.get_ident()}.part")
+        with open(tmp_path, "wb") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+        self.prune_stale_versions(course_id, content_version)
+        self.evict()
+        return path
+
+    def prune_stale_versions(self, course_id: str, content_version: int) -> None:
+        """Supprimer les exports des versions antérieures du cours"""
+        course_dir = self.cache_dir / os.path.basename(course_id)
+        if not course_dir.exists():
+            return
+        prefix = self._version_prefix(content_version)
+        for path in course_dir.iterdir():
+            if not path.name.startswith(prefix) and not path.name.endswith(".part"):
+                path.unlink(missing_ok=True)
+
+    def invalidate_course(self, course_id: str) -> None:
+        shutil.rmtree(self.cache_dir / os.path.basename(course_id), ignore_errors=True)
+
+    def evict(self) -> None:
+        """Supprimer les exports les moins récemment utilisés au-delà du quota"""
+        with self._lock:
+            if not self.cache_dir.exists():
+                return
+            entries = []
+            for path in self.cache_dir.glob("*/*"):
+                if path.name.endswith(".part"):
+                    continue
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+            total_size = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total_size <= self.max_bytes:
+                    break
+                path.unlink(missing_ok=True)
+                total_size -= size
+
+    def stats(self) -> Dict[str, Any]:
+        files = [path for path in self.cache_dir.glob("*/*") if not path.name.endswith(".part")] \
+            if self.cache_dir.exists() else []
+        return {"files": len(files), "bytes": sum(path.stat().st_size for path in files)}
+
+
+# Instance globale
+export_cache = ExportCache()
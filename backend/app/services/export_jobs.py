@@ -0,0 +1,204 @@
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+from app.core.config import settings
+from app.core.database import neo4j_connection
+from app.services.course_export import fetch_course_export_data, render_export, export_filename, EXPORT_FORMATS
+from app.services.export_cache import export_cache
+from app.services.pdf_renderer import pdf_renderer
+from app.services.job_queue import Job, JobQueue
+
+logger = logging.getLogger(__name__)
+
+
+class ExportJobManager:
+    """Exports de cours rendus en tâche de fond, artefacts conservés sur disque"""
+
+    def __init__(
+        self,
+        export_dir: str = settings.export_dir,
+        workers: int = settings.export_workers,
+        max_queue_size: int = settings.export_queue_size,
+        retention_seconds: int = settings.export_retention_seconds,
+        max_storage_bytes: int = settings.export_max_storage_bytes
+    ):
+        self.export_dir = Path(export_dir)
+        self.retention = timedelta(seconds=retention_seconds)
+        self.max_storage_bytes = max_storage_bytes
+        self.queue = JobQueue("export", self._run_job, workers=workers, max_queue_size=max_queue_size)
+
+    @staticmethod
+    def _cache_options(params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Options qui entrent dans la clé de cache; None si l'export n'est pas cachable"""
+        # Les analytics évoluent sans modifier le contenu du cours
+        if params["include_analytics"]:
+            return None
+        return {"include_qcms": params["include_qcms"]}
+
+    def lookup_cached(self, course: Dict[str, Any], export_format: str,
+                      include_qcms: bool = True, include_analytics: bool = False) -> Optional[Dict[str, Any]]:
+        """Artefact en cache pour la version courante du cours, sans requête ni rendu"""
+        options = self._cache_options({"include_qcms": include_qcms, "include_analytics": include_analytics})
+        if options is None:
+            return None
+        key = export_cache.cache_key(course["id"], export_format, options, course["content_version"])
+        path = export_cache.get(course["id"], key, course["content_version"], EXPORT_FORMATS[export_format][1])
+        if path is None:
+            return None
+        return {
+            "path": str(path),
+            "filename": export_filename(course, export_format),
+            "media_type": EXPORT_FORMATS[export_format][0],
+            "size": path.stat().st_size,
+            "etag": key,
+            "shared": True,
+        }
+
+    def submit(self, course: Dict[str, Any], current_user: dict, export_format: str,
+               include_qcms: bool = True, include_analytics: bool = False, published: bool = False) -> Job:
+        self.evict()
+        job = Job("export", {
+            "course_id": course["id"],
+            "format": export_format,
+            "include_qcms": include_qcms,
+            "include_analytics": include_analytics,
+            "published": published,
+            "user": {"id": current_user["id"], "role": current_user.get("role", "student")},
+        }, owner_id=current_user["id"])
+
+        cached = self.lookup_cached(course, export_format, include_qcms, include_analytics)
+        if cached is not None:
+            job.result = cached
+            job.message = "Servi depuis le cache"
+            return self.queue.record(job)
+
+        return self.queue.submit(job)
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self.queue.get(job_id)
+
+    async def _run_job(self, job: Job) -> None:
+        params = job.params
+
+        job.set_progress(0.1, "Chargement du cours")
+        async with neo4j_connection.get_session() as session:
+            course_data = await fetch_course_export_data(
+                session,
+                params["course_id"],
+                params["user"],
+                include_qcms=params["include_qcms"],
+                include_analytics=params["include_analytics"],
+                published=params["published"]
+            )
+        if not course_data:
+            raise ValueError("Course not found or not authorized")
+
+        export_format = params["format"]
+        filename = export_filename(course_data, export_format)
+        suffix = EXPORT_FORMATS[export_format][1]
+        options = self._cache_options(params)
+        # La version lue avec le contenu fait foi, même si le cours a changé depuis la mise en file
+        version = course_data["content_version"]
+        key = export_cache.cache_key(course_data["id"], export_format, options, version) if options is not None else None
+        # Un artefact mis en cache est servi à tous : il ne porte ni l'auteur ni la date de l'export
+        exported_by = params["user"]["id"] if key is None else None
+
+        if export_format == "pdf":
+            job.set_progress(0.3, "Préparation du document")
+            html, _ = await asyncio.to_thread(render_export, course_data, "print", exported_by)
+
+            job.set_progress(0.5, "Génération du PDF")
+            if key is not None:
+                output_path = export_cache.path_for(course_data["id"], key, version, suffix)
+            else:
+                output_path = self.export_dir / f"{job.id}{suffix}"
+            await pdf_renderer.render(html.decode("utf-8"), output_path)
+            if key is not None:
+                export_cache.prune_stale_versions(course_data["id"], version)
+                export_cache.evict()
+            size = output_path.stat().st_size
+        else:
+            job.set_progress(0.4, "Rendu de l'export")
+            content, _ = await asyncio.to_thread(render_export, course_data, export_format, exported_by)
+
+            job.set_progress(0.8, "Écriture de l'artefact")
+            if key is not None:
+                output_path = await asyncio.to_thread(
+                    export_cache.put, course_data["id"], key, version, suffix, content
+                )
+            else:
+                output_path = self.export_dir / f"{job.id}{suffix}"
+                await asyncio.to_thread(self._write_artifact, output_path, content)
+            size = len(content)
+
+        # Les fichiers du cache sont partagés : l'éviction des tâches ne doit pas les supprimer
+        job.result = {
+            "path": str(output_path),
+            "filename": filename,
+            "media_type": EXPORT_FORMATS[export_format][0],
+            "size": size,
+            "etag": key or job.id,
+            "shared": key is not None,
+        }
+        self.evict()
+
+    @staticmethod
+    def _write_artifact(path: Path, content: bytes) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(path.suffix + ".part")
+        with open(tmp_path, "wb") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+
+    def _drop(self, job: Job) -> None:
+        path = job.result.get("path")
+        if path and not job.result.get("shared"):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        self.queue.forget(job.id)
+
+    def evict(self) -> None:
+        """Supprimer les artefacts expirés puis les plus anciens au-delà du quota"""
+        now = datetime.now()
+        finished = [job for job in list(self.queue.jobs.values()) if job.is_finished]
+
+        for job in finished:
+            if now - job.finished_at > self.retention:
+                self._drop(job)
+
+        completed = sorted(
+            (job for job in self.queue.jobs.values()
+             if job.status == "completed" and not job.result.get("shared")),
+            key=lambda job: job.finished_at
+        )
+        total_size = sum(job.result.get("size", 0) for job in completed)
+        for job in completed:
+            if total_size <= self.max_storage_bytes:
+                break
+            total_size -= job.result.get("size", 0)
+            logger.info(f"Evicting export artifact {job.id} (storage quota)")
+            self._drop(job)
+
+    def stats(self) -> Dict[str, Any]:
+        jobs = list(self.queue.jobs.values())
+        return {
+            "queue_depth": self.queue.queue_depth,
+            "jobs": len(jobs),
+            "running": sum(1 for job in jobs if job.status == "running"),
+            "stored_bytes": sum(
+                job.result.get("size", 0) for job in jobs
+                if job.status == "completed" and not job.result.get("shared")
+            ),
+            "cache": export_cache.stats(),
+            "pdf": pdf_renderer.stats(),
+        }
+
+
+# Instance globale
+export_jobs = ExportJobManager()
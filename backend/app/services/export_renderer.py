@@ -0,0 +1,119 @@
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Any, Hashable, Optional
+
+from markupsafe import Markup
+
+TEMPLATES_DIR = Path(__file__).resolve().parent.parent / "templates" / "export"
+
+
+class FragmentCache:
+    """Cache LRU borné des fragments HTML déjà rendus"""
+
+    def __init__(self, max_entries: int = 5000):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Markup]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[Markup]:
+        with self._lock:
+            fragment = self._entries.get(key)
+            if fragment is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return fragment
+
+    def put(self, key: Hashable, fragment: Markup) -> None:
+        with self._lock:
+            self._entries[key] = fragment
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+class ExportRenderer:
+    """Rendu HTML des exports de cours à partir de templates précompilés"""
+
+    def __init__(self, templates_dir: Path = TEMPLATES_DIR, cache_size: int = 5000):
+        self.templates_dir = templates_dir
+        self.env = None
+        self.fragments = FragmentCache(cache_size)
+        self._lock = threading.Lock()
+
+    def _load(self) -> None:
+        """Importer Jinja2 et compiler les templates une seule fois, au premier export"""
+        if self.env is not None:
+            return
+        with self._lock:
+            if self.env is not None:
+                return
+            from jinja2 import Environment, FileSystemLoader, select_autoescape
+
+            env = Environment(
+                loader=FileSystemLoader(str(self.templates_dir)),
+                autoescape=select_autoescape(["html"], default=True),
+                auto_reload=False,
+                trim_blocks=True,
+                lstrip_blocks=True,
+            )
+            self.course_template = env.get_template("course.html")
+            self.block_template = env.get_template("block.html")
+            self.qcm_template = env.get_template("qcm.html")
+            self.env = env
+
+    @staticmethod
+    def _fragment_key(kind: str, item: Dict[str, Any]) -> Optional[tuple]:
+        """Clé de cache (type, id, updated_at); None si l'élément n'est pas versionné"""
+        if not item.get("id") or item.get("updated_at") is None:
+            return None
+        return (kind, item["id"], str(item["updated_at"]))
+
+    def _render_fragment(self, kind: str, template, item: Dict[str, Any]) -> Markup:
+        key = self._fragment_key(kind, item)
+        if key is not None:
+            cached = self.fragments.get(key)
+            if cached is not None:
+                return cached
+
+        fragment = Markup(template.render(**{kind: item}))
+        if key is not None:
+            self.fragments.put(key, fragment)
+        return fragment
+
+    def render_block(self, block: Dict[str, Any]) -> Markup:
+        self._load()
+        return self._render_fragment("block", self.block_template, block)
+
+    def render_qcm(self, qcm: Dict[str, Any]) -> Markup:
+        self._load()
+        return self._render_fragment("qcm", self.qcm_template, qcm)
+
+    def render_course(self, course_data: Dict[str, Any], print_mode: bool = False) -> str:
+        """Assembler la page complète; seuls les blocs/QCM modifiés sont re-rendus"""
+        self._load()
+        block_fragments = [self.render_block(block) for block in course_data.get("blocks", [])]
+        qcm_fragments = [self.render_qcm(qcm) for qcm in course_data.get("qcms") or []]
+
+        return self.course_template.render(
+            course=course_data,
+            block_fragments=block_fragments,
+            qcm_fragments=qcm_fragments,
+            metadata=course_data.get("export_metadata", {}),
+            print_mode=print_mode,
+        )
+
+
+# Instance globale
+export_renderer = ExportRenderer()
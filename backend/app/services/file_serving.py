@@ -0,0 +1,173 @@
+import os
+import re
+import stat
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Dict, Optional, Tuple
+from urllib.parse import quote
+
+import anyio
+from fastapi import Request
+from fastapi.responses import Response
+from starlette.types import Receive, Scope, Send
+
+# Extensions ASGI de transfert sans copie (fichier envoyé par le serveur, sans passer par Python)
+ZEROCOPY_EXTENSION = "http.response.zerocopysend"
+PATHSEND_EXTENSION = "http.response.pathsend"
+
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE = "no-cache"
+
+RANGE_PATTERN = re.compile(r"^\s*bytes\s*=\s*(\d*)\s*-\s*(\d*)\s*$")
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """Plage [start, end] (incluse) d'un en-tête Range à plage unique.
+
+    None : en-tête absent ou non géré (plages multiples, autre unité), le fichier entier est servi.
+    (size, size) : plage non satisfaisable (416).
+    """
+    if not header:
+        return None
+    match = RANGE_PATTERN.match(header)
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first:
+        if not last:
+            return None
+        # Suffixe : les N derniers octets
+        length = int(last)
+        if length == 0 or size == 0:
+            return size, size
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return size, size
+    return start, end
+
+
+def etag_matches(etag: str, header: str) -> bool:
+    """Comparaison faible de If-None-Match (RFC 9110)"""
+    if header.strip() == "*":
+        return True
+    return etag.removeprefix("W/") in [tag.strip().removeprefix("W/") for tag in header.split(",")]
+
+
+def not_modified(request: Request, etag: str, mtime: float) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return etag_matches(etag, if_none_match)
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+class RangeFileResponse(Response):
+    """Fichier entier ou plage d'octets, envoyé sans copie si le serveur ASGI le permet"""
+
+    chunk_size = 256 * 1024
+
+    def __init__(self, path: str, stat_result: os.stat_result, headers: Dict[str, str],
+                 media_type: str, byte_range: Optional[Tuple[int, int]] = None, head_only: bool = False):
+        self.path = path
+        self.size = stat_result.st_size
+        self.byte_range = byte_range
+        self.head_only = head_only
+        self.status_code = 206 if byte_range else 200
+        self.media_type = media_type
+        self.background = None
+        self.init_headers(headers)
+        if byte_range:
+            start, end = byte_range
+            self.headers["content-range"] = f"bytes {start}-{end}/{self.size}"
+            self.headers["content-length"] = str(end - start + 1)
+        else:
+            self.headers["content-length"] = str(self.size)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if self.head_only:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        start, end = self.byte_range or (0, self.size - 1)
+        count = end - start + 1
+        extensions = scope.get("extensions") or {}
+        if count > 0 and ZEROCOPY_EXTENSION in extensions:
+            with open(self.path, "rb") as file:
+                await send({"type": ZEROCOPY_EXTENSION, "file": file, "offset": start, "count": count,
+                            "more_body": False})
+            return
+        if self.byte_range is None and PATHSEND_EXTENSION in extensions:
+            await send({"type": PATHSEND_EXTENSION, "path": str(self.path)})
+            return
+
+        async with await anyio.open_file(self.path, mode="rb") as file:
+            await file.seek(start)
+            remaining = count
+            while remaining > 0:
+                chunk = await file.read(min(self.chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+        if remaining > 0 or count <= 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+
+def file_response(request: Request, path: str, filename: Optional[str] = None,
+                  media_type: Optional[str] = None, content_key: Optional[str] = None) -> Response:
+    """Servir un fichier avec validateurs (ETag, Last-Modified), 304 et requêtes Range.
+
+    Un fichier identifié par son contenu (content_key : SHA-256 du blob, ou dérivé) ne change
+    jamais : ETag fort = clé, cache immuable. Les autres fichiers sont revalidés à chaque visite.
+    """
+    stat_result = os.stat(path)
+    if not stat.S_ISREG(stat_result.st_mode):
+        raise FileNotFoundError(path)
+
+    if content_key:
+        etag = f'"{content_key}"'
+        cache_control = IMMUTABLE_CACHE
+    else:
+        etag = f'W/"{int(stat_result.st_mtime)}-{stat_result.st_size}"'
+        cache_control = REVALIDATE_CACHE
+    headers = {
+        "etag": etag,
+        "last-modified": formatdate(stat_result.st_mtime, usegmt=True),
+        "cache-control": cache_control,
+        "accept-ranges": "bytes",
+    }
+
+    if not_modified(request, etag, stat_result.st_mtime):
+        return Response(status_code=304, headers=headers)
+
+    if filename:
+        quoted = quote(filename)
+        headers["content-disposition"] = (
+            f"attachment; filename*=utf-8''{quoted}" if quoted != filename else f'attachment; filename="{filename}"'
+        )
+
+    byte_range = parse_range(request.headers.get("range"), stat_result.st_size)
+    if_range = request.headers.get("if-range")
+    # If-Range : la plage n'est valable que si le client a encore la même version (ETag fort ou date)
+    if byte_range and if_range:
+        strong_match = not etag.startswith("W/") and if_range.strip() == etag
+        if not strong_match and if_range.strip() != headers["last-modified"]:
+            byte_range = None
+    if byte_range == (stat_result.st_size, stat_result.st_size):
+        return Response(status_code=416, headers={**headers, "content-range": f"bytes */{stat_result.st_size}"})
+
+    return RangeFileResponse(
+        path,
+        stat_result,
+        headers,
+        media_type or "application/octet-stream",
+        byte_range=byte_range,
+        head_only=request.method == "HEAD"
+    )
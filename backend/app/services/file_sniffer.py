@@ -0,0 +1,176 @@
+import os
+import struct
+from typing import Dict, List, Optional
+
+SNIFF_BYTES = 8192
+ZIP_TAIL_BYTES = 65536 + 22  # EOCD (22 octets) + commentaire d'archive maximal
+ZIP_MAX_ENTRIES = 2000
+
+# Signatures binaires -> type MIME
+MAGIC_NUMBERS = [
+    (b"%PDF", "application/pdf"),
+    (b"PK\x03\x04", "application/zip"),
+    (b"PK\x05\x06", "application/zip"),  # archive vide
+    (b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1", "application/msword"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+]
+
+TEXT_EXTENSIONS = {
+    ".csv": "text/csv",
+    ".json": "application/json",
+    ".md": "text/markdown",
+}
+
+# Partie OOXML caractéristique -> type MIME
+OOXML_PARTS = [
+    ("word/document.xml", "application/vnd.openxmlformats-officedocument.wordprocessingml.document"),
+    ("ppt/presentation.xml", "application/vnd.openxmlformats-officedocument.presentationml.presentation"),
+    ("xl/workbook.xml", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+]
+
+# Type MIME -> format court utilisé par les routes
+MIME_FORMATS = {
+    "application/pdf": "pdf",
+    "application/msword": "doc",
+    "application/zip": "zip",
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.document": "docx",
+    "application/vnd.openxmlformats-officedocument.presentationml.presentation": "pptx",
+    "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet": "xlsx",
+    "application/vnd.oasis.opendocument.text": "odt",
+    "application/vnd.oasis.opendocument.presentation": "odp",
+    "application/vnd.oasis.opendocument.spreadsheet": "ods",
+    "text/plain": "text",
+    "text/markdown": "markdown",
+    "text/csv": "csv",
+    "application/json": "json",
+}
+
+
+class SniffResult:
+    """Type détecté d'un fichier"""
+
+    def __init__(self, mime_type: str, encoding: Optional[str] = None):
+        self.mime_type = mime_type
+        self.encoding = encoding  # fichiers texte uniquement
+
+    @property
+    def format(self) -> str:
+        if self.mime_type in MIME_FORMATS:
+            return MIME_FORMATS[self.mime_type]
+        if self.mime_type.startswith("image/"):
+            return "image"
+        return "binary"
+
+    @property
+    def is_container(self) -> bool:
+        """Archive ZIP dont le type exact dépend du répertoire central"""
+        return self.mime_type == "application/zip"
+
+    def to_dict(self) -> Dict[str, Optional[str]]:
+        return {"mime_type": self.mime_type, "format": self.format, "encoding": self.encoding}
+
+
+def _text_encoding(head: bytes) -> Optional[str]:
+    # Un caractère multi-octets peut être coupé en fin de tampon : on ignore les 3 derniers octets
+    sample = head[:-3] if len(head) > 3 else head
+    if b"\x00" in sample:
+        return None
+    try:
+        sample.decode("utf-8")
+        return "utf-8"
+    except UnicodeDecodeError:
+        pass
+    # Latin-1 décode tout : on n'accepte que si les octets de contrôle sont rares
+    control = sum(1 for byte in sample if byte < 32 and byte not in (9, 10, 13))
+    return "latin-1" if control <= len(sample) // 100 else None
+
+
+def _odf_mime_type(head: bytes) -> Optional[str]:
+    """ODF : première entrée 'mimetype' stockée sans compression, lisible directement dans l'en-tête"""
+    if len(head) < 38 or head[30:38] != b"mimetype":
+        return None
+    compression, = struct.unpack("<H", head[8:10])
+    size, = struct.unpack("<I", head[18:22])
+    extra_length, = struct.unpack("<H", head[28:30])
+    start = 38 + extra_length
+    if compression != 0 or not 0 < size < 100 or len(head) < start + size:
+        return None
+    return head[start:start + size].decode("ascii", errors="replace")
+
+
+def text_extension(filename: str) -> str:
+    """Extension qui décide du format d'un fichier texte ('' si le contenu seul décide)"""
+    extension = os.path.splitext(filename)[1].lower()
+    return extension if extension in TEXT_EXTENSIONS else ""
+
+
+def sniff(head: bytes, filename: str = "") -> SniffResult:
+    """Type déduit des premiers octets; les archives ZIP non ODF restent 'application/zip'"""
+    for signature, mime_type in MAGIC_NUMBERS:
+        if head.startswith(signature):
+            if mime_type == "application/zip":
+                return SniffResult(_odf_mime_type(head) or mime_type)
+            return SniffResult(mime_type)
+
+    encoding = _text_encoding(head)
+    if encoding is None:
+        return SniffResult("application/octet-stream")
+
+    extension = text_extension(filename)
+    if extension:
+        return SniffResult(TEXT_EXTENSIONS[extension], encoding)
+    if head.lstrip()[:1] in (b"{", b"["):
+        return SniffResult("application/json", encoding)
+    return SniffResult("text/plain", encoding)
+
+
+def zip_entry_names(f) -> List[str]:
+    """Noms des entrées lus dans le répertoire central, sans décompresser l'archive"""
+    f.seek(0, os.SEEK_END)
+    file_size = f.tell()
+    tail_size = min(file_size, ZIP_TAIL_BYTES)
+    f.seek(file_size - tail_size)
+    tail = f.read(tail_size)
+
+    eocd = tail.rfind(b"PK\x05\x06")
+    if eocd < 0 or len(tail) < eocd + 22:
+        return []
+    entry_count, cd_size, cd_offset = struct.unpack("<HII", tail[eocd + 10:eocd + 20])
+
+    # Le répertoire central précède l'EOCD : souvent déjà dans le tampon de fin
+    tail_start = file_size - tail_size
+    if cd_offset >= tail_start:
+        directory = tail[cd_offset - tail_start:cd_offset - tail_start + cd_size]
+    else:
+        f.seek(cd_offset)
+        directory = f.read(cd_size)
+
+    names = []
+    position = 0
+    while len(names) < min(entry_count, ZIP_MAX_ENTRIES) and directory[position:position + 4] == b"PK\x01\x02":
+        name_length, extra_length, comment_length = struct.unpack("<HHH", directory[position + 28:position + 34])
+        name = directory[position + 46:position + 46 + name_length]
+        names.append(name.decode("utf-8", errors="replace"))
+        position += 46 + name_length + extra_length + comment_length
+    return names
+
+
+def container_mime_type(names: List[str]) -> str:
+    entries = set(names)
+    if "[Content_Types].xml" in entries:
+        for part, mime_type in OOXML_PARTS:
+            if part in entries:
+                return mime_type
+    return "application/zip"
+
+
+def sniff_file(file_path: str, filename: str = "") -> SniffResult:
+    """Détection en une ouverture : en-tête, puis répertoire central pour les archives ZIP"""
+    with open(file_path, "rb") as f:
+        result = sniff(f.read(SNIFF_BYTES), filename or file_path)
+        if result.is_container:
+            result = SniffResult(container_mime_type(zip_entry_names(f)))
+    return result
@@ -0,0 +1,129 @@
+import asyncio
+import logging
+import uuid
+from datetime import datetime
+from typing import Dict, Any, Optional, Callable, Awaitable
+
+logger = logging.getLogger(__name__)
+
+
+class Job:
+    """Tâche de fond suivie en mémoire"""
+
+    def __init__(self, kind: str, params: Dict[str, Any], owner_id: Optional[str] = None):
+        self.id = str(uuid.uuid4())
+        self.kind = kind
+        self.params = params
+        self.owner_id = owner_id
+        self.status = "queued"  # queued, running, completed, failed
+        self.progress = 0.0
+        self.message: Optional[str] = None
+        self.result: Dict[str, Any] = {}
+        self.error: Optional[str] = None
+        self.created_at = datetime.now()
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in ("completed", "failed")
+
+    def set_progress(self, progress: float, message: Optional[str] = None) -> None:
+        self.progress = round(max(0.0, min(progress, 1.0)), 3)
+        if message is not None:
+            self.message = message
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "progress": self.progress,
+            "message": self.message,
+            "error": self.error,
+            "created_at": self.created_at.isoformat(),
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+
+JobHandler = Callable[[Job], Awaitable[None]]
+
+
+class JobQueue:
+    """File de tâches asynchrone servie par un nombre borné de workers"""
+
+    def __init__(self, name: str, handler: JobHandler, workers: int = 2, max_queue_size: int = 100):
+        self.name = name
+        self.handler = handler
+        self.workers = max(1, workers)
+        self.max_queue_size = max_queue_size
+        self.jobs: Dict[str, Job] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks = []
+
+    def _ensure_started(self) -> None:
+        # Démarrage paresseux : la boucle d'événements n'existe qu'à la première requête
+        if self._queue is not None:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._tasks = [
+            asyncio.create_task(self._worker(i), name=f"{self.name}-worker-{i}")
+            for i in range(self.workers)
+        ]
+        logger.info(f"Started {self.workers} '{self.name}' workers")
+
+    async def _worker(self, index: int) -> None:
+        while True:
+            job = await self._queue.get()
+            job.status = "running"
+            job.started_at = datetime.now()
+            try:
+                await self.handler(job)
+                job.status = "completed"
+                job.set_progress(1.0)
+            except asyncio.CancelledError:
+                job.status = "failed"
+                job.error = "Cancelled"
+                raise
+            except Exception as e:
+                logger.error(f"Job {job.id} ({self.name}) failed: {e}")
+                job.status = "failed"
+                job.error = str(e)
+            finally:
+                job.finished_at = datetime.now()
+                self._queue.task_done()
+
+    def submit(self, job: Job) -> Job:
+        """Mettre une tâche en file; lève asyncio.QueueFull si la file est pleine"""
+        self._ensure_started()
+        self._queue.put_nowait(job)
+        self.jobs[job.id] = job
+        return job
+
+    def record(self, job: Job) -> Job:
+        """Enregistrer une tâche terminée sans passer par les workers (ex. résultat en cache)"""
+        now = datetime.now()
+        job.status = "completed"
+        job.set_progress(1.0)
+        job.started_at = job.started_at or now
+        job.finished_at = now
+        self.jobs[job.id] = job
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self.jobs.get(job_id)
+
+    def forget(self, job_id: str) -> Optional[Job]:
+        return self.jobs.pop(job_id, None)
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def shutdown(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
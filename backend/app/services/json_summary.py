@@ -0,0 +1,230 @@
+import codecs
+import json
+import re
+from typing import Dict, Any, Iterable, List, Optional
+
+CHUNK_BYTES = 1024 * 1024
+MAX_PATHS = 200
+MAX_KEYS_PER_PATH = 100
+SAMPLE_MAX_CHARS = 65536
+NUMBER_START = frozenset("-0123456789")
+
+# Chaîne (éventuellement coupée en fin de morceau), ponctuation, ou scalaire
+TOKEN = re.compile(r'"(?:[^"\\]|\\.)*\\?(?P<close>"?)|[{}\[\],:]|[^\s{}\[\],:"]+')
+
+
+class _Frame:
+    __slots__ = ("kind", "path", "length", "expecting_key", "key", "colon", "value_done")
+
+    def __init__(self, kind: str, path: str):
+        self.kind = kind
+        self.path = path
+        self.length = 0
+        self.expecting_key = kind == "object"
+        self.key: Optional[str] = None
+        self.colon = False
+        self.value_done = False  # valeur lue : ',' ou fermeture attendue
+
+
+class JsonSummary:
+    """Résumé structurel d'un JSON lu par morceaux : clés, longueurs des tableaux, profondeur.
+
+    Aucun arbre d'objets n'est construit; seuls les premiers éléments de la racine
+    peuvent être conservés comme échantillon (sample_items > 0).
+    """
+
+    def __init__(self, sample_items: int = 0):
+        self.sample_items = sample_items
+        self.stack: List[_Frame] = []
+        self.root_type: Optional[str] = None
+        self.max_depth = 0
+        self.keys: Dict[str, List[str]] = {}
+        self.arrays: Dict[str, Dict[str, int]] = {}
+        self._sample: List[str] = []
+        self._sample_piece: List[str] = []
+        self._sample_chars = 0
+        self._sample_done = sample_items <= 0
+        self._pending = ""
+        self._closed_root = False
+        self.length = 0  # éléments ou clés de la racine
+
+    # Enregistrement de la structure
+
+    def _child_path(self) -> str:
+        if not self.stack:
+            return "$"
+        parent = self.stack[-1]
+        return f"{parent.path}[]" if parent.kind == "array" else f"{parent.path}.{parent.key}"
+
+    def _add_key(self, path: str, key: str) -> None:
+        keys = self.keys.get(path)
+        if keys is None:
+            if len(self.keys) >= MAX_PATHS:
+                return
+            keys = self.keys[path] = []
+        if len(keys) < MAX_KEYS_PER_PATH and key not in keys:
+            keys.append(key)
+
+    def _add_array(self, path: str, length: int) -> None:
+        stats = self.arrays.get(path)
+        if stats is None:
+            if len(self.arrays) >= MAX_PATHS:
+                return
+            stats = self.arrays[path] = {"count": 0, "min_length": length, "max_length": length, "total_items": 0}
+        stats["count"] += 1
+        stats["min_length"] = min(stats["min_length"], length)
+        stats["max_length"] = max(stats["max_length"], length)
+        stats["total_items"] += length
+
+    def _value_start(self, kind: str) -> None:
+        if self._closed_root:
+            raise ValueError("données après la valeur racine")
+        if not self.stack:
+            self.root_type = kind
+            return
+        parent = self.stack[-1]
+        if parent.kind == "array":
+            if parent.value_done:
+                raise ValueError("',' attendue entre deux valeurs")
+            parent.length += 1
+        elif not parent.colon:
+            raise ValueError("valeur sans clé")
+        else:
+            parent.colon = False
+        parent.value_done = True
+
+    # Échantillon : texte brut des premiers éléments de la racine, relu en fin d'analyse
+
+    def _capture(self, token: str) -> None:
+        if self._sample_done:
+            return
+        self._sample_piece.append(token)
+        self._sample_chars += len(token)
+        if self._sample_chars > SAMPLE_MAX_CHARS:
+            # Élément trop gros : l'échantillon s'arrête aux éléments complets déjà lus
+            self._sample_piece = []
+            self._sample_done = True
+
+    def _end_sample_item(self) -> None:
+        if not self._sample_done and self._sample_piece:
+            self._sample.append("".join(self._sample_piece))
+            self._sample_done = len(self._sample) >= self.sample_items
+        self._sample_piece = []
+
+    def _token(self, token: str) -> None:
+        first = token[0]
+        top = self.stack[-1] if self.stack else None
+        depth = len(self.stack)
+
+        if first in "{[":
+            kind = "object" if first == "{" else "array"
+            self._value_start(kind)
+            self.stack.append(_Frame(kind, self._child_path()))
+            self.max_depth = max(self.max_depth, len(self.stack))
+        elif first in "}]":
+            kind = "object" if first == "}" else "array"
+            if top is None or top.kind != kind:
+                raise ValueError("fermeture inattendue")
+            if top.length and not top.value_done:
+                raise ValueError("valeur attendue avant la fermeture")
+            self.stack.pop()
+            if kind == "array":
+                self._add_array(top.path, top.length)
+            if not self.stack:
+                self._closed_root = True
+                self.length = top.length
+                self._end_sample_item()
+                return
+        elif first == ",":
+            if top is None:
+                raise ValueError("virgule hors conteneur")
+            if not top.value_done:
+                raise ValueError("valeur attendue avant ','")
+            top.value_done = False
+            if top.kind == "object":
+                top.expecting_key = True
+            if depth == 1:
+                self._end_sample_item()
+                return
+        elif first == ":":
+            if top is None or top.kind != "object" or top.expecting_key or top.colon or top.value_done:
+                raise ValueError("':' inattendu")
+            top.colon = True
+        elif top is not None and top.kind == "object" and top.expecting_key:
+            if first != '"':
+                raise ValueError("clé attendue")
+            top.key = json.loads(token) if "\\" in token else token[1:-1]
+            top.expecting_key = False
+            top.length += 1
+            self._add_key(top.path, top.key)
+        else:
+            self._value_start("string" if first == '"' else _scalar_type(token))
+            if not self.stack:
+                self._closed_root = True
+
+        if depth >= 1 and self.sample_items:
+            self._capture(token)
+
+    def feed(self, text: str, final: bool = False) -> None:
+        buffer = self._pending + text
+        self._pending = ""
+        match = None
+        token = None
+        # Traitement avec un jeton de retard : seul le dernier peut être coupé par la fin du morceau
+        for match in TOKEN.finditer(buffer):
+            if token is not None:
+                self._token(token)
+            token = match.group()
+        if match is None:
+            return
+        if match.end() == len(buffer) and not final:
+            self._pending = token
+            return
+        if token[0] == '"' and not match.group("close"):
+            raise ValueError("chaîne non terminée")
+        self._token(token)
+
+    def close(self) -> Dict[str, Any]:
+        self.feed("", final=True)
+        if self.root_type is None:
+            raise ValueError("document vide")
+        if self.stack:
+            raise ValueError("document tronqué")
+        summary = {
+            "root_type": self.root_type,
+            "max_depth": self.max_depth,
+            "keys": self.keys,
+            "arrays": self.arrays,
+        }
+        if self.root_type in ("array", "object"):
+            summary["length"] = self.length
+        if self.sample_items:
+            summary["sample"] = self._decode_sample()
+        return summary
+
+    def _decode_sample(self):
+        if self.root_type == "array":
+            return [json.loads(item) for item in self._sample]
+        if self.root_type == "object":
+            return json.loads("{" + ",".join(self._sample) + "}")
+        return []
+
+
+def _scalar_type(token: str) -> str:
+    if token[0] in NUMBER_START:
+        return "number"
+    if token in ("true", "false"):
+        return "boolean"
+    if token == "null":
+        return "null"
+    raise ValueError(f"jeton '{token[:20]}'")
+
+
+def summarize_json(chunks: Iterable[bytes], sample_items: int = 0) -> Dict[str, Any]:
+    """Résumer un JSON UTF-8 fourni par morceaux d'octets, en mémoire bornée"""
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    summary = JsonSummary(sample_items)
+    for chunk in chunks:
+        summary.feed(decoder.decode(chunk))
+    summary.feed(decoder.decode(b"", final=True))
+    return summary.close()
@@ -0,0 +1,144 @@
+import asyncio
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+from app.core.config import settings
+from app.services.file_sniffer import text_extension
+from app.services.parse_pool import parse_pool, PARSER_VERSIONS
+from app.services.parser_engine import parser_engine
+from app.services.pdf_extraction import extract_pdf, extract_pdf_document, is_pdf
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def file_sha256(file_path: str) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        while True:
+            chunk = f.read(HASH_CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ParseCache:
+    """Cache disque des résultats de parsing, indexé par empreinte du contenu et version du parseur"""
+
+    def __init__(self, cache_dir: str = os.path.join(settings.upload_dir, "parse_cache"),
+                 max_bytes: int = settings.parse_cache_max_bytes):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def path_for(self, sha256: str, kind: str, variant: str = "") -> Path:
+        sha256 = os.path.basename(sha256)
+        # La version du parseur fait partie du nom : une montée de version invalide sans purge.
+        # variant : ce qui, hors contenu, change le résultat (extension d'un fichier texte)
+        suffix = f"-{os.path.basename(variant)}" if variant else ""
+        return self.cache_dir / sha256[:2] / f"{sha256}-{kind}{suffix}-v{PARSER_VERSIONS[kind]}.json"
+
+    def get(self, sha256: str, kind: str, variant: str = "") -> Optional[Any]:
+        path = self.path_for(sha256, kind, variant)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                result = json.load(f)
+            os.utime(path)  # marque l'entrée comme récemment utilisée
+        except (FileNotFoundError, ValueError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return result
+
+    def put(self, sha256: str, kind: str, result: Any, variant: str = "") -> Path:
+        path = self.path_for(sha256, kind, variant)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.{threading.get_ident()}.part")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, default=str)
+        os.replace(tmp_path, path)
+        self.evict()
+        return path
+
+    def evict(self) -> None:
+        """Supprimer les résultats les moins récemment utilisés au-delà du quota"""
+        with self._lock:
+            if not self.cache_dir.exists():
+                return
+            entries = []
+            for path in self.cache_dir.glob("*/*.json"):
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+            total_size = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total_size <= self.max_bytes:
+                    break
+                path.unlink(missing_ok=True)
+                total_size -= size
+
+    def stats(self) -> Dict[str, Any]:
+        files = list(self.cache_dir.glob("*/*.json")) if self.cache_dir.exists() else []
+        lookups = self.hits + self.misses
+        return {
+            "files": len(files),
+            "bytes": sum(path.stat().st_size for path in files),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+        }
+
+
+def _is_cacheable(kind: str, result: Any) -> bool:
+    # Un échec du parseur (format non supporté, fichier corrompu) n'est pas mis en cache
+    if kind == "document":
+        return isinstance(result, dict) and bool(result.get("success"))
+    return True
+
+
+async def _run_parser(kind: str, file_path: str, filename: str = "") -> Any:
+    # Les PDF sont découpés en plages de pages extraites en parallèle
+    if kind == "pdf":
+        result = await extract_pdf(file_path)
+    elif kind == "document" and await asyncio.to_thread(is_pdf, file_path):
+        result = await extract_pdf_document(file_path)
+    elif kind == "document":
+        # Nom d'origine : les blobs n'ont pas d'extension, or elle distingue CSV, Markdown et texte
+        result = await parse_pool.run(kind, file_path, filename)
+    else:
+        result = await parse_pool.run(kind, file_path)
+
+    # Les durées mesurées dans les workers sont agrégées ici, dans le processus de l'API
+    if isinstance(result, dict):
+        parser_engine.metrics.record(result.get("parser"), result.get("duration_ms"), result.get("success", True))
+    return result
+
+
+async def parse_cached(kind: str, file_path: str, sha256: Optional[str] = None, filename: str = "") -> Any:
+    """Parser via le pool, sauf si ce contenu a déjà été parsé par la même version du parseur"""
+    if sha256 is None:
+        sha256 = await asyncio.to_thread(file_sha256, file_path)
+
+    # Un même contenu texte nommé .csv ou sans extension n'est pas parsé de la même façon
+    variant = text_extension(filename or file_path).lstrip(".") if kind == "document" else ""
+
+    cached = await asyncio.to_thread(parse_cache.get, sha256, kind, variant)
+    if cached is not None:
+        return cached
+
+    result = await _run_parser(kind, file_path, filename)
+    if _is_cacheable(kind, result):
+        await asyncio.to_thread(parse_cache.put, sha256, kind, result, variant)
+    return result
+
+
+# Instance globale
+parse_cache = ParseCache()
@@ -0,0 +1,235 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import time
+from collections import deque
+from typing import Dict, Any, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+RSS_CHECK_INTERVAL = 0.1  # secondes
+
+# À incrémenter quand la sortie d'un parseur change : invalide les résultats en cache
+PARSER_VERSIONS = {
+    "document": 3,
+    "pdf": 3,
+    "docx": 2,
+    "text": 1,
+}
+
+
+class ParseError(Exception):
+    """Échec d'un parsing exécuté dans le pool"""
+
+
+class ParseTimeout(ParseError):
+    pass
+
+
+class ParseMemoryExceeded(ParseError):
+    pass
+
+
+class ParseWorkerCrashed(ParseError):
+    pass
+
+
+class ParseQueueFull(ParseError):
+    pass
+
+
+def run_parser(kind: str, file_path: str, *args) -> Any:
+    """Exécuter un parseur par son nom (appelé dans le processus worker)"""
+    if kind == "document":
+        from app.services.document_parser import document_parser
+        return document_parser.parse_document(file_path, *args)
+    if kind == "pdf_page_count":
+        from app.services.text_extractors import pdf_page_count
+        return pdf_page_count(file_path)
+    if kind == "pdf_pages":
+        from app.services.text_extractors import extract_pdf_pages
+        return extract_pdf_pages(file_path, *args)
+    if kind == "preview":
+        from app.services.document_previews import render_previews
+        return render_previews(file_path, *args)
+    if kind in ("docx", "text"):
+        from app.services.parser_engine import parser_engine
+        result = parser_engine.parse(file_path, kind)
+        if not result.success:
+            raise ValueError(result.error)
+        return result.content.strip()
+    raise ValueError(f"Unknown parser: {kind}")
+
+
+def _worker_main(conn) -> None:
+    """Boucle du processus worker : reçoit (kind, chemin, args), renvoie ("ok"|"error", valeur)"""
+    while True:
+        try:
+            message = conn.recv()
+        except (EOFError, KeyboardInterrupt):
+            break
+        if message is None:
+            break
+        kind, file_path, args = message
+        try:
+            conn.send(("ok", run_parser(kind, file_path, *args)))
+        except MemoryError:
+            conn.send(("error", "Mémoire insuffisante pendant le parsing"))
+        except Exception as e:
+            conn.send(("error", str(e)))
+    conn.close()
+
+
+def _rss_bytes(pid: int) -> Optional[int]:
+    """Mémoire résidente d'un processus (Linux uniquement)"""
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class _Worker:
+    def __init__(self, context):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_conn,), daemon=True)
+        self.process.start()
+        child_conn.close()
+
+    def kill(self) -> None:
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join(timeout=1)
+        self.conn.close()
+
+
+class ParsePool:
+    """Pool de processus dédié au parsing, avec délai maximal, limite RSS et isolation des plantages"""
+
+    def __init__(
+        self,
+        workers: int = settings.parse_workers,
+        timeout_seconds: float = settings.parse_timeout_seconds,
+        max_rss_bytes: int = settings.parse_max_rss_mb * 1024 * 1024,
+        max_queue: int = settings.parse_max_queue
+    ):
+        self.size = max(1, workers)
+        self.timeout_seconds = timeout_seconds
+        self.max_rss_bytes = max_rss_bytes
+        self.max_queue = max_queue
+        self._context = multiprocessing.get_context("spawn")
+        self._idle: Optional[asyncio.Queue] = None
+        self._waiting = 0
+        self._running = 0
+        self._counters = {"completed": 0, "failed": 0, "timeouts": 0, "memory_kills": 0, "crashes": 0}
+        self._durations = deque(maxlen=500)
+
+    async def _ensure_started(self) -> None:
+        if self._idle is not None:
+            return
+        self._idle = asyncio.Queue()
+        for _ in range(self.size):
+            self._idle.put_nowait(await asyncio.to_thread(_Worker, self._context))
+        logger.info(f"Started {self.size} parse workers")
+
+    def _wait_result(self, worker: _Worker, deadline: float):
+        """Attendre la réponse du worker en surveillant délai et mémoire (thread dédié)"""
+        while not worker.conn.poll(RSS_CHECK_INTERVAL):
+            if not worker.process.is_alive():
+                raise ParseWorkerCrashed(f"Le processus de parsing s'est arrêté (code {worker.process.exitcode})")
+            if time.monotonic() > deadline:
+                raise ParseTimeout(f"Parsing interrompu après {self.timeout_seconds}s")
+            rss = _rss_bytes(worker.process.pid)
+            if rss is not None and rss > self.max_rss_bytes:
+                raise ParseMemoryExceeded(f"Parsing interrompu : mémoire > {self.max_rss_bytes // (1024 * 1024)} Mo")
+        try:
+            return worker.conn.recv()
+        except (EOFError, OSError):
+            raise ParseWorkerCrashed("Le processus de parsing s'est arrêté")
+
+    async def run(self, kind: str, file_path: str, *args) -> Any:
+        """Parser un fichier dans un processus du pool"""
+        await self._ensure_started()
+        if self._waiting >= self.max_queue:
+            raise ParseQueueFull("Trop de documents en attente de parsing")
+
+        self._waiting += 1
+        try:
+            worker = await self._idle.get()
+        finally:
+            self._waiting -= 1
+        if not worker.process.is_alive():
+            # Mort pendant l'inactivité : remplacé avant de lui confier le document
+            self._counters["crashes"] += 1
+            worker.kill()
+            worker = await asyncio.to_thread(_Worker, self._context)
+
+        self._running += 1
+        started = time.monotonic()
+        healthy = True
+        try:
+            try:
+                worker.conn.send((kind, file_path, args))
+            except OSError:
+                raise ParseWorkerCrashed("Le processus de parsing ne répond plus")
+            status, value = await asyncio.to_thread(
+                self._wait_result, worker, started + self.timeout_seconds
+            )
+        except ParseError as e:
+            healthy = False
+            self._counters["failed"] += 1
+            if isinstance(e, ParseTimeout):
+                self._counters["timeouts"] += 1
+            elif isinstance(e, ParseMemoryExceeded):
+                self._counters["memory_kills"] += 1
+            elif isinstance(e, ParseWorkerCrashed):
+                self._counters["crashes"] += 1
+            logger.warning(f"Parse job {kind} on {file_path} failed: {e}")
+            raise
+        except BaseException:
+            healthy = False
+            raise
+        finally:
+            self._running -= 1
+            self._durations.append(time.monotonic() - started)
+            if healthy:
+                self._idle.put_nowait(worker)
+            else:
+                # Le worker est remplacé : un parsing bloqué ou planté n'affecte pas les suivants
+                worker.kill()
+                self._idle.put_nowait(await asyncio.to_thread(_Worker, self._context))
+
+        if status == "error":
+            self._counters["failed"] += 1
+            raise ParseError(value)
+        self._counters["completed"] += 1
+        return value
+
+    def metrics(self) -> Dict[str, Any]:
+        durations = sorted(self._durations)
+
+        def percentile(p: float) -> Optional[float]:
+            if not durations:
+                return None
+            return round(durations[min(len(durations) - 1, int(p * len(durations)))], 4)
+
+        return {
+            "workers": self.size,
+            "queue_depth": self._waiting,
+            "in_flight": self._running,
+            **self._counters,
+            "duration_seconds": {
+                "samples": len(durations),
+                "avg": round(sum(durations) / len(durations), 4) if durations else None,
+                "p50": percentile(0.5),
+                "p95": percentile(0.95),
+                "max": round(durations[-1], 4) if durations else None,
+            },
+        }
+
+
+# Instance globale
+parse_pool = ParsePool()
@@ -0,0 +1,157 @@
+import asyncio
+import csv
+import json
+import os
+import time
+from collections import deque
+from typing import Dict, Any, AsyncIterator, Iterator, List
+
+from app.core.config import settings
+from app.services.parse_pool import parse_pool, ParseError
+from app.services.parser_engine import format_for_mime
+from app.services.pdf_extraction import page_ranges
+
+CSV_ROWS_PER_RECORD = 500
+SECTION_MAX_CHARS = 8000
+
+
+def ndjson_record(record: Dict[str, Any]) -> bytes:
+    return (json.dumps(record, ensure_ascii=False, default=str) + "\n").encode("utf-8")
+
+
+def _iter_sections(lines: Iterator[str]) -> Iterator[str]:
+    """Découper un texte en sections : à chaque titre markdown ou à la taille maximale"""
+    buffer: List[str] = []
+    size = 0
+    for line in lines:
+        starts_section = line.startswith("#") and buffer
+        if starts_section or size >= SECTION_MAX_CHARS:
+            yield "".join(buffer)
+            buffer, size = [], 0
+        buffer.append(line)
+        size += len(line)
+    if buffer:
+        yield "".join(buffer)
+
+
+def _next_chunk(iterator: Iterator, size: int) -> List:
+    chunk = []
+    for item in iterator:
+        chunk.append(item)
+        if len(chunk) >= size:
+            break
+    return chunk
+
+
+async def _stream_pdf(file_path: str) -> AsyncIterator[Dict[str, Any]]:
+    page_count = await parse_pool.run("pdf_page_count", file_path)
+    yield {"type": "start", "format": "pdf", "page_count": page_count}
+
+    # Fenêtre de plages en vol bornée par la taille du pool : mémoire constante, ordre préservé
+    ranges = deque(page_ranges(page_count, settings.pdf_pages_per_task))
+    pending = deque()
+    try:
+        while ranges or pending:
+            while ranges and len(pending) < parse_pool.size:
+                start, stop = ranges.popleft()
+                pending.append((start, asyncio.create_task(parse_pool.run("pdf_pages", file_path, start, stop))))
+            start, task = pending.popleft()
+            texts = await task
+            for offset, text in enumerate(texts):
+                yield {"type": "page", "page": start + offset + 1, "text": text}
+    finally:
+        # Client déconnecté ou erreur : les plages restantes ne sont pas extraites
+        for _, task in pending:
+            task.cancel()
+
+
+async def _stream_csv(file_path: str) -> AsyncIterator[Dict[str, Any]]:
+    with open(file_path, "r", encoding="utf-8", newline="") as f:
+        reader = csv.reader(f)
+        header = await asyncio.to_thread(next, reader, [])
+        yield {"type": "start", "format": "csv", "columns": header}
+        row_number = 0
+        while True:
+            rows = await asyncio.to_thread(_next_chunk, reader, CSV_ROWS_PER_RECORD)
+            if not rows:
+                break
+            yield {
+                "type": "rows",
+                "start_row": row_number,
+                "rows": [dict(zip(header, row)) for row in rows],
+            }
+            row_number += len(rows)
+
+
+async def _stream_text(file_path: str) -> AsyncIterator[Dict[str, Any]]:
+    yield {"type": "start", "format": "text"}
+    with open(file_path, "r", encoding="utf-8", errors="replace") as f:
+        sections = _iter_sections(f)
+        index = 0
+        while True:
+            chunk = await asyncio.to_thread(_next_chunk, sections, 1)
+            if not chunk:
+                break
+            yield {"type": "section", "index": index, "text": chunk[0]}
+            index += 1
+
+
+async def _stream_docx(file_path: str) -> AsyncIterator[Dict[str, Any]]:
+    yield {"type": "start", "format": "docx"}
+    # mammoth n'extrait pas par morceaux : le texte est découpé une fois extrait
+    text = await parse_pool.run("docx", file_path)
+    for index, section in enumerate(_iter_sections(iter(text.splitlines(keepends=True)))):
+        yield {"type": "section", "index": index, "text": section}
+
+
+async def _stream_document(file_path: str) -> AsyncIterator[Dict[str, Any]]:
+    result = await parse_pool.run("document", file_path)
+    yield {"type": "start", "format": result.get("format")}
+    yield {"type": "document", **result}
+
+
+STREAMERS = {
+    "pdf": _stream_pdf,
+    "csv": _stream_csv,
+    "text": _stream_text,
+    "docx": _stream_docx,
+    "json": _stream_document,
+}
+
+
+async def stream_parse(file_path: str, filename: str, mime_type: str,
+                       delete_after: bool = False) -> AsyncIterator[bytes]:
+    """Parser un fichier en émettant un enregistrement NDJSON par page, section ou bloc de lignes"""
+    try:
+        async for data in _stream_records(file_path, filename, mime_type):
+            yield data
+    finally:
+        # Le fichier temporaire vit aussi longtemps que la réponse, pas que la requête
+        if delete_after and os.path.exists(file_path):
+            os.unlink(file_path)
+
+
+async def _stream_records(file_path: str, filename: str, mime_type: str) -> AsyncIterator[bytes]:
+    started = time.monotonic()
+    file_format = format_for_mime(mime_type)
+    records = 0
+    try:
+        streamer = STREAMERS.get(file_format)
+        if streamer is None:
+            yield ndjson_record({"type": "error", "error": f"Format non supporté: {mime_type}"})
+            return
+        async for record in streamer(file_path):
+            if record["type"] == "start":
+                record["filename"] = filename
+            else:
+                records += 1
+            yield ndjson_record(record)
+    except (ParseError, UnicodeDecodeError, csv.Error) as e:
+        # Le statut HTTP est déjà parti : l'erreur est un enregistrement du flux
+        yield ndjson_record({"type": "error", "error": str(e)})
+        return
+    yield ndjson_record({
+        "type": "end",
+        "records": records,
+        "elapsed_seconds": round(time.monotonic() - started, 3),
+    })
@@ -0,0 +1,95 @@
+import codecs
+import json
+from typing import Dict, Any
+
+from app.services.csv_ingest import ingest_csv
+from app.services.parser_engine import ParseBudget
+from app.services.text_extractors import join_pages, pdf_page_count, extract_pdf_pages, extract_docx_text
+
+
+def _pdf_result(pages, page_count: int, budget: ParseBudget) -> Dict[str, Any]:
+    text, offsets = join_pages(pages)
+    text, clipped = budget.clip_text(text)
+    return {
+        "content": text,
+        "page_count": page_count,
+        "pages": [offset for offset in offsets if offset["start"] < len(text)],
+        "truncated": clipped or len(pages) < page_count,
+    }
+
+
+def parse_pdf_pymupdf(file_path: str, budget: ParseBudget) -> Dict[str, Any]:
+    page_count = pdf_page_count(file_path)
+    pages = extract_pdf_pages(file_path, 0, budget.clip_pages(page_count))
+    return _pdf_result(pages, page_count, budget)
+
+
+def parse_pdf_pdfplumber(file_path: str, budget: ParseBudget) -> Dict[str, Any]:
+    import pdfplumber
+
+    with pdfplumber.open(file_path) as pdf:
+        page_count = len(pdf.pages)
+        pages = [page.extract_text() or "" for page in pdf.pages[:budget.clip_pages(page_count)]]
+    return _pdf_result(pages, page_count, budget)
+
+
+def parse_pdf_pypdf2(file_path: str, budget: ParseBudget) -> Dict[str, Any]:
+    import PyPDF2
+
+    with open(file_path, "rb") as file:
+        reader = PyPDF2.PdfReader(file)
+        page_count = len(reader.pages)
+        pages = [reader.pages[number].extract_text() or "" for number in range(budget.clip_pages(page_count))]
+    return _pdf_result(pages, page_count, budget)
+
+
+def parse_docx_mammoth(file_path: str, budget: ParseBudget) -> Dict[str, Any]:
+    text, clipped = budget.clip_text(extract_docx_text(file_path))
+    return {"content": text, "truncated": clipped}
+
+
+def _read_text(file_path: str, budget: ParseBudget):
+    # Un caractère ne fait jamais plus de 4 octets : inutile de lire au-delà du budget
+    limit = budget.max_chars * 4
+    with open(file_path, "rb") as f:
+        raw = f.read(limit + 1)
+    try:
+        # Décodage incrémental : un caractère coupé par la limite de lecture n'est pas une erreur
+        text = codecs.getincrementaldecoder("utf-8")().decode(raw, final=len(raw) <= limit)
+        encoding = "utf-8"
+    except UnicodeDecodeError:
+        text = raw.decode("latin-1")
+        encoding = "latin-1"
+    text, clipped = budget.clip_text(text)
+    return text, clipped, encoding
+
+
+def parse_text(file_path: str, budget: ParseBudget) -> Dict[str, Any]:
+    text, clipped, encoding = _read_text(file_path, budget)
+    return {
+        "content": text,
+        "truncated": clipped,
+        "metadata": {"encoding": encoding, "word_count": len(text.split()), "char_count": len(text)},
+    }
+
+
+def parse_json(file_path: str, budget: ParseBudget) -> Dict[str, Any]:
+    with open(file_path, "r", encoding="utf-8") as file:
+        data = json.load(file)
+    return {
+        "content": data,
+        "metadata": {"keys": list(data.keys()) if isinstance(data, dict) else None},
+    }
+
+
+def parse_csv(file_path: str, budget: ParseBudget) -> Dict[str, Any]:
+    with open(file_path, "r", encoding="utf-8", newline="") as file:
+        summary = ingest_csv(file)
+    return {
+        "content": summary["markdown"],
+        "metadata": {
+            "row_count": summary["row_count"],
+            "columns": summary["headers"],
+            "column_stats": summary["columns"],
+        },
+    }
@@ -0,0 +1,177 @@
+import importlib
+import importlib.util
+import logging
+import threading
+import time
+from typing import Dict, Any, List, Optional, Callable
+
+from app.core.config import settings
+from app.models.document import ParseResult
+from app.services.file_sniffer import sniff_file
+
+logger = logging.getLogger(__name__)
+
+# Type MIME détecté -> format du moteur
+MIME_FORMATS = {
+    "application/pdf": "pdf",
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.document": "docx",
+    "text/csv": "csv",
+    "application/json": "json",
+    "text/plain": "text",
+    "text/markdown": "text",
+}
+
+
+def format_for_mime(mime_type: str) -> Optional[str]:
+    if mime_type in MIME_FORMATS:
+        return MIME_FORMATS[mime_type]
+    if mime_type.startswith("text/"):
+        return "text"
+    return None
+
+
+class ParseBudget:
+    """Limites partagées par tous les backends : pages extraites et taille du texte produit"""
+
+    def __init__(self, max_pages: int, max_chars: int):
+        self.max_pages = max_pages
+        self.max_chars = max_chars
+
+    def clip_pages(self, page_count: int) -> int:
+        return min(page_count, self.max_pages)
+
+    def clip_text(self, text: str):
+        if len(text) <= self.max_chars:
+            return text, False
+        return text[:self.max_chars], True
+
+
+class ParserBackend:
+    """Backend d'un format, chargé à la première utilisation"""
+
+    def __init__(self, name: str, formats: List[str], target: str, requires: Optional[str] = None):
+        self.name = name
+        self.formats = formats
+        self.target = target  # "module:fonction"
+        self.requires = requires
+        self._func: Optional[Callable] = None
+        self._available: Optional[bool] = None
+
+    def available(self) -> bool:
+        # find_spec localise le module sans l'importer
+        if self._available is None:
+            self._available = self.requires is None or importlib.util.find_spec(self.requires) is not None
+        return self._available
+
+    def load(self) -> Callable:
+        if self._func is None:
+            module_name, func_name = self.target.split(":")
+            self._func = getattr(importlib.import_module(module_name), func_name)
+        return self._func
+
+
+class BackendMetrics:
+    """Durées par backend, agrégées dans le processus qui reçoit les résultats"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, Any]] = {}
+
+    def record(self, backend: Optional[str], duration_ms: Optional[float], success: bool = True) -> None:
+        if not backend or duration_ms is None:
+            return
+        with self._lock:
+            stats = self._stats.setdefault(backend, {"calls": 0, "failures": 0, "total_ms": 0.0, "max_ms": 0.0})
+            stats["calls"] += 1
+            stats["failures"] += 0 if success else 1
+            stats["total_ms"] += duration_ms
+            stats["max_ms"] = max(stats["max_ms"], duration_ms)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {
+                name: {
+                    **stats,
+                    "total_ms": round(stats["total_ms"], 2),
+                    "avg_ms": round(stats["total_ms"] / stats["calls"], 2),
+                }
+                for name, stats in self._stats.items()
+            }
+
+
+class ParserEngine:
+    """Moteur de parsing unique : détection, choix du backend, budget et résultat commun"""
+
+    def __init__(self, max_pages: int = settings.parse_max_pages, max_chars: int = settings.parse_max_chars):
+        self.max_pages = max_pages
+        self.max_chars = max_chars
+        self.backends: Dict[str, List[ParserBackend]] = {}
+        self.metrics = BackendMetrics()
+
+    def register(self, backend: ParserBackend) -> None:
+        """Backends enregistrés du plus rapide au plus lent pour chaque format"""
+        for fmt in backend.formats:
+            self.backends.setdefault(fmt, []).append(backend)
+
+    def backend_for(self, fmt: str) -> Optional[ParserBackend]:
+        for backend in self.backends.get(fmt, []):
+            if backend.available():
+                return backend
+        return None
+
+    def supported_formats(self) -> Dict[str, List[str]]:
+        return {
+            fmt: [backend.name for backend in backends if backend.available()]
+            for fmt, backends in self.backends.items()
+        }
+
+    def detect(self, file_path: str, filename: str = "") -> Dict[str, Optional[str]]:
+        mime_type = sniff_file(file_path, filename).mime_type
+        return {"mime_type": mime_type, "format": format_for_mime(mime_type)}
+
+    def budget(self) -> ParseBudget:
+        return ParseBudget(max_pages=self.max_pages, max_chars=self.max_chars)
+
+    def parse(self, file_path: str, fmt: Optional[str] = None, filename: str = "") -> ParseResult:
+        """Parser un fichier avec le backend disponible le plus rapide pour son format"""
+        mime_type = None
+        if fmt is None:
+            detected = self.detect(file_path, filename)
+            fmt, mime_type = detected["format"], detected["mime_type"]
+        if fmt is None:
+            return ParseResult(success=False, format="unknown", error=f"Format non supporté: {mime_type}",
+                               metadata={"mime_type": mime_type})
+
+        backend = self.backend_for(fmt)
+        if backend is None:
+            return ParseResult(success=False, format=fmt, error=f"Aucun backend disponible pour le format {fmt}")
+
+        started = time.perf_counter()
+        try:
+            output = backend.load()(file_path, self.budget())
+        except Exception as e:
+            logger.error(f"Backend {backend.name} failed on {file_path}: {e}")
+            duration_ms = round((time.perf_counter() - started) * 1000, 2)
+            self.metrics.record(backend.name, duration_ms, success=False)
+            return ParseResult(success=False, format=fmt, parser=backend.name, duration_ms=duration_ms, error=str(e))
+
+        duration_ms = round((time.perf_counter() - started) * 1000, 2)
+        self.metrics.record(backend.name, duration_ms)
+        metadata = output.pop("metadata", {})
+        if mime_type:
+            metadata["mime_type"] = mime_type
+        return ParseResult(success=True, format=fmt, parser=backend.name, duration_ms=duration_ms,
+                           metadata=metadata, **output)
+
+
+# Instance globale
+parser_engine = ParserEngine()
+
+_BACKENDS = "app.services.parser_backends"
+parser_engine.register(ParserBackend("pymupdf", ["pdf"], f"{_BACKENDS}:parse_pdf_pymupdf", requires="fitz"))
+parser_engine.register(ParserBackend("pdfplumber", ["pdf"], f"{_BACKENDS}:parse_pdf_pdfplumber", requires="pdfplumber"))
+parser_engine.register(ParserBackend("PyPDF2", ["pdf"], f"{_BACKENDS}:parse_pdf_pypdf2", requires="PyPDF2"))
+parser_engine.register(ParserBackend("mammoth", ["docx"], f"{_BACKENDS}:parse_docx_mammoth", requires="mammoth"))
+parser_engine.register(ParserBackend("text", ["text"], f"{_BACKENDS}:parse_text"))
+parser_engine.register(ParserBackend("json", ["json"], f"{_BACKENDS}:parse_json"))
+parser_engine.register(ParserBackend("csv", ["csv"], f"{_BACKENDS}:parse_csv"))
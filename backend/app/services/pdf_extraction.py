@@ -0,0 +1,77 @@
+import asyncio
+import time
+from collections import deque
+from typing import Dict, Any, List, Tuple
+
+from app.core.config import settings
+from app.services.parse_pool import parse_pool, ParseError, ParseQueueFull, ParseTimeout, ParseWorkerCrashed
+from app.models.document import ParseResult
+from app.services.parser_engine import parser_engine
+from app.services.text_extractors import join_pages
+
+
+def page_ranges(page_count: int, pages_per_task: int) -> List[Tuple[int, int]]:
+    pages_per_task = max(1, pages_per_task)
+    return [(start, min(start + pages_per_task, page_count)) for start in range(0, page_count, pages_per_task)]
+
+
+def is_pdf(file_path: str) -> bool:
+    with open(file_path, "rb") as f:
+        return f.read(5) == b"%PDF-"
+
+
+async def extract_pdf(file_path: str, pages_per_task: int = settings.pdf_pages_per_task) -> Dict[str, Any]:
+    """Extraire toutes les pages d'un PDF, par plages traitées en parallèle dans le pool de parsing"""
+    started = time.perf_counter()
+    budget = parser_engine.budget()
+    page_count = await parse_pool.run("pdf_page_count", file_path)
+    ranges = page_ranges(budget.clip_pages(page_count), pages_per_task)
+
+    # Chaque plage est un job indépendant : délai et limite mémoire s'appliquent par plage.
+    # Fenêtre de plages en vol bornée par la taille du pool, comme pour l'extraction en flux :
+    # un gros PDF ne remplit pas la file du pool au détriment des autres documents
+    ranges = deque(ranges)
+    pending = deque()
+    pages: List[str] = []
+    try:
+        while ranges or pending:
+            while ranges and len(pending) < parse_pool.size:
+                start, stop = ranges.popleft()
+                pending.append(asyncio.create_task(parse_pool.run("pdf_pages", file_path, start, stop)))
+            pages.extend(await pending.popleft())
+    finally:
+        # Erreur ou annulation : les plages restantes ne sont pas extraites
+        for task in pending:
+            task.cancel()
+
+    text, offsets = join_pages(pages)
+    text, clipped = budget.clip_text(text)
+    return {
+        "text": text,
+        "page_count": page_count,
+        "pages": [offset for offset in offsets if offset["start"] < len(text)],
+        "truncated": clipped or len(pages) < page_count,
+        "parser": "pymupdf",
+        "duration_ms": round((time.perf_counter() - started) * 1000, 2),
+    }
+
+
+async def extract_pdf_document(file_path: str) -> Dict[str, Any]:
+    """Même forme de résultat que DocumentParser pour un PDF, extrait en parallèle"""
+    try:
+        extracted = await extract_pdf(file_path)
+    except (ParseQueueFull, ParseTimeout, ParseWorkerCrashed):
+        raise
+    except ParseError as e:
+        # PDF illisible : même réponse que le parseur séquentiel
+        return ParseResult(success=False, format="pdf", parser="pymupdf", error=str(e)).model_dump()
+    return ParseResult(
+        success=True,
+        format="pdf",
+        content=extracted["text"],
+        page_count=extracted["page_count"],
+        pages=extracted["pages"],
+        truncated=extracted["truncated"],
+        parser=extracted["parser"],
+        duration_ms=extracted["duration_ms"]
+    ).model_dump()
@@ -0,0 +1,99 @@
+import asyncio
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+PAGE_MARGIN = 36  # points (0.5 pouce)
+
+
+def render_pdf_file(html: str, output_path: str, paper: str = "a4") -> int:
+    """Convertir du HTML en PDF avec PyMuPDF (exécuté dans un processus du pool)"""
+    import fitz  # PyMuPDF
+
+    tmp_path = f"{output_path}.{os.getpid()}.part"
+    mediabox = fitz.paper_rect(paper)
+    where = mediabox + (PAGE_MARGIN, PAGE_MARGIN, -PAGE_MARGIN, -PAGE_MARGIN)
+
+    story = fitz.Story(html=html)
+    writer = fitz.DocumentWriter(tmp_path)
+    page_count = 0
+    more = 1
+    while more:
+        device = writer.begin_page(mediabox)
+        more, _ = story.place(where)
+        story.draw(device)
+        writer.end_page()
+        page_count += 1
+    writer.close()
+
+    os.replace(tmp_path, output_path)
+    return page_count
+
+
+class PdfRenderer:
+    """Génération PDF côté serveur dans un pool de processus"""
+
+    def __init__(self, workers: int = settings.pdf_workers):
+        self.workers = max(1, workers)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._pending: Dict[str, asyncio.Future] = {}
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self._executor
+
+    async def render(self, html: str, output_path: Path) -> Path:
+        """Écrire le PDF dans output_path, sauf s'il existe déjà"""
+        if output_path.exists():
+            return output_path
+
+        # Un seul rendu en cours par fichier, les autres requêtes l'attendent
+        key = str(output_path)
+        pending = self._pending.get(key)
+        if pending is not None:
+            await asyncio.shield(pending)
+            return output_path
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending[key] = future
+        try:
+            output_path.parent.mkdir(parents=True, exist_ok=True)
+            try:
+                await loop.run_in_executor(self._get_executor(), render_pdf_file, html, key)
+            except BrokenProcessPool:
+                # Un processus a planté : on recrée le pool pour les rendus suivants
+                logger.error("PDF process pool broken, restarting it")
+                self._executor = None
+                raise
+            future.set_result(output_path)
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            self._pending.pop(key, None)
+            # Évite l'avertissement "exception never retrieved" sans attente
+            if future.done() and not future.cancelled():
+                future.exception()
+
+        return output_path
+
+    def stats(self) -> Dict[str, Any]:
+        return {"workers": self.workers, "rendering": len(self._pending)}
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+# Instance globale
+pdf_renderer = PdfRenderer()
@@ -0,0 +1,366 @@
+import asyncio
+import functools
+import heapq
+import logging
+import math
+import re
+import unicodedata
+from collections import Counter
+from typing import Dict, Any, Callable, Iterable, List, Optional, Set
+
+from app.services.content_store import content_store
+from app.services.document_chunks import split_content
+
+logger = logging.getLogger(__name__)
+
+WORD = re.compile(r"\w+")
+COMBINING = re.compile(r"[\u0300-\u036f]")
+SNIPPET_CHARS = 200
+LOAD_BATCH = 1000
+
+STOPWORDS = frozenset("""
+a au aux avec ce ces cet cette dans de des du elle en et eux il ils je la le les leur leurs lui ma mais me meme mes
+moi mon ne nos notre nous on ou par pas pour qu que qui sa se ses son sur ta te tes toi ton tu un une vos votre vous
+c d j l m n s t y est sont ete etre avoir ont comme plus tout tous aussi donc ni car si
+an and are as at be been but by for from has have he her his if in into is it its not of on or our she so than
+that the their them then there these they this to was we were what when which who will with you your
+""".split())
+
+# Racinisation légère, sans collision entre formes proches : pluriels et gérondif anglais
+SUFFIXES = ("ings", "ing", "s", "x")
+
+
+def _fold(text: str) -> str:
+    """Minuscules sans accents : « Élève » et « eleve » donnent le même terme"""
+    return COMBINING.sub("", unicodedata.normalize("NFD", text.lower()))
+
+
+def stem(word: str) -> str:
+    for suffix in SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            return word[:-len(suffix)]
+    return word
+
+
+@functools.lru_cache(maxsize=65536)
+def _term(word: str) -> Optional[str]:
+    """Terme d'un mot déjà normalisé par _fold; None pour un mot vide"""
+    if len(word) < 2 or word in STOPWORDS:
+        return None
+    return stem(word)
+
+
+def tokenize(text: str) -> List[str]:
+    """Termes indexés d'un texte français ou anglais (les élisions l', d', qu' tombent avec les mots vides)"""
+    return [term for term in map(_term, WORD.findall(_fold(text))) if term]
+
+
+def text_of(value: Any) -> str:
+    """Texte d'un contenu de bloc, qui peut être structuré (quiz, tableau...)"""
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        return value
+    if isinstance(value, dict):
+        return "\n".join(text_of(item) for item in value.values())
+    if isinstance(value, (list, tuple)):
+        return "\n".join(text_of(item) for item in value)
+    return str(value)
+
+
+def snippet(text: str, terms: Set[str], size: int = SNIPPET_CHARS) -> str:
+    """Extrait centré sur la première occurrence d'un terme de la requête"""
+    for match in WORD.finditer(text):
+        if _term(_fold(match.group())) in terms:
+            start = max(0, match.start() - size // 2)
+            prefix = "…" if start > 0 else ""
+            suffix = "…" if start + size < len(text) else ""
+            return prefix + text[start:start + size].strip() + suffix
+    return text[:size].strip() + ("…" if len(text) > size else "")
+
+
+class InvertedIndex:
+    """Index inversé en mémoire avec classement BM25; chaque unité (bloc, morceau de document) a une clé"""
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, Dict[str, int]] = {}
+        self.units: Dict[str, Dict[str, Any]] = {}  # clé -> métadonnées
+        self.unit_terms: Dict[str, Counter] = {}
+        self.lengths: Dict[str, int] = {}
+        self.groups: Dict[str, Set[str]] = {}  # groupe (document) -> clés
+        self.unit_groups: Dict[str, str] = {}
+        self.total_length = 0
+
+    def __len__(self) -> int:
+        return len(self.units)
+
+    def add(self, key: str, text: str, meta: Dict[str, Any], group: Optional[str] = None) -> None:
+        self.remove(key)
+        terms = Counter(tokenize(text))
+        self.units[key] = meta
+        if group is not None:
+            self.groups.setdefault(group, set()).add(key)
+            self.unit_groups[key] = group
+        self.unit_terms[key] = terms
+        length = sum(terms.values())
+        self.lengths[key] = length
+        self.total_length += length
+        for term, frequency in terms.items():
+            self.postings.setdefault(term, {})[key] = frequency
+
+    def remove(self, key: str) -> None:
+        terms = self.unit_terms.pop(key, None)
+        if terms is None:
+            return
+        for term in terms:
+            posting = self.postings[term]
+            del posting[key]
+            if not posting:
+                del self.postings[term]
+        self.total_length -= self.lengths.pop(key)
+        del self.units[key]
+        group = self.unit_groups.pop(key, None)
+        if group is not None:
+            self.groups[group].discard(key)
+            if not self.groups[group]:
+                del self.groups[group]
+
+    def remove_group(self, group: str) -> None:
+        for key in list(self.groups.get(group, ())):
+            self.remove(key)
+
+    def search(self, query: str, allowed_courses: Optional[Set[Optional[str]]] = None,
+               unit_type: Optional[str] = None, limit: int = 20) -> List[Dict[str, Any]]:
+        """Meilleures unités pour la requête; allowed_courses None = aucun filtre de cours"""
+        terms = set(tokenize(query))
+        if not terms or not self.units:
+            return []
+        count = len(self.units)
+        average_length = self.total_length / count or 1
+        scores: Dict[str, float] = {}
+        for term in terms:
+            posting = self.postings.get(term)
+            if not posting:
+                continue
+            idf = math.log(1 + (count - len(posting) + 0.5) / (len(posting) + 0.5))
+            for key, frequency in posting.items():
+                meta = self.units[key]
+                if allowed_courses is not None and meta.get("course_id") not in allowed_courses:
+                    continue
+                if unit_type is not None and meta["type"] != unit_type:
+                    continue
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[key] / average_length)
+                scores[key] = scores.get(key, 0.0) + idf * frequency * (self.k1 + 1) / (frequency + norm)
+        best = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+        return [{**self.units[key], "key": key, "score": round(score, 4)} for key, score in best]
+
+    def stats(self) -> Dict[str, Any]:
+        return {"units": len(self.units), "terms": len(self.postings), "total_length": self.total_length}
+
+
+def _add_block(index: InvertedIndex, course_id: str, block_id: str, content: Any,
+               block_type: Optional[str] = None) -> None:
+    index.add(f"block:{block_id}", text_of(content), {
+        "type": "block",
+        "id": block_id,
+        "course_id": course_id,
+        "block_type": block_type,
+    })
+
+
+def _add_document(index: InvertedIndex, document_id: str, chunks: List[Dict[str, Any]],
+                  title: Optional[str] = None, course_id: Optional[str] = None) -> None:
+    """Morceaux d'un document (offsets de split_content); le titre compte avec le premier"""
+    index.remove_group(document_id)
+    for chunk in chunks:
+        text = chunk["content"]
+        if chunk["index"] == 0 and title:
+            text = f"{title}\n{text}"
+        index.add(f"chunk:{document_id}:{chunk['index']}", text, {
+            "type": "document",
+            "id": document_id,
+            "document_id": document_id,
+            "course_id": course_id,
+            "title": title,
+            "chunk_index": chunk["index"],
+            "start": chunk["start"],
+            "end": chunk["end"],
+        }, group=document_id)
+
+
+class SearchService:
+    """Index de recherche du processus : construit depuis Neo4j au premier appel, tenu à jour ensuite"""
+
+    def __init__(self):
+        self.index = InvertedIndex()
+        self.loaded = False
+        self._pending: Optional[List[Callable[[InvertedIndex], None]]] = None  # mises à jour reçues pendant la construction
+        self._load_lock = asyncio.Lock()
+
+    # Mises à jour incrémentales (ignorées tant que l'index n'est pas construit : il lira l'état courant)
+
+    def _apply(self, update: Callable[[InvertedIndex], None]) -> None:
+        if self.loaded:
+            update(self.index)
+        elif self._pending is not None:
+            self._pending.append(update)
+
+    def index_block(self, course_id: str, block_id: str, content: Any, block_type: Optional[str] = None) -> None:
+        self._apply(lambda index: _add_block(index, course_id, block_id, content, block_type))
+
+    def remove_block(self, block_id: str) -> None:
+        self._apply(lambda index: index.remove(f"block:{block_id}"))
+
+    def index_document(self, document_id: str, chunks: Iterable[Dict[str, Any]],
+                       title: Optional[str] = None, course_id: Optional[str] = None) -> None:
+        chunks = list(chunks)
+        self._apply(lambda index: _add_document(index, document_id, chunks, title, course_id))
+
+    def remove_document(self, document_id: str) -> None:
+        self._apply(lambda index: index.remove_group(document_id))
+
+    # Construction initiale : lecture par lots, tokenisation hors de la boucle d'événements
+
+    async def ensure_loaded(self, session) -> None:
+        if self.loaded:
+            return
+        async with self._load_lock:
+            if self.loaded:
+                return
+            self._pending = []
+            try:
+                index = await self._load(session)
+            finally:
+                pending, self._pending = self._pending, None
+            for update in pending:
+                update(index)
+            self.index = index
+            self.loaded = True
+            logger.info(f"Search index built: {index.stats()}")
+
+    async def _load(self, session) -> InvertedIndex:
+        index = InvertedIndex()
+        skip = 0
+        while True:
+            result = await session.run("""
+            MATCH (c:Course)-[:HAS_BLOCK]->(b:ContentBlock)
+            RETURN c.id as course_id, b.id as id, b.type as type, b.content as content,
+                   b.content_ref as content_ref
+            ORDER BY b.id SKIP $skip LIMIT $limit
+            """, skip=skip, limit=LOAD_BATCH)
+            blocks = [dict(record) async for record in result]
+            await asyncio.to_thread(lambda: [
+                _add_block(index, block["course_id"], block["id"],
+                           content_store.resolve(block["content"], block["content_ref"]), block["type"])
+                for block in blocks
+            ])
+            if len(blocks) < LOAD_BATCH:
+                break
+            skip += LOAD_BATCH
+
+        # Documents rédigés (contenu sur le nœud) et documents uploadés (DocumentChunk)
+        skip = 0
+        while True:
+            result = await session.run("""
+            MATCH (d:Document)
+            OPTIONAL MATCH (d)-[:BELONGS_TO]->(c:Course)
+            RETURN d.id as id, d.title as title, COALESCE(c.id, d.course_id) as course_id,
+                   d.content as content, d.content_ref as content_ref,
+                   COALESCE(d.chunk_count, 0) as chunk_count
+            ORDER BY d.id SKIP $skip LIMIT $limit
+            """, skip=skip, limit=LOAD_BATCH)
+            documents = [dict(record) async for record in result]
+            content_store.resolve_rows(documents)
+            for document in documents:
+                if document["chunk_count"]:
+                    document["chunks"] = await self._document_chunks(session, document["id"])
+                else:
+                    document["chunks"] = split_content(text_of(document["content"]))
+            await asyncio.to_thread(lambda: [
+                _add_document(index, document["id"], document["chunks"], document["title"], document["course_id"])
+                for document in documents
+            ])
+            if len(documents) < LOAD_BATCH:
+                break
+            skip += LOAD_BATCH
+        return index
+
+    async def _document_chunks(self, session, document_id: str) -> List[Dict[str, Any]]:
+        result = await session.run("""
+        MATCH (c:DocumentChunk {document_id: $document_id})
+        RETURN c.index as index, c.start as start, c.end as end, c.content as content,
+               c.content_ref as content_ref
+        ORDER BY c.index
+        """, document_id=document_id)
+        chunks = [dict(record) async for record in result]
+        content_store.resolve_rows(chunks)
+        return chunks
+
+    async def visible_courses(self, session, user: Dict[str, Any]) -> Optional[Set[Optional[str]]]:
+        """Cours lisibles par l'utilisateur (None pour un admin); les documents sans cours sont visibles de tous"""
+        if user.get("role") == "admin":
+            return None
+        result = await session.run("""
+        MATCH (c:Course)
+        WHERE c.is_public = true OR c.teacher_id = $user_id OR
+              EXISTS((:User {id: $user_id})-[:ENROLLED_IN]->(c))
+        RETURN c.id as id
+        """, user_id=user["id"])
+        courses: Set[Optional[str]] = {record["id"] async for record in result}
+        courses.add(None)
+        return courses
+
+    async def search(self, session, user: Dict[str, Any], query: str, course_id: Optional[str] = None,
+                     unit_type: Optional[str] = None, limit: int = 20) -> List[Dict[str, Any]]:
+        await self.ensure_loaded(session)
+        allowed = await self.visible_courses(session, user)
+        if course_id is not None:
+            if allowed is not None and course_id not in allowed:
+                return []
+            allowed = {course_id}
+        hits = self.index.search(query, allowed, unit_type, limit)
+        await self._add_snippets(session, hits, set(tokenize(query)))
+        return hits
+
+    async def _add_snippets(self, session, hits: List[Dict[str, Any]], terms: Set[str]) -> None:
+        """Le texte n'est pas gardé en mémoire : relu pour les seuls résultats renvoyés"""
+        blocks = [hit["id"] for hit in hits if hit["type"] == "block"]
+        chunks = [{"document_id": hit["document_id"], "index": hit["chunk_index"]}
+                  for hit in hits if hit["type"] == "document"]
+        texts: Dict[str, str] = {}
+        if blocks:
+            result = await session.run("""
+            MATCH (b:ContentBlock) WHERE b.id IN $ids
+            RETURN b.id as id, b.content as content, b.content_ref as content_ref
+            """, ids=blocks)
+            async for record in result:
+                content = content_store.resolve(record["content"], record["content_ref"])
+                texts[f"block:{record['id']}"] = text_of(content)
+        if chunks:
+            result = await session.run("""
+            UNWIND $chunks as wanted
+            MATCH (d:Document {id: wanted.document_id})
+            OPTIONAL MATCH (c:DocumentChunk {document_id: wanted.document_id, index: wanted.index})
+            RETURN wanted.document_id as document_id, wanted.index as index,
+                   c.content as chunk, c.content_ref as chunk_ref,
+                   d.content as content, d.content_ref as content_ref
+            """, chunks=chunks)
+            async for record in result:
+                text = content_store.resolve(record["chunk"], record["chunk_ref"])
+                if text is None:
+                    # Document rédigé : morceau recalculé à partir du contenu du nœud
+                    content = content_store.resolve(record["content"], record["content_ref"])
+                    parts = split_content(text_of(content))
+                    text = parts[record["index"]]["content"] if record["index"] < len(parts) else ""
+                texts[f"chunk:{record['document_id']}:{record['index']}"] = text
+        for hit in hits:
+            hit["snippet"] = snippet(texts.get(hit["key"], ""), terms)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"loaded": self.loaded, **self.index.stats()}
+
+
+# Instance globale
+search_service = SearchService()
@@ -1,8 +1,10 @@
-import json
-import csv
 import io
 from typing import Dict, Any, Optional
 
+from app.services.csv_ingest import ingest_csv
+from app.services.file_sniffer import SNIFF_BYTES, sniff
+from app.services.json_summary import CHUNK_BYTES, summarize_json
+
 class SimpleDocumentParser:
     """Parser de documents simplifié sans dépendances lourdes"""
     
@@ -10,36 +12,34 @@ class SimpleDocumentParser:
         self.supported_formats = ['txt', 'json', 'csv']
     
     def detect_format(self, content: bytes, filename: str = "") -> str:
-        """Détection simple du format de fichier"""
-        try:
-            # Essayer de décoder en UTF-8
-            text_content = content.decode('utf-8')
-            
-            # Vérifier l'extension
-            if filename.lower().endswith('.json'):
-                return 'json'
-            elif filename.lower().endswith('.csv'):
-                return 'csv'
-            elif filename.lower().endswith('.txt'):
-                return 'txt'
-            
-            # Essayer de parser comme JSON
-            try:
-                json.loads(text_content)
-                return 'json'
-            except:
-                pass
-            
-            # Vérifier si c'est du CSV
-            if ',' in text_content and '\n' in text_content:
-                return 'csv'
-            
-            return 'txt'
-            
-        except UnicodeDecodeError:
+        """Détection du format sur les premiers octets seulement"""
+        head = content[:SNIFF_BYTES]
+        sniffed = sniff(head, filename)
+        if sniffed.encoding != 'utf-8':
             return 'binary'
+
+        # Vérifier l'extension
+        if filename.lower().endswith('.json'):
+            return 'json'
+        elif filename.lower().endswith('.csv'):
+            return 'csv'
+        elif filename.lower().endswith('.txt'):
+            return 'txt'
+
+        # Début d'objet ou de tableau JSON
+        if sniffed.format == 'json':
+            return 'json'
+
+        return self._text_format(head)
+
+    def _text_format(self, head: bytes) -> str:
+        """CSV ou texte brut, d'après les premiers octets"""
+        text_head = head.decode('utf-8', errors='ignore')
+        if ',' in text_head and '\n' in text_head:
+            return 'csv'
+        return 'txt'
     
-    def parse_content(self, content: bytes, filename: str = "") -> Dict[str, Any]:
+    def parse_content(self, content: bytes, filename: str = "", json_sample_items: int = 0) -> Dict[str, Any]:
         """Parse le contenu selon le format détecté"""
         format_type = self.detect_format(content, filename)
         
@@ -51,11 +51,16 @@ class SimpleDocumentParser:
                     'format': format_type
                 }
             
+            if format_type == 'json':
+                result = self._parse_json(content, json_sample_items)
+                if result['success'] or filename.lower().endswith('.json'):
+                    return result
+                # JSON seulement deviné sur le premier caractère ("[Intro] ...") : relu comme texte
+                format_type = self._text_format(content[:SNIFF_BYTES])
+
             text_content = content.decode('utf-8')
             
-            if format_type == 'json':
-                return self._parse_json(text_content)
-            elif format_type == 'csv':
+            if format_type == 'csv':
                 return self._parse_csv(text_content)
             else:  # txt
                 return self._parse_text(text_content)
@@ -67,17 +72,19 @@ class SimpleDocumentParser:
                 'format': format_type
             }
     
-    def _parse_json(self, content: str) -> Dict[str, Any]:
-        """Parse JSON"""
+    def _parse_json(self, content: bytes, sample_items: int = 0) -> Dict[str, Any]:
+        """Parse JSON en une passe incrémentale : structure et échantillon borné, sans arbre d'objets"""
         try:
-            data = json.loads(content)
+            view = memoryview(content)
+            chunks = (view[start:start + CHUNK_BYTES] for start in range(0, len(view), CHUNK_BYTES))
+            summary = summarize_json(chunks, sample_items)
             return {
                 'success': True,
                 'format': 'json',
-                'content': data,
-                'summary': f'Document JSON avec {len(data) if isinstance(data, (dict, list)) else 1} éléments'
+                'content': summary,
+                'summary': f"Document JSON ({summary['root_type']}) avec {summary.get('length', 1)} éléments, profondeur {summary['max_depth']}"
             }
-        except json.JSONDecodeError as e:
+        except (ValueError, UnicodeDecodeError) as e:
             return {
                 'success': False,
                 'error': f'JSON invalide: {str(e)}',
@@ -85,30 +92,28 @@ class SimpleDocumentParser:
             }
     
     def _parse_csv(self, content: str) -> Dict[str, Any]:
-        """Parse CSV"""
+        """Parse CSV en une passe : seuls l'aperçu et les statistiques de colonnes sont conservés"""
         try:
-            csv_reader = csv.reader(io.StringIO(content))
-            rows = list(csv_reader)
-            
-            if not rows:
+            summary = ingest_csv(io.StringIO(content, newline=''))
+            headers = summary['headers']
+
+            if not headers:
                 return {
                     'success': False,
                     'error': 'Fichier CSV vide',
                     'format': 'csv'
                 }
-            
-            headers = rows[0] if rows else []
-            data_rows = rows[1:] if len(rows) > 1 else []
-            
+
             return {
                 'success': True,
                 'format': 'csv',
                 'content': {
                     'headers': headers,
-                    'rows': data_rows,
-                    'total_rows': len(data_rows)
+                    'rows': summary['preview'],
+                    'total_rows': summary['row_count'],
+                    'columns': summary['columns']
                 },
-                'summary': f'CSV avec {len(headers)} colonnes et {len(data_rows)} lignes'
+                'summary': f"CSV avec {len(headers)} colonnes et {summary['row_count']} lignes"
             }
         except Exception as e:
             return {
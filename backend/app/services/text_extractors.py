@@ -0,0 +1,44 @@
+from typing import List, Tuple, Dict, Any
+
+PAGE_SEPARATOR = "\n\n"
+
+
+def pdf_page_count(file_path: str) -> int:
+    """Number of pages, read from the PDF trailer without extracting anything"""
+    import fitz  # PyMuPDF
+
+    doc = fitz.open(file_path)
+    try:
+        return doc.page_count
+    finally:
+        doc.close()
+
+
+def extract_pdf_pages(file_path: str, start: int, stop: int) -> List[str]:
+    """Extract the text of pages [start, stop) with PyMuPDF"""
+    import fitz  # PyMuPDF
+
+    doc = fitz.open(file_path)
+    try:
+        return [doc[number].get_text() for number in range(start, min(stop, doc.page_count))]
+    finally:
+        doc.close()
+
+
+def join_pages(pages: List[str], first_page: int = 1) -> Tuple[str, List[Dict[str, Any]]]:
+    """Join page texts once and record the character span of every page in the result"""
+    offsets = []
+    position = 0
+    for number, text in enumerate(pages, start=first_page):
+        offsets.append({"page": number, "start": position, "end": position + len(text)})
+        position += len(text) + len(PAGE_SEPARATOR)
+    return PAGE_SEPARATOR.join(pages), offsets
+
+
+def extract_docx_text(file_path: str) -> str:
+    """Extract raw text from a DOCX with mammoth"""
+    import mammoth
+
+    with open(file_path, 'rb') as docx_file:
+        result = mammoth.extract_raw_text(docx_file)
+    return result.value.strip()
@@ -0,0 +1,84 @@
+import asyncio
+import hashlib
+import os
+from typing import Optional
+
+import aiofiles
+from fastapi import UploadFile
+
+from app.core.config import settings
+from app.services.file_sniffer import sniff, zip_entry_names, container_mime_type
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # 1MB
+
+class UploadTooLarge(Exception):
+    """Le flux d'upload a dépassé la taille maximale autorisée"""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        super().__init__(f"File too large. Maximum size: {max_size} bytes")
+
+
+class StoredUpload:
+    """Fichier écrit sur disque par le pipeline d'upload"""
+
+    def __init__(self, path: str, filename: str, size: int, sha256: str, mime_type: str):
+        self.path = path
+        self.filename = filename
+        self.size = size
+        self.sha256 = sha256
+        self.mime_type = mime_type
+
+
+def sniff_mime_type(head: bytes, filename: str = "") -> str:
+    """Type MIME déduit des premiers octets du flux"""
+    return sniff(head, filename).mime_type
+
+
+def _container_mime_type(path: str) -> str:
+    with open(path, "rb") as f:
+        return container_mime_type(zip_entry_names(f))
+
+
+async def stream_upload_to_disk(
+    file: UploadFile,
+    destination: str,
+    max_size: int = settings.max_file_size,
+    chunk_size: int = UPLOAD_CHUNK_SIZE
+) -> StoredUpload:
+    """Écrire l'upload par blocs de taille fixe, en hachant et en contrôlant la taille au fil de l'eau"""
+    os.makedirs(os.path.dirname(destination) or ".", exist_ok=True)
+    partial_path = f"{destination}.part"
+    hasher = hashlib.sha256()
+    size = 0
+    mime_type: Optional[str] = None
+
+    try:
+        async with aiofiles.open(partial_path, "wb") as f:
+            while True:
+                chunk = await file.read(chunk_size)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_size:
+                    raise UploadTooLarge(max_size)
+                if mime_type is None:
+                    mime_type = sniff_mime_type(chunk, file.filename or "")
+                hasher.update(chunk)
+                await f.write(chunk)
+        if mime_type == "application/zip":
+            # DOCX/PPTX/XLSX : le répertoire central, en fin de fichier, donne le type exact
+            mime_type = await asyncio.to_thread(_container_mime_type, partial_path)
+        os.replace(partial_path, destination)
+    except BaseException:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        raise
+
+    return StoredUpload(
+        path=destination,
+        filename=file.filename or "",
+        size=size,
+        sha256=hasher.hexdigest(),
+        mime_type=mime_type or "application/octet-stream",
+    )
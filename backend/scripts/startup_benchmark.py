@@ -0,0 +1,98 @@
+"""Mesure du temps de démarrage de l'API.
+
+Importe les modules dans un interpréteur neuf avec `-X importtime`, affiche les
+modules les plus coûteux et échoue (code 1) si le démarrage dépasse le budget
+ou si une dépendance lourde est chargée dès l'import.
+
+    python scripts/startup_benchmark.py
+    python scripts/startup_benchmark.py --budget-ms 1500 --module app.main --module app.api.routes.files
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from typing import Dict, List
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+DEFAULT_MODULES = [
+    "app.main",
+    "app.api.routes.documents",
+    "app.api.routes.files",
+]
+
+# Bibliothèques réservées aux couches de parsing et d'export : jamais chargées au démarrage
+DEFERRED_MODULES = ["fitz", "mammoth", "magic", "pdfplumber", "PyPDF2", "jinja2"]
+
+
+def measure(modules: List[str]) -> Dict[str, Dict[str, int]]:
+    """Temps d'import (µs) par module, mesurés dans un processus séparé; "top_level" : importé directement"""
+    code = "; ".join(f"import {module}" for module in modules)
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+    )
+    if completed.returncode != 0:
+        raise SystemExit(f"Import failed:\n{completed.stderr[-2000:]}")
+
+    timings = {}
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        timings[name.strip()] = {
+            "self_us": int(self_us),
+            "cumulative_us": int(cumulative_us),
+            "top_level": not name[1:].startswith(" "),
+        }
+    return timings
+
+
+def main() -> int:
+    from app.core.config import settings
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--module", action="append", dest="modules",
+                        help="module to import (repeatable, default: app.main and the parsing routers)")
+    parser.add_argument("--budget-ms", type=float, default=settings.startup_budget_ms)
+    parser.add_argument("--top", type=int, default=15, help="number of modules to list")
+    parser.add_argument("--json", action="store_true", help="print a JSON report")
+    args = parser.parse_args()
+
+    modules = args.modules or DEFAULT_MODULES
+    timings = measure(modules)
+    total_ms = sum(timing["cumulative_us"] for timing in timings.values() if timing["top_level"]) / 1000
+    loaded_heavy = [module for module in DEFERRED_MODULES if module in timings]
+    slowest = sorted(timings.items(), key=lambda item: item[1]["self_us"], reverse=True)[:args.top]
+    failed = total_ms > args.budget_ms or bool(loaded_heavy)
+
+    if args.json:
+        print(json.dumps({
+            "modules": modules,
+            "total_ms": round(total_ms, 1),
+            "budget_ms": args.budget_ms,
+            "eagerly_loaded": loaded_heavy,
+            "slowest": [
+                {"module": name, "self_us": timing["self_us"], "cumulative_us": timing["cumulative_us"]}
+                for name, timing in slowest
+            ],
+            "passed": not failed,
+        }, indent=2))
+    else:
+        print(f"{'module':<60} {'self ms':>9} {'cumul. ms':>10}")
+        for name, timing in slowest:
+            print(f"{name:<60} {timing['self_us'] / 1000:>9.1f} {timing['cumulative_us'] / 1000:>10.1f}")
+        print(f"\nStartup imports: {total_ms:.1f} ms (budget {args.budget_ms:.0f} ms)")
+        if loaded_heavy:
+            print(f"Heavy dependencies loaded at startup: {', '.join(loaded_heavy)}")
+        print("FAILED" if failed else "OK")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
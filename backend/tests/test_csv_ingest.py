@@ -0,0 +1,71 @@
+import io
+import resource
+
+import pytest
+
+from app.services.csv_ingest import MAX_TYPED_CHARS, ColumnStats, ingest_csv
+
+
+def column_types(text, **kwargs):
+    summary = ingest_csv(io.StringIO(text, newline=""), **kwargs)
+    return {column["name"]: column["type"] for column in summary["columns"]}
+
+
+@pytest.mark.parametrize("values, expected", [
+    (["1", "2", "-3"], "integer"),
+    (["1", "2.5"], "float"),
+    (["1.0", "2.0"], "float"),
+    (["oui", "NON", "True"], "boolean"),
+    (["", " ", ""], "empty"),
+    (["1", "abc"], "string"),
+    (["1", "oui"], "string"),
+    (["1e3", "2"], "integer"),
+])
+def test_type_inference(values, expected):
+    stats = ColumnStats("c")
+    stats.update(values)
+    assert stats.type == expected
+
+
+def test_types_widen_across_batches():
+    text = "n,b,s\n" + "1,oui,1\n" * 5 + "2.5,non,x\n"
+    assert column_types(text, batch_rows=2) == {"n": "float", "b": "boolean", "s": "string"}
+
+
+def test_numeric_stats_and_nulls():
+    summary = ingest_csv(io.StringIO("a\n1\n\n 3 \n5\n,\n"), batch_rows=2)
+    column = summary["columns"][0]
+    assert column["type"] == "integer"
+    assert column["count"] == 4
+    assert column["nulls"] == 1
+    assert (column["min"], column["max"], column["mean"]) == (1.0, 5.0, 3.0)
+
+
+def test_short_and_long_rows():
+    summary = ingest_csv(io.StringIO("a,b\n1\n2,3,4\n"))
+    assert summary["row_count"] == 2
+    assert summary["preview"] == [["1", ""], ["2", "3"]]
+    assert summary["columns"][1]["nulls"] == 1
+
+
+def test_long_cell_makes_column_text():
+    stats = ColumnStats("c")
+    stats.update(["1"] * 10 + ["9" * (MAX_TYPED_CHARS + 1)])
+    assert stats.type == "string"
+
+
+def test_long_cell_memory_is_bounded():
+    # Une seule cellule de 20 000 caractères dimensionnait tout un tableau <U20000> par colonne
+    rows = [f"{i},{'x' * 20000 if i == 5 else 'ok'},{i * 0.5}" for i in range(10000)]
+    before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    types = column_types("id,comment,score\n" + "\n".join(rows) + "\n")
+    grown_mb = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - before) / 1024
+    assert types == {"id": "integer", "comment": "string", "score": "float"}
+    assert grown_mb < 200
+
+
+def test_markdown_preview():
+    summary = ingest_csv(io.StringIO("a,b\n" + "1,2\n" * 12), preview_rows=2)
+    assert summary["markdown"].startswith("| a | b |\n| --- | --- |\n| 1 | 2 |")
+    assert "10 lignes supplémentaires" in summary["markdown"]
+    assert ingest_csv(io.StringIO(""))["markdown"] == "Fichier CSV vide"
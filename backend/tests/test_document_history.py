@@ -0,0 +1,41 @@
+import json
+
+import pytest
+
+from app.services.document_history import DocumentHistory, apply_delta, make_delta
+
+VERSIONS = [
+    "",
+    "une ligne",
+    "une ligne\n",
+    "a\nb\nc\n",
+    "a\nB\nc\n",
+    "a\nc\n",
+    "x\na\nc\ny",
+    "\n\n\n",
+    "é\nà\nü\n" * 20,
+]
+
+
+@pytest.mark.parametrize("old", VERSIONS)
+@pytest.mark.parametrize("new", VERSIONS)
+def test_delta_round_trip(old, new):
+    delta = make_delta(old, new)
+    assert apply_delta(old, delta) == new
+    # Stocké en JSON dans le graphe
+    assert apply_delta(old, json.loads(json.dumps(delta))) == new
+
+
+def test_delta_copies_unchanged_lines():
+    old = "".join(f"ligne {i}\n" for i in range(100))
+    new = old.replace("ligne 50\n", "ligne cinquante\n")
+    assert make_delta(old, new) == [50, -1, "ligne cinquante\n", 49]
+
+
+def test_replay_chain_of_deltas():
+    texts = ["a\nb\n", "a\nb\nc\n", "b\nc\n", "b\nC\nd\n"]
+    chain = [{"content": texts[0]}]
+    for old, new in zip(texts, texts[1:]):
+        chain.append({"content": json.dumps(make_delta(old, new))})
+    assert DocumentHistory._replay(chain) == texts[-1]
+    assert DocumentHistory._replay(chain[:2]) == texts[1]
@@ -0,0 +1,122 @@
+import os
+
+import pytest
+from starlette.requests import Request
+
+from app.services.file_serving import RangeFileResponse, etag_matches, file_response, parse_range
+
+
+@pytest.mark.parametrize("header, expected", [
+    (None, None),
+    ("", None),
+    ("bytes=0-99", (0, 99)),
+    ("bytes=10-", (10, 999)),
+    ("bytes=990-5000", (990, 999)),
+    ("bytes=-100", (900, 999)),
+    ("bytes=-5000", (0, 999)),
+    (" bytes = 5 - 6 ", (5, 6)),
+    ("bytes=999-999", (999, 999)),
+    # Non satisfaisables : 416
+    ("bytes=1000-", (1000, 1000)),
+    ("bytes=1000-2000", (1000, 1000)),
+    ("bytes=50-10", (1000, 1000)),
+    ("bytes=-0", (1000, 1000)),
+    # Non gérés : fichier entier
+    ("bytes=0-1,5-6", None),
+    ("items=0-1", None),
+    ("bytes=-", None),
+    ("bytes=abc", None),
+])
+def test_parse_range(header, expected):
+    assert parse_range(header, 1000) == expected
+
+
+def test_parse_range_empty_file():
+    assert parse_range("bytes=0-", 0) == (0, 0)
+    assert parse_range("bytes=-10", 0) == (0, 0)
+
+
+@pytest.mark.parametrize("header, expected", [
+    ('"abc"', True),
+    ('W/"abc"', True),
+    ('"x", "abc"', True),
+    ("*", True),
+    ('"abd"', False),
+])
+def test_etag_matches(header, expected):
+    assert etag_matches('"abc"', header) is expected
+
+
+def make_request(headers=None, method="GET"):
+    raw = [(name.lower().encode(), value.encode()) for name, value in (headers or {}).items()]
+    return Request({"type": "http", "method": method, "path": "/", "headers": raw, "query_string": b""})
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+def sample_file(tmp_path):
+    path = tmp_path / "cours.txt"
+    path.write_bytes(b"0123456789")
+    return str(path)
+
+
+def test_full_response_with_content_key(sample_file):
+    response = file_response(make_request(), sample_file, filename="cours.txt", content_key="abc")
+    assert isinstance(response, RangeFileResponse)
+    assert response.status_code == 200
+    assert response.headers["etag"] == '"abc"'
+    assert "immutable" in response.headers["cache-control"]
+    assert response.headers["content-length"] == "10"
+    assert response.headers["content-disposition"] == 'attachment; filename="cours.txt"'
+
+
+def test_not_modified(sample_file):
+    response = file_response(make_request({"If-None-Match": '"abc"'}), sample_file, content_key="abc")
+    assert response.status_code == 304
+
+
+def test_range_and_unsatisfiable(sample_file):
+    response = file_response(make_request({"Range": "bytes=2-4"}), sample_file)
+    assert response.status_code == 206
+    assert response.headers["content-range"] == "bytes 2-4/10"
+    assert response.headers["content-length"] == "3"
+
+    response = file_response(make_request({"Range": "bytes=20-"}), sample_file)
+    assert response.status_code == 416
+    assert response.headers["content-range"] == "bytes */10"
+
+
+def test_if_range_mismatch_serves_whole_file(sample_file):
+    request = make_request({"Range": "bytes=2-4", "If-Range": '"other"'})
+    response = file_response(request, sample_file, content_key="abc")
+    assert response.status_code == 200
+    assert response.headers["content-length"] == "10"
+
+
+def test_non_ascii_filename(sample_file):
+    response = file_response(make_request(), sample_file, filename="résumé.txt")
+    assert response.headers["content-disposition"] == "attachment; filename*=utf-8''r%C3%A9sum%C3%A9.txt"
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("header, body", [(None, b"0123456789"), ("bytes=3-5", b"345"), ("bytes=-2", b"89")])
+async def test_body(sample_file, header, body):
+    response = file_response(make_request({"Range": header} if header else {}), sample_file)
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    await response({"type": "http", "extensions": {}}, None, send)
+    assert messages[0]["type"] == "http.response.start"
+    assert b"".join(m.get("body", b"") for m in messages[1:]) == body
+    assert messages[-1]["more_body"] is False
+
+
+def test_directory_is_not_served(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        file_response(make_request(), os.fspath(tmp_path))
@@ -0,0 +1,105 @@
+import io
+import zipfile
+
+import pytest
+
+from app.services.file_sniffer import (
+    SNIFF_BYTES, ZIP_TAIL_BYTES, sniff, sniff_file, text_extension, zip_entry_names
+)
+
+DOCX = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+XLSX = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+ODT = "application/vnd.oasis.opendocument.text"
+
+
+def make_zip(entries, comment=b"", first=None):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        if first:
+            # ODF : entrée 'mimetype' en premier, non compressée
+            archive.writestr(zipfile.ZipInfo(first[0]), first[1], compress_type=zipfile.ZIP_STORED)
+        for name, data in entries:
+            archive.writestr(name, data, compress_type=zipfile.ZIP_DEFLATED)
+        archive.comment = comment
+    return buffer.getvalue()
+
+
+@pytest.mark.parametrize("head, mime_type", [
+    (b"%PDF-1.7\n", "application/pdf"),
+    (b"\x89PNG\r\n\x1a\n....", "image/png"),
+    (b"\xff\xd8\xff\xe0", "image/jpeg"),
+    (b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1", "application/msword"),
+    (b"\x00\x01\x02\x03binary", "application/octet-stream"),
+])
+def test_magic_numbers(head, mime_type):
+    assert sniff(head).mime_type == mime_type
+
+
+@pytest.mark.parametrize("head, filename, mime_type", [
+    (b"a,b\n1,2\n", "notes.CSV", "text/csv"),
+    (b"# Titre\n", "cours.md", "text/markdown"),
+    (b"[Intro] cours", "cours.json", "application/json"),
+    # Sans extension : seul le contenu décide
+    (b"a,b\n1,2\n", "", "text/plain"),
+    (b"  {\"a\": 1}", "", "application/json"),
+    (b"[1, 2]", "blob-sans-extension", "application/json"),
+    (b"Bonjour \xc3\xa9t\xc3\xa9\n", "", "text/plain"),
+    # Extension texte ignorée pour un contenu binaire
+    (b"%PDF-1.4", "faux.csv", "application/pdf"),
+])
+def test_text_detection(head, filename, mime_type):
+    assert sniff(head, filename).mime_type == mime_type
+
+
+def test_text_encodings():
+    assert sniff("déjà vu".encode("utf-8")).encoding == "utf-8"
+    assert sniff("déjà vu".encode("latin-1")).encoding == "latin-1"
+    # Caractère multi-octets coupé par la fin du tampon
+    assert sniff(("a" * 10 + "é").encode("utf-8")[:-1]).encoding == "utf-8"
+
+
+def test_text_extension():
+    assert text_extension("x.CSV") == ".csv"
+    assert text_extension("x.txt") == ""
+    assert text_extension("/uploads/blobs/ab/abcdef") == ""
+
+
+@pytest.mark.parametrize("entries, mime_type", [
+    ([("[Content_Types].xml", "<Types/>"), ("word/document.xml", "<w/>")], DOCX),
+    ([("[Content_Types].xml", "<Types/>"), ("xl/workbook.xml", "<x/>")], XLSX),
+    ([("word/document.xml", "<w/>")], "application/zip"),  # sans [Content_Types].xml
+    ([("notes.txt", "hello")], "application/zip"),
+])
+def test_zip_central_directory(tmp_path, entries, mime_type):
+    path = tmp_path / "upload"
+    path.write_bytes(make_zip(entries))
+    assert sniff_file(str(path)).mime_type == mime_type
+
+
+def test_zip_central_directory_outside_tail_buffer(tmp_path):
+    # Répertoire central placé avant les derniers ZIP_TAIL_BYTES : relu à son offset
+    entries = [("[Content_Types].xml", "<Types/>"), ("word/document.xml", "<w/>")]
+    entries += [(f"media/{i}.bin", "x") for i in range(10)]
+    data = make_zip(entries, comment=b"c" * 65535)
+    assert len(data) > ZIP_TAIL_BYTES - 100
+    path = tmp_path / "upload"
+    path.write_bytes(data)
+    assert sniff_file(str(path)).mime_type == DOCX
+
+
+def test_zip_entry_names_large_archive():
+    names = [f"dir/file-{i}.txt" for i in range(500)]
+    data = make_zip([(name, "") for name in names])
+    assert len(data) > SNIFF_BYTES
+    assert zip_entry_names(io.BytesIO(data)) == names
+
+
+def test_truncated_zip_has_no_entries():
+    data = make_zip([("a.txt", "a")])
+    assert zip_entry_names(io.BytesIO(data[:-30])) == []
+
+
+def test_odf_mimetype_entry():
+    data = make_zip([("content.xml", "<x/>")], first=("mimetype", ODT))
+    assert sniff(data[:SNIFF_BYTES]).mime_type == ODT
+    assert sniff(data[:SNIFF_BYTES]).format == "odt"
@@ -0,0 +1,74 @@
+import json
+
+import pytest
+
+from app.services.json_summary import summarize_json
+
+
+def summarize(text, chunk_size=None, **kwargs):
+    data = text.encode("utf-8")
+    size = chunk_size or len(data) or 1
+    return summarize_json((data[i:i + size] for i in range(0, len(data), size)), **kwargs)
+
+
+@pytest.mark.parametrize("text", [
+    "[1,,2]",
+    "[1 2]",
+    "[,1]",
+    "[1,]",
+    '{"a":1,}',
+    '{"a":}',
+    '{"a"}',
+    '{"a" 1}',
+    '{"a":1 "b":2}',
+    '{"a":1:2}',
+    "{,}",
+    "[1]]",
+    "[1",
+    "[1] 2",
+    '["abc',
+    "[nope]",
+    "",
+])
+def test_rejects_malformed_json(text):
+    with pytest.raises(ValueError):
+        summarize(text)
+
+
+@pytest.mark.parametrize("text", [
+    "[]",
+    "{}",
+    "3",
+    '"s"',
+    '[1, [2, {"a": []}], {"x": {"y": 1}, "z": [1, 2]}]',
+    '{"a": {"b": [1, {"c": null}]}, "d": "e\\"f", "g": true}',
+])
+@pytest.mark.parametrize("chunk_size", [None, 1, 3])
+def test_accepts_what_json_loads_accepts(text, chunk_size):
+    json.loads(text)
+    summary = summarize(text, chunk_size)
+    assert summary["root_type"] == {list: "array", dict: "object", int: "number", str: "string"}[type(json.loads(text))]
+
+
+def test_structure_and_sample():
+    text = json.dumps([{"id": i, "tags": ["a"] * i} for i in range(5)])
+    summary = summarize(text, chunk_size=7, sample_items=2)
+
+    assert summary["length"] == 5
+    assert summary["max_depth"] == 3
+    assert summary["keys"] == {"$[]": ["id", "tags"]}
+    assert summary["arrays"]["$"] == {"count": 1, "min_length": 5, "max_length": 5, "total_items": 5}
+    assert summary["arrays"]["$[].tags"]["min_length"] == 0
+    assert summary["arrays"]["$[].tags"]["max_length"] == 4
+    assert summary["sample"] == [{"id": 0, "tags": []}, {"id": 1, "tags": ["a"]}]
+
+
+def test_object_root_sample():
+    summary = summarize('{"a": 1, "b": [2, 3], "c": {"d": 4}}', chunk_size=2, sample_items=2)
+    assert summary["length"] == 3
+    assert summary["sample"] == {"a": 1, "b": [2, 3]}
+
+
+def test_multibyte_characters_split_across_chunks():
+    summary = summarize('{"clé": "été"}', chunk_size=1)
+    assert summary["keys"] == {"$": ["clé"]}
@@ -0,0 +1,59 @@
+import json
+from datetime import datetime
+
+import pytest
+from fastapi import HTTPException
+
+from app.core.projection import Projection
+
+FIELDS = {
+    "id": "u.id",
+    "name": "u.full_name",
+    "created_at": "u.created_at",
+    "course_count": ("course_count", "OPTIONAL MATCH (u)-[:TEACHES]->(c) WITH u, count(c) as course_count"),
+    "student_count": ("student_count", "OPTIONAL MATCH (u)-[:TEACHES]->(c) WITH u, count(c) as course_count"),
+}
+
+
+def test_all_fields_by_default():
+    projection = Projection(FIELDS)
+    assert not projection.partial
+    assert projection.selected == list(FIELDS)
+    assert projection.returns().startswith("u.id as id, u.full_name as name")
+
+
+def test_requested_fields_keep_id_and_drop_duplicates():
+    projection = Projection(FIELDS, " name, name ,,")
+    assert projection.partial
+    assert projection.selected == ["id", "name"]
+    assert "name" in projection and "created_at" not in projection
+    assert projection.returns() == "u.id as id, u.full_name as name"
+    assert projection.matches() == ""
+
+
+def test_unknown_fields_are_rejected():
+    with pytest.raises(HTTPException) as error:
+        Projection(FIELDS, "name,password,secret")
+    assert error.value.status_code == 400
+    assert "password, secret" in error.value.detail
+
+
+def test_field_clauses_only_when_requested_and_once():
+    projection = Projection(FIELDS, "course_count,student_count")
+    assert projection.matches() == FIELDS["course_count"][1]
+
+
+def test_hidden_order_key():
+    projection = Projection(FIELDS, "name", order_by="created_at")
+    assert projection.returns() == "u.id as id, u.full_name as name, u.created_at as created_at"
+    assert projection.row({"id": "1", "name": "A", "created_at": "x"}) == {"id": "1", "name": "A"}
+    assert Projection(FIELDS, "created_at", order_by="created_at").hidden == []
+
+
+def test_response_converts_neo4j_temporals():
+    class Neo4jDateTime:
+        def to_native(self):
+            return datetime(2026, 1, 2, 3, 4, 5)
+
+    response = Projection(FIELDS, "created_at").response([{"id": "1", "created_at": Neo4jDateTime()}])
+    assert json.loads(response.body) == [{"id": "1", "created_at": "2026-01-02T03:04:05"}]